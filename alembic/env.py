@@ -1,3 +1,4 @@
+import os
 from logging.config import fileConfig
 
 from sqlalchemy import engine_from_config, pool
@@ -13,6 +14,10 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
+# Migrate the same database the application is pointed at
+if "TOWER_TRACKER_DATABASE_URL" in os.environ:
+    config.set_main_option("sqlalchemy.url", os.environ["TOWER_TRACKER_DATABASE_URL"])
+
 # add your model's MetaData object here
 # for 'autogenerate' support
 # from myapp import mymodel
@@ -0,0 +1,77 @@
+"""Make (run_id, time_spent) unique.
+
+Revision ID: 3c1d9e47b2f0
+Revises: a735f12cc5ae
+Create Date: 2026-10-18 14:02:17.208331
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3c1d9e47b2f0"
+down_revision: Union[str, None] = "a735f12cc5ae"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Give legacy rows run ids of their own and add the unique index."""
+    # A checkpoint is identified by its run and the time spent in it. Rows from
+    # before runs had ids all got run_id 0, but each of them is a run of its own:
+    # number them after the existing runs, in collection order.
+    bind = op.get_bind()
+    last_run_id = bind.execute(
+        sa.text("SELECT COALESCE(MAX(run_id), 0) FROM run_statistics")
+    ).scalar_one()
+    op.execute(
+        """
+        CREATE TEMPORARY TABLE legacy_runs AS
+        SELECT id, ROW_NUMBER() OVER (ORDER BY datetime_collected, id) AS number
+        FROM run_statistics WHERE run_id = 0
+        """
+    )
+    op.execute(
+        f"""
+        UPDATE run_statistics
+        SET run_id = {int(last_run_id)} + (
+            SELECT number FROM legacy_runs WHERE legacy_runs.id = run_statistics.id
+        )
+        WHERE run_id = 0
+        """
+    )
+    op.execute("DROP TABLE legacy_runs")
+
+    # Rows are never deleted here: remaining duplicates have to be resolved by hand
+    duplicates = bind.execute(sa.text(
+        """
+        SELECT run_id, time_spent, GROUP_CONCAT(id) FROM run_statistics
+        GROUP BY run_id, time_spent HAVING COUNT(*) > 1
+        ORDER BY run_id, time_spent
+        """
+    )).all()
+    if duplicates:
+        listing = "; ".join(
+            f"run {run_id}, time_spent {time_spent}: ids {ids}"
+            for run_id, time_spent, ids in duplicates
+        )
+        raise RuntimeError(
+            "Cannot make (run_id, time_spent) unique, these entries share both. "
+            f"Delete or correct them and upgrade again: {listing}"
+        )
+
+    op.create_index(
+        "uq_run_statistics_run_id_time_spent",
+        "run_statistics",
+        ["run_id", "time_spent"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    """Drop the unique index."""
+    # The run ids given to rows that had run_id 0 are kept
+    op.drop_index("uq_run_statistics_run_id_time_spent", table_name="run_statistics")
@@ -0,0 +1,143 @@
+"""Add tier_stats rollup maintained by triggers.
+
+Revision ID: 5e2b7c90d4a1
+Revises: 3c1d9e47b2f0
+Create Date: 2026-10-18 15:11:52.604177
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5e2b7c90d4a1"
+down_revision: Union[str, None] = "3c1d9e47b2f0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Metric name -> SQL expression over a run_statistics row; {row} is NEW, OLD or
+# the table. Division by zero yields NULL, which is left out of the count and sums.
+METRICS = {
+    "wave": "{row}.wave",
+    "coins_per_hour": "{row}.coins / ({row}.time_spent / 3600.0)",
+    "coins_per_wave": "{row}.coins / {row}.wave",
+    "cells_per_hour": "{row}.cells / ({row}.time_spent / 3600.0)",
+    "cells_per_wave": "{row}.cells * 1.0 / {row}.wave",
+}
+# The counters of every tier
+COLUMNS = ["entries"] + [
+    f"{name}_{part}" for name in METRICS for part in ("n", "sum", "sumsq")
+]
+
+
+def _aggregates() -> str:
+    """Return the aggregates over run_statistics rows, in COLUMNS order."""
+    selects = ["COUNT(*)"]
+    for expression in METRICS.values():
+        value = expression.format(row="run_statistics")
+        selects += [
+            f"COUNT({value})", f"TOTAL({value})", f"TOTAL(({value}) * ({value}))"
+        ]
+    return ", ".join(selects)
+
+
+def _add(row: str) -> str:
+    """UPDATE adding one row to its tier."""
+    assignments = ["entries = entries + 1"]
+    for name, expression in METRICS.items():
+        value = expression.format(row=row)
+        assignments += [
+            f"{name}_n = {name}_n + (({value}) IS NOT NULL)",
+            f"{name}_sum = {name}_sum + COALESCE({value}, 0)",
+            f"{name}_sumsq = {name}_sumsq + COALESCE(({value}) * ({value}), 0)",
+        ]
+    return f"UPDATE tier_stats SET {', '.join(assignments)} WHERE tier = {row}.tier;"
+
+
+def _recompute(row: str, where: str = "") -> str:
+    """
+    UPDATE recomputing the tier of `row` from its remaining entries.
+
+    Removing a value by subtracting it from the float sums cancels
+    catastrophically once a large value has been added, so deletes and edits
+    recompute the tier instead, reading it through the tier index.
+    """
+    return (
+        f"UPDATE tier_stats SET ({', '.join(COLUMNS)}) = "
+        f"(SELECT {_aggregates()} FROM run_statistics WHERE tier = {row}.tier) "
+        f"WHERE tier = {row}.tier{where};"
+    )
+
+
+def _ensure_tier(row: str) -> str:
+    # Not INSERT OR IGNORE: an outer upsert's conflict handling overrides the
+    # trigger's, so the existence check is spelled out.
+    return (
+        f"INSERT INTO tier_stats (tier) SELECT {row}.tier "
+        f"WHERE NOT EXISTS (SELECT 1 FROM tier_stats WHERE tier = {row}.tier);"
+    )
+
+
+def upgrade() -> None:
+    """Create and fill tier_stats and the triggers that maintain it."""
+    columns = [
+        sa.Column("tier", sa.Integer(), nullable=False),
+        sa.Column("entries", sa.Integer(), server_default="0", nullable=False),
+    ]
+    for name in METRICS:
+        columns += [
+            sa.Column(f"{name}_n", sa.Integer(), server_default="0", nullable=False),
+            sa.Column(f"{name}_sum", sa.Float(), server_default="0", nullable=False),
+            sa.Column(f"{name}_sumsq", sa.Float(), server_default="0", nullable=False),
+        ]
+    op.create_table("tier_stats", *columns, sa.PrimaryKeyConstraint("tier"))
+    op.create_index("ix_run_statistics_tier", "run_statistics", ["tier"])
+
+    op.execute(
+        f"""
+        CREATE TRIGGER tier_stats_after_insert AFTER INSERT ON run_statistics
+        BEGIN
+            {_ensure_tier("NEW")}
+            {_add("NEW")}
+        END
+        """
+    )
+    op.execute(
+        f"""
+        CREATE TRIGGER tier_stats_after_delete AFTER DELETE ON run_statistics
+        BEGIN
+            {_recompute("OLD")}
+        END
+        """
+    )
+    op.execute(
+        f"""
+        CREATE TRIGGER tier_stats_after_update
+        AFTER UPDATE OF tier, wave, coins, cells, time_spent ON run_statistics
+        WHEN OLD.tier IS NOT NEW.tier OR OLD.wave IS NOT NEW.wave
+            OR OLD.coins IS NOT NEW.coins OR OLD.cells IS NOT NEW.cells
+            OR OLD.time_spent IS NOT NEW.time_spent
+        BEGIN
+            {_recompute("OLD")}
+            {_ensure_tier("NEW")}
+            {_recompute("NEW", where=" AND NEW.tier IS NOT OLD.tier")}
+        END
+        """
+    )
+
+    # Seed the rollup from the existing checkpoints
+    op.execute(
+        f"INSERT INTO tier_stats (tier, {', '.join(COLUMNS)}) "
+        f"SELECT tier, {_aggregates()} FROM run_statistics GROUP BY tier"
+    )
+
+
+def downgrade() -> None:
+    """Drop the triggers and tier_stats."""
+    op.execute("DROP TRIGGER IF EXISTS tier_stats_after_update")
+    op.execute("DROP TRIGGER IF EXISTS tier_stats_after_delete")
+    op.execute("DROP TRIGGER IF EXISTS tier_stats_after_insert")
+    op.drop_index("ix_run_statistics_tier", table_name="run_statistics")
+    op.drop_table("tier_stats")
@@ -0,0 +1,43 @@
+"""Add run_statistics indexes.
+
+Revision ID: a735f12cc5ae
+Revises: de18b8228b4c
+Create Date: 2026-10-18 13:20:41.512093
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a735f12cc5ae"
+down_revision: Union[str, None] = "de18b8228b4c"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Index run lookups and open runs."""
+    # Per-run lookups and "latest entry of a run" ordering
+    op.create_index(
+        "ix_run_statistics_run_id_datetime_collected",
+        "run_statistics",
+        ["run_id", "datetime_collected"],
+    )
+    # Only open runs are ever searched for, so keep the index tiny
+    op.create_index(
+        "ix_run_statistics_open_runs",
+        "run_statistics",
+        ["run_id"],
+        sqlite_where=sa.text("end_of_round = 0"),
+    )
+
+
+def downgrade() -> None:
+    """Drop the run_statistics indexes."""
+    op.drop_index("ix_run_statistics_open_runs", table_name="run_statistics")
+    op.drop_index(
+        "ix_run_statistics_run_id_datetime_collected", table_name="run_statistics"
+    )
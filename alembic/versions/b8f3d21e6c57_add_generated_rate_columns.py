@@ -0,0 +1,208 @@
+"""Add stored generated rate columns to run_statistics.
+
+Revision ID: b8f3d21e6c57
+Revises: f1c6b3a9d7e2
+Create Date: 2026-10-18 19:26:40.118236
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b8f3d21e6c57"
+down_revision: Union[str, None] = "f1c6b3a9d7e2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Rates are NULL when no time or no waves were recorded
+RATES = {
+    "coins_per_hour": "CASE WHEN time_spent > 0 THEN coins / (time_spent / 3600.0) END",
+    "coins_per_wave": "CASE WHEN wave > 0 THEN coins / wave END",
+    "cells_per_hour": "CASE WHEN time_spent > 0 THEN cells / (time_spent / 3600.0) END",
+    "cells_per_wave": "CASE WHEN wave > 0 THEN cells * 1.0 / wave END",
+}
+
+# tier_stats metric expressions over a row ({row} is NEW, OLD or the table):
+# before this revision the triggers computed the rates, now they read the columns
+PREVIOUS_METRICS = {
+    "wave": "{row}.wave",
+    "coins_per_hour": "{row}.coins / ({row}.time_spent / 3600.0)",
+    "coins_per_wave": "{row}.coins / {row}.wave",
+    "cells_per_hour": "{row}.cells / ({row}.time_spent / 3600.0)",
+    "cells_per_wave": "{row}.cells * 1.0 / {row}.wave",
+}
+METRICS = {name: f"{{row}}.{name}" for name in PREVIOUS_METRICS}
+COUNTERS = ["entries"] + [
+    f"{name}_{part}" for name in METRICS for part in ("n", "sum", "sumsq")
+]
+
+COPIED_COLUMNS = (
+    "id, datetime_collected, tier, wave, coins, cells, time_spent, notes, "
+    "end_of_round, run_id"
+)
+
+
+def _recreate_run_statistics(rates: bool) -> None:
+    """
+    Rebuild run_statistics with or without the generated columns.
+
+    SQLite can only add VIRTUAL columns with ALTER TABLE, so the table is copied.
+    Dropping the old table drops its indexes and triggers too: the indexes are
+    recreated here, the other triggers on the table (the snapshot change log's
+    and latest_entries') are restored as they were, and the tier_stats ones are
+    recreated by the caller.
+    """
+    kept_triggers = op.get_bind().execute(sa.text(
+        "SELECT sql FROM sqlite_master WHERE type = 'trigger' "
+        "AND tbl_name = 'run_statistics' AND name NOT GLOB 'tier_stats_*'"
+    )).scalars().all()
+    columns = [
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("datetime_collected", sa.DateTime(), nullable=False),
+        sa.Column("tier", sa.Integer(), nullable=False),
+        sa.Column("wave", sa.Integer(), nullable=False),
+        sa.Column("coins", sa.Float(), nullable=False),
+        sa.Column("cells", sa.Integer(), nullable=False),
+        sa.Column("time_spent", sa.Integer(), nullable=False),
+        sa.Column("notes", sa.String(), nullable=True),
+        sa.Column("end_of_round", sa.Boolean(), nullable=False),
+        sa.Column("run_id", sa.Integer(), nullable=False),
+    ]
+    if rates:
+        columns += [
+            sa.Column(name, sa.Float(), sa.Computed(expression, persisted=True))
+            for name, expression in RATES.items()
+        ]
+    op.create_table("run_statistics_new", *columns, sa.PrimaryKeyConstraint("id"))
+    op.execute(
+        f"INSERT INTO run_statistics_new ({COPIED_COLUMNS}) "
+        f"SELECT {COPIED_COLUMNS} FROM run_statistics"
+    )
+    op.drop_table("run_statistics")
+    op.rename_table("run_statistics_new", "run_statistics")
+
+    op.create_index(
+        "ix_run_statistics_run_id_datetime_collected",
+        "run_statistics",
+        ["run_id", "datetime_collected"],
+    )
+    op.create_index(
+        "ix_run_statistics_open_runs",
+        "run_statistics",
+        ["run_id"],
+        sqlite_where=sa.text("end_of_round = 0"),
+    )
+    op.create_index(
+        "uq_run_statistics_run_id_time_spent",
+        "run_statistics",
+        ["run_id", "time_spent"],
+        unique=True,
+    )
+    if rates:
+        # Top runs by coins per hour within a tier are read straight off this
+        # index, which also serves the tier_stats triggers' per-tier lookups
+        op.create_index(
+            "ix_run_statistics_tier_coins_per_hour",
+            "run_statistics",
+            ["tier", "coins_per_hour"],
+        )
+    else:
+        op.create_index("ix_run_statistics_tier", "run_statistics", ["tier"])
+    for sql in kept_triggers:
+        op.execute(sql)
+
+
+def _aggregates(metrics) -> str:
+    """Return the aggregates over run_statistics rows, in COUNTERS order."""
+    selects = ["COUNT(*)"]
+    for expression in metrics.values():
+        value = expression.format(row="run_statistics")
+        selects += [
+            f"COUNT({value})", f"TOTAL({value})", f"TOTAL(({value}) * ({value}))"
+        ]
+    return ", ".join(selects)
+
+
+def _add(metrics, row: str) -> str:
+    """UPDATE adding one row to its tier."""
+    assignments = ["entries = entries + 1"]
+    for name, expression in metrics.items():
+        value = expression.format(row=row)
+        assignments += [
+            f"{name}_n = {name}_n + (({value}) IS NOT NULL)",
+            f"{name}_sum = {name}_sum + COALESCE({value}, 0)",
+            f"{name}_sumsq = {name}_sumsq + COALESCE(({value}) * ({value}), 0)",
+        ]
+    return f"UPDATE tier_stats SET {', '.join(assignments)} WHERE tier = {row}.tier;"
+
+
+def _recompute(metrics, row: str, where: str = "") -> str:
+    """UPDATE recomputing the tier of `row` from its remaining entries."""
+    return (
+        f"UPDATE tier_stats SET ({', '.join(COUNTERS)}) = "
+        f"(SELECT {_aggregates(metrics)} FROM run_statistics "
+        f"WHERE tier = {row}.tier) WHERE tier = {row}.tier{where};"
+    )
+
+
+def _ensure_tier(row: str) -> str:
+    return (
+        f"INSERT INTO tier_stats (tier) SELECT {row}.tier "
+        f"WHERE NOT EXISTS (SELECT 1 FROM tier_stats WHERE tier = {row}.tier);"
+    )
+
+
+def _create_tier_stats_triggers(metrics) -> None:
+    """Recreate the tier_stats triggers and reseed the rollup from the table."""
+    op.execute(
+        f"""
+        CREATE TRIGGER tier_stats_after_insert AFTER INSERT ON run_statistics
+        BEGIN
+            {_ensure_tier("NEW")}
+            {_add(metrics, "NEW")}
+        END
+        """
+    )
+    op.execute(
+        f"""
+        CREATE TRIGGER tier_stats_after_delete AFTER DELETE ON run_statistics
+        BEGIN
+            {_recompute(metrics, "OLD")}
+        END
+        """
+    )
+    op.execute(
+        f"""
+        CREATE TRIGGER tier_stats_after_update
+        AFTER UPDATE OF tier, wave, coins, cells, time_spent ON run_statistics
+        WHEN OLD.tier IS NOT NEW.tier OR OLD.wave IS NOT NEW.wave
+            OR OLD.coins IS NOT NEW.coins OR OLD.cells IS NOT NEW.cells
+            OR OLD.time_spent IS NOT NEW.time_spent
+        BEGIN
+            {_recompute(metrics, "OLD")}
+            {_ensure_tier("NEW")}
+            {_recompute(metrics, "NEW", where=" AND NEW.tier IS NOT OLD.tier")}
+        END
+        """
+    )
+
+    op.execute("DELETE FROM tier_stats")
+    op.execute(
+        f"INSERT INTO tier_stats (tier, {', '.join(COUNTERS)}) "
+        f"SELECT tier, {_aggregates(metrics)} FROM run_statistics GROUP BY tier"
+    )
+
+
+def upgrade() -> None:
+    """Add the generated rate columns and roll up the stored rates."""
+    _recreate_run_statistics(rates=True)
+    _create_tier_stats_triggers(METRICS)
+
+
+def downgrade() -> None:
+    """Drop the generated rate columns and roll up computed rates again."""
+    _recreate_run_statistics(rates=False)
+    _create_tier_stats_triggers(PREVIOUS_METRICS)
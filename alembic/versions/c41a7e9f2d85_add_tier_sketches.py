@@ -0,0 +1,155 @@
+"""Add per-tier quantile sketches of ended runs.
+
+Revision ID: c41a7e9f2d85
+Revises: b8f3d21e6c57
+Create Date: 2026-10-18 21:03:12.540917
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c41a7e9f2d85"
+down_revision: Union[str, None] = "b8f3d21e6c57"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _queue_run(row: str) -> str:
+    """Queue the run of `row` for its tier's sketches."""
+    return (
+        "INSERT INTO tier_sketch_pending (run_id, tier) "
+        f"VALUES ({row}.run_id, {row}.tier);"
+    )
+
+
+def _queue_rebuild(row: str) -> str:
+    """Queue a rebuild of the tier of `row`, unless one is queued."""
+    # Not INSERT OR IGNORE: an outer upsert's conflict handling overrides the
+    # trigger's, so the existence check is spelled out.
+    return (
+        f"INSERT INTO tier_sketch_pending (tier) SELECT {row}.tier WHERE NOT EXISTS "
+        "(SELECT 1 FROM tier_sketch_pending "
+        f"WHERE run_id IS NULL AND tier = {row}.tier);"
+    )
+
+
+# A run is queued when its first end-of-round entry appears
+FIRST_END = (
+    "NEW.end_of_round = 1 AND NOT EXISTS (SELECT 1 FROM run_statistics "
+    "WHERE run_id = NEW.run_id AND end_of_round = 1 AND id != NEW.id)"
+)
+# A later end-of-round entry only changes the sketches when it becomes the run's
+# latest entry after the run was folded in; while the run is queued, folding it
+# reads its latest entry anyway. Imported runs, whose entries are all ended,
+# are so folded in once.
+REPLACES_FOLDED_END = """
+    NEW.end_of_round = 1
+    AND EXISTS (SELECT 1 FROM run_statistics
+        WHERE run_id = NEW.run_id AND end_of_round = 1 AND id != NEW.id)
+    AND NOT EXISTS (SELECT 1 FROM run_statistics
+        WHERE run_id = NEW.run_id AND end_of_round = 1 AND id != NEW.id
+        AND (datetime_collected > NEW.datetime_collected
+             OR (datetime_collected = NEW.datetime_collected AND id > NEW.id)))
+    AND NOT EXISTS (SELECT 1 FROM tier_sketch_pending WHERE run_id = NEW.run_id)
+"""
+
+
+def upgrade() -> None:
+    """Create the sketch tables and the triggers queueing ended runs."""
+    op.create_table(
+        "tier_sketches",
+        sa.Column("tier", sa.Integer(), nullable=False),
+        sa.Column("metric", sa.String(), nullable=False),
+        sa.Column("count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("digest", sa.Text(), nullable=False),
+        sa.PrimaryKeyConstraint("tier", "metric"),
+    )
+    # Ended runs to fold into their tier's sketches; run_id NULL rebuilds the tier
+    op.create_table(
+        "tier_sketch_pending",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("run_id", sa.Integer(), nullable=True),
+        sa.Column("tier", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_tier_sketch_pending_run_id", "tier_sketch_pending", ["run_id"]
+    )
+
+    op.execute(
+        f"""
+        CREATE TRIGGER tier_sketches_after_insert AFTER INSERT ON run_statistics
+        WHEN {FIRST_END}
+        BEGIN
+            {_queue_run("NEW")}
+        END
+        """
+    )
+    op.execute(
+        f"""
+        CREATE TRIGGER tier_sketches_after_end
+        AFTER UPDATE OF end_of_round ON run_statistics
+        WHEN OLD.end_of_round = 0 AND {FIRST_END}
+        BEGIN
+            {_queue_run("NEW")}
+        END
+        """
+    )
+    # Sketches cannot forget values, so changes to folded runs rebuild the tier
+    op.execute(
+        f"""
+        CREATE TRIGGER tier_sketches_after_late_insert AFTER INSERT ON run_statistics
+        WHEN {REPLACES_FOLDED_END}
+        BEGIN
+            {_queue_rebuild("NEW")}
+        END
+        """
+    )
+    op.execute(
+        f"""
+        CREATE TRIGGER tier_sketches_after_delete AFTER DELETE ON run_statistics
+        WHEN OLD.end_of_round = 1
+        BEGIN
+            {_queue_rebuild("OLD")}
+        END
+        """
+    )
+    op.execute(
+        f"""
+        CREATE TRIGGER tier_sketches_after_update
+        AFTER UPDATE OF tier, wave, coins, cells, time_spent ON run_statistics
+        WHEN OLD.end_of_round = 1 AND (
+            OLD.tier IS NOT NEW.tier OR OLD.wave IS NOT NEW.wave
+            OR OLD.coins IS NOT NEW.coins OR OLD.cells IS NOT NEW.cells
+            OR OLD.time_spent IS NOT NEW.time_spent
+        )
+        BEGIN
+            {_queue_rebuild("OLD")}
+            {_queue_rebuild("NEW")}
+        END
+        """
+    )
+
+    # Existing data is sketched by rebuilding every tier on first use
+    op.execute(
+        "INSERT INTO tier_sketch_pending (tier) "
+        "SELECT DISTINCT tier FROM run_statistics"
+    )
+
+
+def downgrade() -> None:
+    """Drop the sketch triggers and tables."""
+    op.execute("DROP TRIGGER IF EXISTS tier_sketches_after_update")
+    op.execute("DROP TRIGGER IF EXISTS tier_sketches_after_delete")
+    op.execute("DROP TRIGGER IF EXISTS tier_sketches_after_late_insert")
+    op.execute("DROP TRIGGER IF EXISTS tier_sketches_after_end")
+    op.execute("DROP TRIGGER IF EXISTS tier_sketches_after_insert")
+    op.drop_index(
+        "ix_tier_sketch_pending_run_id", table_name="tier_sketch_pending"
+    )
+    op.drop_table("tier_sketch_pending")
+    op.drop_table("tier_sketches")
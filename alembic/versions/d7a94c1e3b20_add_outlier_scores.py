@@ -0,0 +1,99 @@
+"""Add per-entry outlier scores and their per-tier reference statistics.
+
+Revision ID: d7a94c1e3b20
+Revises: c41a7e9f2d85
+Create Date: 2026-10-18 22:41:57.306514
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d7a94c1e3b20"
+down_revision: Union[str, None] = "c41a7e9f2d85"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+RATES = ("coins_per_hour", "coins_per_wave", "cells_per_hour", "cells_per_wave")
+
+
+def _score(row: str) -> str:
+    """
+    Score one entry against its tier's reference statistics.
+
+    The score is the largest robust z-score of its rates, and the flag whether any
+    rate lies outside the tier's fences. NULL statistics (too few runs) and NULL
+    rates are skipped by the aggregates.
+    """
+    cases = " ".join(f"WHEN '{name}' THEN {row}.{name}" for name in RATES)
+    value = f"CASE metric {cases} END"
+    return f"""
+        UPDATE run_statistics SET (outlier_score, outlier) = (
+            SELECT MAX(ABS(value - median) / NULLIF(scale, 0)),
+                   COALESCE(MAX(value < lower OR value > upper), 0)
+            FROM (SELECT {value} AS value, median, scale, lower, upper
+                  FROM tier_outlier_stats WHERE tier = {row}.tier)
+        ) WHERE id = {row}.id;
+    """
+
+
+def upgrade() -> None:
+    """Add the outlier columns, tier_outlier_stats and the scoring triggers."""
+    op.add_column(
+        "run_statistics", sa.Column("outlier_score", sa.Float(), nullable=True)
+    )
+    op.add_column(
+        "run_statistics",
+        sa.Column("outlier", sa.Boolean(), server_default="0", nullable=False),
+    )
+    op.create_index(
+        "ix_run_statistics_outliers", "run_statistics", ["run_id"],
+        sqlite_where=sa.text("outlier = 1"),
+    )
+
+    # Written by tower_tracker.outliers, which also backfills the scores
+    op.create_table(
+        "tier_outlier_stats",
+        sa.Column("tier", sa.Integer(), nullable=False),
+        sa.Column("metric", sa.String(), nullable=False),
+        sa.Column("runs", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("entries", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("median", sa.Float(), nullable=True),
+        sa.Column("scale", sa.Float(), nullable=True),
+        sa.Column("lower", sa.Float(), nullable=True),
+        sa.Column("upper", sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint("tier", "metric"),
+    )
+
+    # New and edited entries are scored against the stored statistics right away
+    op.execute(
+        f"""
+        CREATE TRIGGER outliers_after_insert AFTER INSERT ON run_statistics
+        WHEN EXISTS (SELECT 1 FROM tier_outlier_stats WHERE tier = NEW.tier)
+        BEGIN
+            {_score("NEW")}
+        END
+        """
+    )
+    op.execute(
+        f"""
+        CREATE TRIGGER outliers_after_update
+        AFTER UPDATE OF tier, wave, coins, cells, time_spent ON run_statistics
+        BEGIN
+            {_score("NEW")}
+        END
+        """
+    )
+
+
+def downgrade() -> None:
+    """Drop the scoring triggers, tier_outlier_stats and the outlier columns."""
+    op.execute("DROP TRIGGER IF EXISTS outliers_after_update")
+    op.execute("DROP TRIGGER IF EXISTS outliers_after_insert")
+    op.drop_table("tier_outlier_stats")
+    op.drop_index("ix_run_statistics_outliers", table_name="run_statistics")
+    op.drop_column("run_statistics", "outlier")
+    op.drop_column("run_statistics", "outlier_score")
@@ -0,0 +1,80 @@
+"""Log changes to rows already in the columnar snapshot.
+
+Revision ID: e3f8a6d2c914
+Revises: 5e2b7c90d4a1
+Create Date: 2026-10-18 16:38:21.417305
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e3f8a6d2c914"
+down_revision: Union[str, None] = "5e2b7c90d4a1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Only rows the snapshot may already hold (id <= watermark) are logged; later
+# rows are appended in their current state anyway
+SNAPSHOTTED = "OLD.id <= (SELECT watermark FROM snapshot_state WHERE id = 1)"
+# The columns the snapshot stores or derives its rates from
+TRACKED = (
+    "run_id", "datetime_collected", "tier", "wave", "coins", "cells", "time_spent",
+    "notes", "end_of_round",
+)
+# The partition the snapshot holds the old version in is found from these
+LOG_OLD = (
+    "INSERT INTO snapshot_changes (entry_id, tier, datetime_collected) "
+    "VALUES (OLD.id, OLD.tier, OLD.datetime_collected);"
+)
+
+
+def upgrade() -> None:
+    """Create snapshot_state, snapshot_changes and the triggers logging changes."""
+    op.create_table(
+        "snapshot_state",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("watermark", sa.Integer(), server_default="0", nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.execute("INSERT INTO snapshot_state (id) VALUES (1)")
+    op.create_table(
+        "snapshot_changes",
+        sa.Column("seq", sa.Integer(), nullable=False),
+        sa.Column("entry_id", sa.Integer(), nullable=False),
+        sa.Column("tier", sa.Integer(), nullable=False),
+        sa.Column("datetime_collected", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("seq"),
+    )
+
+    changed = " OR ".join(f"OLD.{name} IS NOT NEW.{name}" for name in TRACKED)
+    op.execute(
+        f"""
+        CREATE TRIGGER snapshot_changes_after_update
+        AFTER UPDATE OF {', '.join(TRACKED)} ON run_statistics
+        WHEN {SNAPSHOTTED} AND ({changed})
+        BEGIN
+            {LOG_OLD}
+        END
+        """
+    )
+    op.execute(
+        f"""
+        CREATE TRIGGER snapshot_changes_after_delete AFTER DELETE ON run_statistics
+        WHEN {SNAPSHOTTED}
+        BEGIN
+            {LOG_OLD}
+        END
+        """
+    )
+
+
+def downgrade() -> None:
+    """Drop the change triggers, snapshot_changes and snapshot_state."""
+    op.execute("DROP TRIGGER IF EXISTS snapshot_changes_after_delete")
+    op.execute("DROP TRIGGER IF EXISTS snapshot_changes_after_update")
+    op.drop_table("snapshot_changes")
+    op.drop_table("snapshot_state")
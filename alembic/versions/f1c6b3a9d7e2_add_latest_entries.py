@@ -0,0 +1,90 @@
+"""Add latest_entries, the latest entry of every run, maintained by triggers.
+
+Revision ID: f1c6b3a9d7e2
+Revises: e3f8a6d2c914
+Create Date: 2026-10-18 17:04:09.552718
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f1c6b3a9d7e2"
+down_revision: Union[str, None] = "e3f8a6d2c914"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _refresh(run_id: str) -> str:
+    """Statements setting the latest entry of run `run_id` from its entries."""
+    return f"""
+        DELETE FROM latest_entries WHERE run_id = {run_id};
+        INSERT INTO latest_entries (run_id, entry_id)
+        SELECT run_id, id FROM run_statistics WHERE run_id = {run_id}
+        ORDER BY datetime_collected DESC, id DESC LIMIT 1;
+    """
+
+
+def upgrade() -> None:
+    """Create and fill latest_entries and the triggers maintaining it."""
+    op.create_table(
+        "latest_entries",
+        sa.Column("run_id", sa.Integer(), nullable=False),
+        sa.Column("entry_id", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("run_id"),
+    )
+    op.create_index(
+        "uq_latest_entries_entry_id", "latest_entries", ["entry_id"], unique=True
+    )
+    op.execute(
+        """
+        INSERT INTO latest_entries (run_id, entry_id)
+        SELECT run_id, id FROM (
+            SELECT run_id, id, ROW_NUMBER() OVER (
+                PARTITION BY run_id ORDER BY datetime_collected DESC, id DESC
+            ) AS entry_rank
+            FROM run_statistics
+        ) WHERE entry_rank = 1
+        """
+    )
+
+    op.execute(
+        f"""
+        CREATE TRIGGER latest_entries_after_insert AFTER INSERT ON run_statistics
+        BEGIN
+            {_refresh("NEW.run_id")}
+        END
+        """
+    )
+    op.execute(
+        f"""
+        CREATE TRIGGER latest_entries_after_delete AFTER DELETE ON run_statistics
+        WHEN EXISTS (SELECT 1 FROM latest_entries WHERE entry_id = OLD.id)
+        BEGIN
+            {_refresh("OLD.run_id")}
+        END
+        """
+    )
+    op.execute(
+        f"""
+        CREATE TRIGGER latest_entries_after_update
+        AFTER UPDATE OF run_id, datetime_collected ON run_statistics
+        WHEN OLD.run_id IS NOT NEW.run_id
+            OR OLD.datetime_collected IS NOT NEW.datetime_collected
+        BEGIN
+            {_refresh("OLD.run_id")}
+            {_refresh("NEW.run_id")}
+        END
+        """
+    )
+
+
+def downgrade() -> None:
+    """Drop the latest_entries triggers and table."""
+    for event in ("insert", "delete", "update"):
+        op.execute(f"DROP TRIGGER IF EXISTS latest_entries_after_{event}")
+    op.drop_index("uq_latest_entries_entry_id", table_name="latest_entries")
+    op.drop_table("latest_entries")
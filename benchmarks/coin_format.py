@@ -0,0 +1,57 @@
+"""
+Compares the scalar and vectorized coin formatting/parsing functions.
+
+Usage: python benchmarks/coin_format.py [--values 100000] [--repeat 5]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from tower_tracker.ui.utils import (
+    format_coins,
+    format_coins_array,
+    parse_coins,
+    parse_coins_array,
+)
+
+
+def best_of(repeat: int, func) -> float:
+    """Return the fastest of `repeat` timings of `func()` in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    """Time the scalar and vectorized functions and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--values", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    values = np.random.default_rng(0).lognormal(20, 8, args.values)
+    texts = format_coins_array(values)
+    as_list, text_list = values.tolist(), texts.tolist()
+
+    repeat = args.repeat
+    format_scalar = best_of(repeat, lambda: [format_coins(value) for value in as_list])
+    format_vector = best_of(repeat, lambda: format_coins_array(values))
+    parse_scalar = best_of(repeat, lambda: [parse_coins(text) for text in text_list])
+    parse_vector = best_of(repeat, lambda: parse_coins_array(texts))
+
+    print(f"{args.values} values, ms (best of {args.repeat})")
+    print(f"{'':<8} {'scalar':>10} {'vector':>10} {'speedup':>8}")
+    for name, scalar, vector in (
+        ("format", format_scalar, format_vector),
+        ("parse", parse_scalar, parse_vector),
+    ):
+        timings = f"{scalar * 1000:>10.1f} {vector * 1000:>10.1f}"
+        print(f"{name:<8} {timings} {scalar / vector:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
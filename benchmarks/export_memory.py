@@ -0,0 +1,62 @@
+"""
+Compare the peak memory and time of the streaming export with loading all rows.
+
+Both run on the synthetic database of benchmarks/suite.py.
+
+Usage: python benchmarks/export_memory.py [--runs 10000] [--checkpoints 100]
+                                          [--format csv] [--chunk-size 1000]
+"""
+import argparse
+import os
+import time
+import tracemalloc
+
+from suite import open_database
+
+from tower_tracker import crud, export
+from tower_tracker.cache import query_cache
+
+
+def measure(func):
+    """Return the seconds and peak traced MiB of calling `func`."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak / 2**20
+
+
+def main() -> None:
+    """Measure both ways of exporting and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10_000)
+    parser.add_argument("--checkpoints", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--format", choices=export.EXPORT_FORMATS, default="csv")
+    parser.add_argument("--chunk-size", type=int, default=export.CHUNK_SIZE)
+    args = parser.parse_args()
+    query_cache.maxsize = 0
+
+    open_database(args.runs, args.checkpoints, args.seed)
+
+    def streamed():
+        with open(os.devnull, "w") as out:
+            export.export_entries(
+                out, args.format, include_rates=True, chunk_size=args.chunk_size
+            )
+
+    def loaded():
+        rows = crud.fetch_all_rows()
+        with open(os.devnull, "w") as out:
+            export.write_chunks([rows], crud.RunRow._fields, args.format, out)
+
+    print(f"{'export':<10} {'seconds':>10} {'peak MiB':>10}")
+    for name, func in (("streamed", streamed), ("loaded", loaded)):
+        seconds, peak = measure(func)
+        print(f"{name:<10} {seconds:>10.2f} {peak:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Compare the insert throughput of direct commits with the group-commit writer.
+
+Concurrent producers commit every insert_run themselves, then the same producers
+go through the group-commit writer.
+
+Usage: python benchmarks/group_commit.py [--producers 8] [--entries 500]
+                                         [--synchronous NORMAL] [--delay-ms 0]
+"""
+import argparse
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy.exc import OperationalError
+from suite import migrate
+
+from tower_tracker import crud, database
+from tower_tracker.writer import WRITER_DELAY_MS, GroupCommitWriter
+
+
+def produce(producers: int, entries: int, insert) -> tuple:
+    """
+    Run `producers` threads each inserting `entries` checkpoints of its own run.
+
+    Returns (inserts per second, failed inserts).
+    """
+    failures = []
+
+    def producer(run_id: int) -> None:
+        for i in range(entries):
+            try:
+                insert(run_id, 5, i + 1, 1e6 * (i + 1), i, (i + 1) * 60, "", False)
+            except OperationalError as error:
+                failures.append(error)
+
+    threads = [
+        threading.Thread(target=producer, args=(run_id,))
+        for run_id in range(1, producers + 1)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return (producers * entries - len(failures)) / elapsed, len(failures)
+
+
+def run(label: str, args, make_insert) -> None:
+    """Time the producers on a new database and print a row of results."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.db"
+        migrate(path)
+        pragmas = dict(database.SQLITE_PRAGMAS, synchronous=args.synchronous)
+        engine = database.configure_database(f"sqlite:///{path}", pragmas=pragmas)
+        insert, close = make_insert()
+        rate, failures = produce(args.producers, args.entries, insert)
+        close()
+        engine.dispose()
+    print(f"{label:<8} {rate:>12.0f} {failures:>10}")
+
+
+def direct():
+    """Return an insert committing every entry itself, and its cleanup."""
+    return crud.insert_run, lambda: None
+
+
+def main() -> None:
+    """Run both modes and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--producers", type=int, default=8)
+    parser.add_argument("--entries", type=int, default=500, help="inserts per producer")
+    parser.add_argument(
+        "--synchronous",
+        default="NORMAL",
+        help="SQLite synchronous PRAGMA (FULL fsyncs every commit)",
+    )
+    parser.add_argument(
+        "--delay-ms", type=float, default=WRITER_DELAY_MS, help="writer batching delay"
+    )
+    args = parser.parse_args()
+
+    def grouped():
+        writer = GroupCommitWriter(max_delay_ms=args.delay_ms)
+        return lambda *values: writer.insert_run(*values).result(), writer.close
+
+    print(f"{'mode':<8} {'inserts/s':>12} {'failures':>10}")
+    run("direct", args, direct)
+    run("grouped", args, grouped)
+
+
+if __name__ == "__main__":
+    main()
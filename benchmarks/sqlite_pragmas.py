@@ -0,0 +1,82 @@
+"""
+Compares read/write throughput of a default SQLite engine with the tuned one.
+
+Usage: python benchmarks/sqlite_pragmas.py [--entries 2000] [--seconds 2]
+"""
+import argparse
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from tower_tracker import crud, database
+from tower_tracker.cache import query_cache
+from tower_tracker.models.models import Base
+
+
+def write_throughput(entries: int) -> float:
+    """insert_run calls per second, each committing its own transaction."""
+    start = time.perf_counter()
+    for i in range(entries):
+        crud.insert_run(i // 100 + 1, 5, i % 100, 1e6, 10, i % 100 * 60, "", False)
+    return entries / (time.perf_counter() - start)
+
+
+def read_throughput(seconds: float, run_ids: int) -> float:
+    """fetch_all_entries_for_run calls per second."""
+    calls = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        crud.fetch_all_entries_for_run(calls % run_ids + 1)
+        calls += 1
+    return calls / seconds
+
+
+def mixed_read_throughput(seconds: float, run_ids: int) -> float:
+    """Measure reads per second while another thread keeps committing writes."""
+    stop = threading.Event()
+
+    def writer() -> None:
+        i = 0
+        while not stop.is_set():
+            crud.insert_run(10_000 + i, 5, 1, 1.0, 0, i, "", False)
+            i += 1
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        return read_throughput(seconds, run_ids)
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run(label: str, pragmas: dict, entries: int, seconds: float) -> None:
+    """Benchmark a fresh database opened with `pragmas` and print one result row."""
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = database.configure_database(
+            f"sqlite:///{Path(tmp) / 'bench.db'}", pragmas=pragmas
+        )
+        Base.metadata.create_all(engine)
+        writes = write_throughput(entries)
+        reads = read_throughput(seconds, entries // 100)
+        mixed = mixed_read_throughput(seconds, entries // 100)
+        engine.dispose()
+    print(f"{label:<8} {writes:>12.0f} {reads:>12.0f} {mixed:>16.0f}")
+
+
+def main() -> None:
+    """Compare SQLite's defaults with the tuned PRAGMAs."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=2000)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    args = parser.parse_args()
+    query_cache.maxsize = 0  # measure the database, not the query cache
+
+    print(f"{'engine':<8} {'writes/s':>12} {'reads/s':>12} {'reads/s (+w)':>16}")
+    run("default", {}, args.entries, args.seconds)
+    run("tuned", database.SQLITE_PRAGMAS, args.entries, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Time the crud and analytics paths on a synthetic database.
+
+The results are stored as JSON, optionally compared with an earlier run. The
+database is built once per (runs, checkpoints, seed) under benchmarks/.data and
+reused (migrated to the current schema) afterwards. The query cache is disabled,
+so every call reaches SQLite.
+
+Usage: python benchmarks/suite.py [--runs 10000] [--checkpoints 100] [--repeat 5]
+                                  [--output results.json] [--compare earlier.json]
+"""
+import argparse
+import json
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from alembic.config import Config
+from sqlalchemy import delete, func, select
+
+from alembic import command
+from tower_tracker import crud, database, outliers, sketches, synthetic
+from tower_tracker.cache import query_cache
+from tower_tracker.data_viewer import analyze_data, analyze_latest_runs, tier_averages
+from tower_tracker.models.models import RunStatistics
+from tower_tracker.series import fetch_run_series
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA_DIR = Path(__file__).resolve().parent / ".data"
+
+
+def migrate(path: Path) -> None:
+    """Upgrade the database at `path` to the latest schema."""
+    config = Config()
+    config.set_main_option("script_location", str(ROOT / "alembic"))
+    config.set_main_option("sqlalchemy.url", f"sqlite:///{path}")
+    command.upgrade(config, "head")
+
+
+def build_database(path: Path, runs: int, checkpoints: int, seed: int) -> None:
+    """Migrate a new database and fill it with synthetic records."""
+    migrate(path)
+    database.configure_database(f"sqlite:///{path}")
+    start = time.perf_counter()
+    count = synthetic.populate(runs, checkpoints, seed)
+    print(
+        f"built {path.name}: {count} records in {time.perf_counter() - start:.1f}s",
+        file=sys.stderr,
+    )
+
+
+def open_database(runs: int, checkpoints: int, seed: int) -> Path:
+    """
+    Configure the cached synthetic database.
+
+    It is built on first use and migrated when the schema moved on since.
+    """
+    DATA_DIR.mkdir(exist_ok=True)
+    path = DATA_DIR / f"synthetic-{runs}x{checkpoints}-seed{seed}.db"
+    if path.exists():
+        migrate(path)
+    else:
+        build_database(path, runs, checkpoints, seed)
+    database.configure_database(f"sqlite:///{path}")
+    return path
+
+
+def timed(func, repeat: int) -> dict:
+    """Run `func` once to warm up, then `repeat` times; return timings in ms."""
+    func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "repeat": repeat,
+        "min_ms": min(timings),
+        "median_ms": statistics.median(timings),
+        "mean_ms": statistics.fmean(timings),
+    }
+
+
+def run_benchmarks(runs: int, repeat: int, seed: int) -> dict:
+    """Time every benchmarked call; return its timings by name."""
+    rng = random.Random(seed)
+    results = {
+        "fetch_all_runs": timed(crud.fetch_all_runs, repeat),
+        "fetch_all_entries_for_run": timed(
+            lambda: crud.fetch_all_entries_for_run(rng.randint(1, runs)), repeat
+        ),
+        "fetch_run_rows": timed(crud.fetch_run_rows, repeat),
+        "fetch_entry_rows": timed(
+            lambda: crud.fetch_entry_rows(rng.randint(1, runs)), repeat
+        ),
+        "fetch_run_series": timed(
+            lambda: fetch_run_series(rng.randint(1, runs)), repeat
+        ),
+        "fetch_top_runs": timed(
+            lambda: crud.fetch_top_runs(rng.choice(synthetic.TIERS)), repeat
+        ),
+        "get_active_run_id": timed(crud.get_active_run_id, repeat),
+        "analyze_data": timed(lambda: analyze_data(use_snapshot=False), repeat),
+        "tier_averages": timed(tier_averages, repeat),
+        # The exact and the sketched inputs of the box plots
+        "analyze_latest_runs": timed(
+            lambda: analyze_latest_runs(use_snapshot=False), repeat
+        ),
+        "tier_box_stats": timed(sketches.tier_box_stats, repeat),
+        # Rescoring every entry; after the warm-up call nothing changes, so
+        # nothing is written
+        "backfill_outliers": timed(outliers.backfill_outliers, repeat),
+    }
+
+    # Inserts go to a run of their own, removed again so the database is reusable
+    run_id = runs + 1_000_000
+    time_spent = iter(range(1, 10**9))
+
+    def insert() -> None:
+        crud.insert_run(run_id, 5, 100, 1e9, 10, next(time_spent), "", False)
+
+    try:
+        results["insert_run"] = timed(insert, repeat)
+    finally:
+        with database.get_session() as session:
+            session.execute(delete(RunStatistics).where(RunStatistics.run_id == run_id))
+            session.commit()
+    return results
+
+
+def git_commit():
+    """Return the abbreviated hash of the checked out commit, or None."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, earlier: dict) -> None:
+    """Print the median timings next to those of an earlier run."""
+    print(f"{'benchmark':<28} {'earlier ms':>12} {'now ms':>12} {'change':>8}")
+    for name, timing in results.items():
+        before = earlier["results"].get(name)
+        if before is None:
+            print(f"{name:<28} {'-':>12} {timing['median_ms']:>12.2f}")
+            continue
+        then, now = before["median_ms"], timing["median_ms"]
+        print(f"{name:<28} {then:>12.2f} {now:>12.2f} {now / then - 1:>+8.0%}")
+
+
+def main() -> None:
+    """Run the suite and write or compare its results."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10_000)
+    parser.add_argument("--checkpoints", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--output", type=Path, help="write the results here (default: stdout)"
+    )
+    parser.add_argument(
+        "--compare", type=Path, help="earlier results to compare medians with"
+    )
+    args = parser.parse_args()
+    query_cache.maxsize = 0  # measure the database, not the query cache
+
+    open_database(args.runs, args.checkpoints, args.seed)
+    with database.get_session() as session:
+        rows = session.execute(
+            select(func.count()).select_from(RunStatistics)
+        ).scalar_one()
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "dataset": {
+            "runs": args.runs,
+            "checkpoints": args.checkpoints,
+            "seed": args.seed,
+            "rows": rows,
+        },
+        "results": run_benchmarks(args.runs, args.repeat, args.seed),
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        compare(report["results"], json.loads(args.compare.read_text()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Time sorting a large Treeview column.
+
+Parsing the displayed text back out of every cell and moving every row is timed
+against sorting stored raw values with NumPy and moving only the rows that are
+out of place.
+
+Without a display (or without tkinter) only the key computation and move planning
+are timed.
+
+Usage: python benchmarks/treeview_sort.py [--rows 50000] [--repeat 3]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from tower_tracker.ui.utils import (
+    format_coins,
+    insert_row,
+    parse_coins,
+    reorder_moves,
+    sort_column,
+    sort_order,
+)
+
+
+def parsed_order(texts, reverse=False) -> list:
+    """Order `texts` like before: parse each value, falling back to strings."""
+
+    def parse_value(value):
+        try:
+            return parse_coins(value)
+        except (ValueError, IndexError):
+            return value
+
+    data = [(parse_value(text), index) for index, text in enumerate(texts)]
+    data.sort(key=lambda t: t[0], reverse=reverse)
+    return [index for _, index in data]
+
+
+def best_of(repeat: int, func) -> float:
+    """Return the fastest of `repeat` timings of `func()` in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def bench_keys(rows: int, repeat: int) -> None:
+    """Time computing the sort keys and planning the moves."""
+    rng = np.random.default_rng(0)
+    coins = rng.lognormal(15, 3, rows)
+    texts = [format_coins(value) for value in coins]
+    raw = coins.tolist()
+    items = [f"I{i:05X}" for i in range(rows)]
+
+    parsed = best_of(repeat, lambda: parsed_order(texts))
+    keyed = best_of(repeat, lambda: reorder_moves(items, sort_order(raw)))
+    print(f"{'keys + move plan':<24} {parsed * 1000:>12.1f} {keyed * 1000:>12.1f}")
+
+    # Re-sorting a nearly sorted column moves only a handful of rows
+    order = sort_order(raw)
+    nearly = [raw[i] for i in order]
+    nearly[::1000] = rng.lognormal(15, 3, len(nearly[::1000])).tolist()
+    moves = reorder_moves(items, sort_order(nearly))
+    print(f"{'moves, nearly sorted':<24} {rows:>12} {len(moves):>12}")
+
+
+def bench_treeview(rows: int, repeat: int) -> None:
+    """Time sorting a real Treeview; raises ImportError without tkinter."""
+    import tkinter as tk
+    from tkinter import ttk
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as exc:
+        print(f"Treeview timings skipped: {exc}")
+        return
+    try:
+        rng = np.random.default_rng(1)
+        columns = ("coins", "wave")
+        tree = ttk.Treeview(root, columns=columns, show="headings")
+        coins = rng.lognormal(15, 3, rows)
+        waves = rng.integers(1, 10_000, rows)
+        for coin, wave in zip(coins.tolist(), waves.tolist()):
+            insert_row(tree, (format_coins(coin), wave), raw_values=(coin, wave))
+
+        def move_all() -> None:
+            items = tree.get_children("")
+            for index, i in enumerate(
+                parsed_order([tree.set(item, "coins") for item in items], reverse=True)
+            ):
+                tree.move(items[i], "", index)
+
+        def shuffle() -> None:
+            items = tree.get_children("")
+            for index, i in enumerate(rng.permutation(len(items))):
+                tree.move(items[i], "", index)
+
+        def timed(func) -> float:
+            total = []
+            for _ in range(repeat):
+                shuffle()
+                total.append(best_of(1, func))
+            return min(total)
+
+        full = timed(move_all)
+        keyed = timed(lambda: sort_column(tree, "coins", True))
+        print(f"{'treeview sort':<24} {full * 1000:>12.1f} {keyed * 1000:>12.1f}")
+    finally:
+        root.destroy()
+
+
+def main() -> None:
+    """Run the benchmarks and print a table of timings."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    header = f"ms (best of {args.repeat})"
+    print(f"{header:<24} {'parsed':>12} {'raw keys':>12}")
+    bench_keys(args.rows, args.repeat)
+    try:
+        bench_treeview(args.rows, args.repeat)
+    except ImportError:
+        print("Treeview timings skipped: tkinter is not available")
+
+
+if __name__ == "__main__":
+    main()
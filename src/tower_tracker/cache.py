@@ -0,0 +1,143 @@
+import inspect
+import os
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from tower_tracker import database
+
+# Number of distinct query results kept; 0 disables caching
+QUERY_CACHE_SIZE = int(os.environ.get("TOWER_TRACKER_QUERY_CACHE_SIZE", "256"))
+
+
+class QueryCache:
+    """
+    Bounded LRU cache for read queries.
+
+    Cached results are dropped as soon as the database may have changed. Writes made
+    through crud bump a write generation, and SQLite's `PRAGMA data_version`, read on a
+    dedicated connection, catches commits from any other connection or process.
+    """
+
+    def __init__(self, maxsize=QUERY_CACHE_SIZE, check_data_version=True) -> None:
+        self.maxsize = maxsize
+        self.check_data_version = check_data_version
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self._generation = 0
+        self._version = None
+        self._engine = None
+        self._sentinel = None
+
+    def bump(self) -> None:
+        """Record a write, invalidating every cached result."""
+        with self._lock:
+            self._generation += 1
+
+    def clear(self) -> None:
+        """Drop every cached result."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Return the hit and miss counters and the cache size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+    def _data_version(self):
+        """Return SQLite's data_version, or None when it cannot be observed."""
+        engine = database.get_engine()
+        if engine is not self._engine:
+            # The application was pointed at another database
+            if self._sentinel is not None:
+                self._sentinel.close()
+            self._engine, self._sentinel = engine, None
+            self._entries.clear()
+            if (
+                self.check_data_version
+                and engine.dialect.name == "sqlite"
+                and engine.url.database not in (None, "", ":memory:")
+            ):
+                cargs, cparams = engine.dialect.create_connect_args(engine.url)
+                cparams["check_same_thread"] = False
+                self._sentinel = engine.dialect.connect(*cargs, **cparams)
+        if self._sentinel is None:
+            return None
+        return self._sentinel.execute("PRAGMA data_version").fetchone()[0]
+
+    def _validate(self) -> None:
+        version = (self._generation, self._data_version())
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def cached(self, func):
+        """
+        Cache a read function's results by its arguments (decorator).
+
+        Calls given a `session`, by keyword or by position, bypass the cache: they
+        may read that session's uncommitted writes, which no other caller must see.
+        """
+        name = f"{func.__module__}.{func.__qualname__}"
+        signature = inspect.signature(func)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if self.maxsize <= 0:
+                return func(*args, **kwargs)
+            # Bound with the defaults applied, so equivalent calls share a key
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            if bound.arguments.get("session") is not None:
+                return func(*args, **kwargs)
+            key = (name, tuple(bound.arguments.items()))
+            with self._lock:
+                self._validate()
+                if key in self._entries:
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                    result = self._entries[key]
+                    return list(result) if isinstance(result, list) else result
+                self.misses += 1
+                generation = self._generation
+
+            result = func(*args, **kwargs)
+
+            with self._lock:
+                # Don't store results that may predate a write made meanwhile
+                if generation == self._generation:
+                    self._entries[key] = result
+                    if len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+            return list(result) if isinstance(result, list) else result
+
+        return wrapper
+
+
+query_cache = QueryCache()
+
+
+def invalidates_cache(func):
+    """Bump the write generation once a write function returns (decorator)."""
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            query_cache.bump()
+
+    return wrapper
@@ -0,0 +1,277 @@
+"""
+Headless command line interface.
+
+Adds entries, imports files, and prints reports as JSON or CSV. Never imports
+tkinter or matplotlib, so it starts quickly and runs without a display (cron,
+scripts).
+
+Usage: tower-tracker {add,import,averages,latest-runs,top-runs,export} ...
+"""
+import argparse
+import csv
+import json
+import math
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from tower_tracker import crud, importer
+from tower_tracker.export import EXPORT_FORMATS, export_entries, json_value, open_output
+
+FORMATS = ("json", "csv")
+
+
+def write_records(
+    records: Iterable[Dict[str, Any]], fields, output_format: str = "json", out=None
+) -> None:
+    """Write records as a JSON array or as CSV with a header row."""
+    out = out or sys.stdout
+    if output_format == "csv":
+        writer = csv.DictWriter(out, fieldnames=list(fields), lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(records)
+    else:
+        records = [
+            {key: json_value(value) for key, value in record.items()}
+            for record in records
+        ]
+        json.dump(records, out)
+        out.write("\n")
+
+
+def frame_records(df) -> List[Dict[str, Any]]:
+    """Return the rows of a DataFrame as records."""
+    # NaN (e.g. rates of entries without time) becomes null/empty
+    return [
+        {
+            key: None if isinstance(value, float) and math.isnan(value) else value
+            for key, value in record.items()
+        }
+        for record in df.astype(object).to_dict(orient="records")
+    ]
+
+
+def cmd_add(args) -> int:
+    """Add a checkpoint to the active or a new run."""
+    context = crud.get_run_context(args.run_id)
+    tier = args.tier if args.tier is not None else context.tier
+    if tier is None:
+        raise SystemExit("error: --tier is required when starting a new run")
+    record = importer.parse_record({
+        "run_id": context.run_id,
+        "tier": tier,
+        "wave": args.wave,
+        "coins": args.coins,
+        "cells": args.cells,
+        "time_spent": args.time,
+        "notes": args.notes,
+        "end_of_round": args.end_of_round,
+    })
+    del record["datetime_collected"]
+    crud.insert_run(**record)
+    write_records([record], record, args.output_format)
+    return 0
+
+
+def cmd_import(args) -> int:
+    """Import CSV or JSON Lines files."""
+    results = []
+    for path in args.files:
+        count = crud.insert_runs_bulk(
+            importer.read_records(path, args.file_format), chunk_size=args.chunk_size
+        )
+        results.append({"file": str(path), "imported": count})
+    write_records(results, ("file", "imported"), args.output_format)
+    return 0
+
+
+def cmd_averages(args) -> int:
+    """Print the per-tier averages."""
+    from tower_tracker import data_viewer
+
+    rows = data_viewer.tier_averages()
+    records = [row._asdict() for row in rows]
+    fields = records[0] if records else ("tier",)
+    write_records(records, fields, args.output_format)
+    return 0
+
+
+def cmd_latest_runs(args) -> int:
+    """Print the latest entry of every run, with rates."""
+    # Only the report commands need pandas
+    from tower_tracker import data_viewer
+
+    df = data_viewer.analyze_latest_runs(tier=args.tier, ended=args.ended)
+    write_records(frame_records(df), df.columns, args.output_format)
+    return 0
+
+
+def cmd_top_runs(args) -> int:
+    """Print the runs of a tier with the most coins per hour."""
+    rows = crud.fetch_top_runs(args.tier, args.limit)
+    records = [row._asdict() for row in rows]
+    write_records(records, crud.RunRow._fields, args.output_format)
+    return 0
+
+
+def iso_datetime(value: str) -> datetime:
+    """Parse an ISO date or date-time argument."""
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not an ISO date or date-time: {value!r}")
+
+
+def iso_until(value: str) -> datetime:
+    """Parse --until as an exclusive upper bound; a bare date includes the day."""
+    if len(value) == len("YYYY-MM-DD"):
+        return iso_datetime(value) + timedelta(days=1)
+    return iso_datetime(value) + timedelta(microseconds=1)
+
+
+def cmd_export(args) -> int:
+    """Export entries, optionally filtered and compressed."""
+    with open_output(args.output, args.compress) as out:
+        export_entries(
+            out,
+            args.output_format,
+            include_rates=args.rates,
+            chunk_size=args.chunk_size,
+            run_id=args.run_id,
+            tier=args.tier,
+            first_run=args.from_run,
+            last_run=args.to_run,
+            since=args.since,
+            before=args.until,
+        )
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Return the parser of the command line and its subcommands."""
+    # Shared by every subcommand, so it can follow the subcommand name
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "--output-format",
+        choices=FORMATS,
+        default="json",
+        help="output format (default: json)",
+    )
+
+    parser = argparse.ArgumentParser(
+        prog="tower-tracker", description="Run statistics from the command line."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser(
+        "add", parents=[common], help="add a checkpoint to the active (or a new) run"
+    )
+    add.add_argument(
+        "--run-id",
+        type=int,
+        help="run to add to (default: the active run, else a new one)",
+    )
+    add.add_argument("--tier", type=int, help="required for a new run")
+    add.add_argument("--wave", type=int, required=True)
+    add.add_argument("--coins", required=True, help="e.g. 1.25T")
+    add.add_argument("--cells", type=int, required=True)
+    add.add_argument("--time", required=True, help="hh:mm:ss or seconds")
+    add.add_argument("--notes", default="")
+    add.add_argument(
+        "--end-of-round", action="store_true", help="this entry ends the run"
+    )
+    add.set_defaults(func=cmd_add)
+
+    import_ = commands.add_parser(
+        "import", parents=[common], help="import CSV or JSON Lines files"
+    )
+    import_.add_argument("files", nargs="+", type=Path)
+    import_.add_argument("--format", dest="file_format", choices=("csv", "jsonl"),
+                         help="override the format detected from the extension")
+    import_.add_argument(
+        "--chunk-size", type=int, default=1000, help="records written per transaction"
+    )
+    import_.set_defaults(func=cmd_import)
+
+    averages = commands.add_parser(
+        "averages", parents=[common], help="per-tier averages"
+    )
+    averages.set_defaults(func=cmd_averages)
+
+    latest = commands.add_parser(
+        "latest-runs",
+        parents=[common],
+        help="the latest entry of every run, with rates",
+    )
+    latest.add_argument("--tier", type=int)
+    status = latest.add_mutually_exclusive_group()
+    status.add_argument(
+        "--ended",
+        dest="ended",
+        action="store_const",
+        const=True,
+        help="only ended runs",
+    )
+    status.add_argument(
+        "--open", dest="ended", action="store_const", const=False, help="only open runs"
+    )
+    latest.set_defaults(func=cmd_latest_runs)
+
+    top = commands.add_parser(
+        "top-runs",
+        parents=[common],
+        help="the runs of a tier with the most coins per hour",
+    )
+    top.add_argument("--tier", type=int, required=True)
+    top.add_argument("--limit", type=int, default=10)
+    top.set_defaults(func=cmd_top_runs)
+
+    # Streams rows, so it supports JSON Lines as well
+    export = commands.add_parser(
+        "export", help="stream entries, optionally filtered, with bounded memory"
+    )
+    export.add_argument(
+        "--output-format",
+        choices=EXPORT_FORMATS,
+        default="json",
+        help="output format (default: json)",
+    )
+    export.add_argument("--run-id", type=int)
+    export.add_argument("--tier", type=int)
+    export.add_argument("--from-run", type=int, help="first run id to include")
+    export.add_argument("--to-run", type=int, help="last run id to include")
+    export.add_argument(
+        "--since",
+        type=iso_datetime,
+        help="entries collected at or after this date/time",
+    )
+    export.add_argument(
+        "--until",
+        type=iso_until,
+        help="entries collected up to this date/time (a date is inclusive)",
+    )
+    export.add_argument(
+        "--rates", action="store_true", help="add the per-hour and per-wave rates"
+    )
+    export.add_argument("--output", type=Path, help="file to write (default: stdout)")
+    export.add_argument(
+        "--compress",
+        action="store_true",
+        help="gzip the output (implied by a .gz file name)",
+    )
+    export.add_argument(
+        "--chunk-size", type=int, default=1000, help="rows read and written at a time"
+    )
+    export.set_defaults(func=cmd_export)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the subcommand given on the command line."""
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,42 @@
+"""
+Coin values as the game displays them, with a suffix per power of 1000.
+
+Kept free of UI and NumPy imports so importers and the CLI can parse coin
+values; the vectorized versions live in tower_tracker.ui.utils.
+"""
+import bisect
+import math
+
+# Suffixes used by the game, one per power of 1000: thousands, millions,
+# billions, trillions, quadrillions, quintillions, sextillions, septillions,
+# octillions, nonillions and decillions
+COIN_SUFFIXES = ("", "K", "M", "B", "T", "q", "Q", "s", "S", "O", "N", "D")
+COIN_MULTIPLIERS = {
+    suffix: 1000.0**power for power, suffix in enumerate(COIN_SUFFIXES) if suffix
+}
+
+_SCALE_LIST = [1000.0**power for power in range(len(COIN_SUFFIXES))]
+_THRESHOLD_LIST = _SCALE_LIST[1:]
+
+
+def format_coins(value) -> str:
+    """
+    Format a numeric value into a human-readable format with suffixes.
+
+    For example:
+    - 17090000 -> 17.09M
+    - 1000 -> 1.00K
+    - 999 -> 999.00
+    NaN becomes an empty string and infinities are returned without a suffix.
+    """
+    if not math.isfinite(value):
+        return "" if math.isnan(value) else str(float(value))
+    power = bisect.bisect_right(_THRESHOLD_LIST, value)
+    return f"{value / _SCALE_LIST[power]:.2f}{COIN_SUFFIXES[power]}"
+
+
+def parse_coins(coins_str) -> float:
+    """Parse a string with a suffix (K, M, B, T, q, Q, ...) into a number."""
+    if coins_str[-1] in COIN_MULTIPLIERS:
+        return float(coins_str[:-1]) * COIN_MULTIPLIERS[coins_str[-1]]
+    return float(coins_str)
@@ -1,34 +1,105 @@
-from typing import Any, List, LiteralString, Union
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, Iterable, List, LiteralString, NamedTuple, Optional, Union
 
-from tower_tracker.database import get_session
-from tower_tracker.models.models import RunStatistics
+from sqlalchemy import Select, delete, func, literal, or_, select, tuple_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
-def get_run_tier(run_id: int):
+from tower_tracker.cache import invalidates_cache, query_cache
+from tower_tracker.database import get_session, session_scope
+from tower_tracker.instrumentation import instrumented
+from tower_tracker.models.models import LatestEntry, RunStatistics
+
+
+@instrumented
+@query_cache.cached
+def get_run_tier(run_id: int, session=None):
     """
     Fetches the tier associated with a given run_id.
     Returns the tier if the run_id exists, or None if it does not.
     """
-    with get_session() as session:
+    with session_scope(session) as session:
         run = session.query(RunStatistics).filter_by(run_id=run_id).first()
         return run.tier if run else None
 
-def get_run_status(run_id: int) -> bool:
+@instrumented
+@query_cache.cached
+def get_run_status(run_id: int, session=None) -> bool:
     """
     Checks if the round associated with the given run_id has ended.
     Returns True if the round has ended, False otherwise.
     """
-    with get_session() as session:
+    with session_scope(session) as session:
         run = session.query(RunStatistics).filter_by(run_id=run_id).first()
         return run.end_of_round if run else False
 
-def get_active_run_id():
+@instrumented
+@query_cache.cached
+def get_active_run_id(session=None):
     """
     Returns the current active run_id, or None if no run is active.
     """
-    with get_session() as session:
-        active_run = session.query(RunStatistics).filter_by(end_of_round=False).order_by(RunStatistics.run_id.desc()).first()
-        return active_run.run_id if active_run else None
+    with session_scope(session) as session:
+        # Read off the partial index of open entries
+        return session.scalar(
+            select(func.max(RunStatistics.run_id))
+            .where(RunStatistics.end_of_round == False)  # noqa: E712
+        )
+
+class RunContext(NamedTuple):
+    """Everything a window needs to know about a run before it is drawn."""
+
+    run_id: int  # the requested run, or the active/next run when none was given
+    tier: Optional[int]
+    ended: bool
+    active_run_id: Optional[int]
+    next_run_id: int
+
+@instrumented
+@query_cache.cached
+def get_run_context(run_id: Optional[int] = None, session=None) -> RunContext:
+    """
+    Fetch tier, status, the active run and the next free run_id in one statement.
+
+    Without a run_id, the context is resolved for the active run, or for a new run
+    when no run is active.
+    """
+    # `= 0` rather than `IS 0`, so the partial index on open runs applies
+    active_run_id = (
+        select(func.max(RunStatistics.run_id))
+        .where(RunStatistics.end_of_round == False)  # noqa: E712
+        .scalar_subquery()
+    )
+    last_run_id = select(func.max(RunStatistics.run_id)).scalar_subquery()
+    # The active and next run are computed once, then joined with the run's entries
+    runs = select(
+        active_run_id.label("active_run_id"),
+        (func.coalesce(last_run_id, 0) + 1).label("next_run_id"),
+    ).cte("runs")
+    current_run_id = (
+        func.coalesce(runs.c.active_run_id, runs.c.next_run_id)
+        if run_id is None
+        else literal(run_id)
+    )
+    context = select(
+        current_run_id.label("run_id"), runs.c.active_run_id, runs.c.next_run_id
+    ).cte("context")
 
+    query = (
+        select(
+            context.c.run_id, RunStatistics.tier, RunStatistics.end_of_round,
+            context.c.active_run_id, context.c.next_run_id,
+        )
+        .select_from(context)
+        .outerjoin(RunStatistics, RunStatistics.run_id == context.c.run_id)
+        .limit(1)
+    )
+    with session_scope(session) as session:
+        row = session.execute(query).one()
+    return RunContext(int(row[0]), row[1], bool(row[2]), row[3], row[4])
+
+@instrumented
+@invalidates_cache
 def insert_run(\
     run_id: int,
     tier: int,
@@ -40,69 +111,394 @@ def insert_run(\
     end_of_round: bool,
 ) -> None:
     with get_session() as session:
-        # Check if the run exists
-        existing_run = session.query(RunStatistics).filter_by(run_id=run_id).first()
-
-        # if existing_run:
-        #     # Run exists, ensure it's not ended
-        #     if existing_run.end_of_round:
-        #         raise ValueError(f"Cannot add entries to an ended run (run_id: {run_id}).")
-        # else:
-        #     # If run_id does not exist, assume a new run is being created
-        #     print(f"Creating new run with run_id: {run_id}")
-        new_run = RunStatistics(
-            run_id=run_id,
-            tier=tier,
-            wave=wave,
-            coins=coins,
-            cells=cells,
-            time_spent=time_spent,
-            notes=notes,
-            end_of_round=end_of_round,
+        add_run(
+            session, run_id, tier, wave, coins, cells, time_spent, notes, end_of_round
         )
-        session.add(new_run)
+        session.commit()
 
-        # If this is the end-of-round entry, mark the run as ended
-        if end_of_round:
-            session.query(RunStatistics).filter_by(run_id=run_id).update({"end_of_round": True})
 
-        session.commit()
+def add_run(
+    session,
+    run_id: int,
+    tier: int,
+    wave: int,
+    coins: float,
+    cells: int,
+    time_spent: int,
+    notes: str,
+    end_of_round: bool,
+) -> int:
+    """
+    Do the work of `insert_run` within the caller's transaction.
+
+    The transaction is not committed. Returns the id of the new entry.
+    """
+    new_run = RunStatistics(
+        run_id=run_id,
+        tier=tier,
+        wave=wave,
+        coins=coins,
+        cells=cells,
+        time_spent=time_spent,
+        notes=notes,
+        end_of_round=end_of_round,
+    )
+    session.add(new_run)
+    session.flush()
+
+    # If this is the end-of-round entry, mark the run as ended
+    if end_of_round:
+        session.query(RunStatistics).filter_by(
+            run_id=run_id, end_of_round=False
+        ).update({"end_of_round": True})
+    return new_run.id
+
 
+RUN_FIELDS = (
+    "run_id",
+    "tier",
+    "wave",
+    "coins",
+    "cells",
+    "time_spent",
+    "notes",
+    "end_of_round",
+    "datetime_collected",
+)
 
-def fetch_all_data() -> List[RunStatistics]:
+
+def _upsert_statement():
+    """
+    Build an upsert of run_statistics rows keyed on (run_id, time_spent).
+
+    Re-importing a checkpoint refreshes its values instead of duplicating it; a run
+    that has already ended stays ended.
+    """
+    stmt = sqlite_insert(RunStatistics)
+    return stmt.on_conflict_do_update(
+        index_elements=[RunStatistics.run_id, RunStatistics.time_spent],
+        set_={
+            "tier": stmt.excluded.tier,
+            "wave": stmt.excluded.wave,
+            "coins": stmt.excluded.coins,
+            "cells": stmt.excluded.cells,
+            "notes": stmt.excluded.notes,
+            "end_of_round": or_(RunStatistics.end_of_round, stmt.excluded.end_of_round),
+        },
+    )
+
+@instrumented
+@invalidates_cache
+def insert_runs_bulk(records: Iterable[Dict[str, Any]], chunk_size: int = 1000) -> int:
+    """
+    Upsert many run entries, one transaction and one executemany per chunk.
+
+    Records are dicts keyed like the `insert_run` arguments; `datetime_collected`
+    is optional. End-of-round flags are applied to whole runs in a single pass once
+    every chunk is written. Returns the number of records processed.
+    """
+    statement = _upsert_statement()
+    ended_run_ids = set()
+    count = 0
+    records = iter(records)
     with get_session() as session:
+        while chunk := list(islice(records, chunk_size)):
+            now = datetime.utcnow()
+            rows = []
+            for record in chunk:
+                row = {field: record.get(field) for field in RUN_FIELDS}
+                row["end_of_round"] = bool(row["end_of_round"])
+                row["datetime_collected"] = row["datetime_collected"] or now
+                if row["end_of_round"]:
+                    ended_run_ids.add(row["run_id"])
+                rows.append(row)
+            session.execute(statement, rows)
+            session.commit()
+            count += len(rows)
+
+        ended_run_ids = sorted(ended_run_ids)
+        for start in range(0, len(ended_run_ids), chunk_size):
+            chunk = ended_run_ids[start:start + chunk_size]
+            session.execute(
+                update(RunStatistics)
+                .where(RunStatistics.end_of_round == False)  # noqa: E712
+                .where(RunStatistics.run_id.in_(chunk))
+                .values(end_of_round=True)
+            )
+        session.commit()
+    return count
+
+
+@instrumented
+def fetch_all_data(session=None) -> List[RunStatistics]:
+    """Return every entry."""
+    with session_scope(session) as session:
         return session.query(RunStatistics).all()  # type: ignore
 
-def fetch_all_run_ids() -> List[RunStatistics]:
-    with get_session() as session:
-        return [row[0] for row in session.query(RunStatistics.run_id).distinct().order_by(RunStatistics.run_id).all()]
 
-def fetch_all_runs() -> List[RunStatistics]:
-    with get_session() as session:
-        runs = []
-        for run_id in fetch_all_run_ids():
-            latest_run = session.query(RunStatistics).filter_by(run_id=run_id).order_by(RunStatistics.datetime_collected.desc()).first()
-            if latest_run:
-                runs.append(latest_run)
-        return runs
-
-def fetch_all_entries_for_run(run_id: int) -> List[RunStatistics]:
-    with get_session() as session:
+class RunRow(NamedTuple):
+    """
+    A read-only run_statistics row, including the stored rates.
+
+    The *_rows queries select plain columns into these instead of hydrating
+    RunStatistics instances, skipping the ORM's identity map and attribute
+    instrumentation.
+    """
+
+    id: int
+    run_id: int
+    datetime_collected: datetime
+    tier: int
+    wave: int
+    coins: float
+    cells: int
+    time_spent: int
+    notes: Optional[str]
+    end_of_round: bool
+    coins_per_hour: Optional[float]
+    coins_per_wave: Optional[float]
+    cells_per_hour: Optional[float]
+    cells_per_wave: Optional[float]
+    outlier_score: Optional[float]
+    outlier: bool
+
+
+# The derived rates, generated by SQLite; NULL where no time or no waves were recorded
+RATE_FIELDS = ("coins_per_hour", "coins_per_wave", "cells_per_hour", "cells_per_wave")
+# Scores of the rates against the tier's distribution, see tower_tracker.outliers
+OUTLIER_FIELDS = ("outlier_score", "outlier")
+
+def row_columns(entity=RunStatistics) -> list:
+    """Return the columns of `entity` (RunStatistics or an alias) in RunRow order."""
+    return [getattr(entity, name) for name in RunRow._fields]
+
+def _fetch_rows(session, query) -> List[RunRow]:
+    return list(map(RunRow._make, session.execute(query)))
+
+@instrumented
+def fetch_all_rows(session=None) -> List[RunRow]:
+    """Return every entry as RunRow tuples, ordered by id."""
+    with session_scope(session) as session:
+        return _fetch_rows(session, select(*row_columns()).order_by(RunStatistics.id))
+
+@instrumented
+@query_cache.cached
+def fetch_all_run_ids(session=None) -> List[int]:
+    """Return every run_id, in increasing order."""
+    # latest_entries holds one row per run, keyed by run_id
+    with session_scope(session) as session:
+        query = select(LatestEntry.run_id).order_by(LatestEntry.run_id)
+        return list(session.scalars(query))
+
+def latest_runs_query(
+    tier: Optional[int] = None, ended: Optional[bool] = None, rows: bool = False
+) -> Select:
+    """
+    Build a query selecting the latest entry of every run, ordered by run_id.
+
+    Optionally restricted to a single tier and/or to ended (or still active) runs.
+    With `rows` it selects plain columns in RunRow order instead of the entity.
+    The latest entries are looked up in latest_entries rather than ranked.
+    """
+    query = select(*row_columns()) if rows else select(RunStatistics)
+    query = query.join(LatestEntry, LatestEntry.entry_id == RunStatistics.id)
+    if tier is not None:
+        query = query.where(RunStatistics.tier == tier)
+    if ended is not None:
+        query = query.where(RunStatistics.end_of_round == ended)
+    return query.order_by(LatestEntry.run_id)
+
+@instrumented
+@query_cache.cached
+def fetch_all_runs(
+    tier: Optional[int] = None, ended: Optional[bool] = None, session=None
+) -> List[RunStatistics]:
+    """Return the latest entry of every run in a single query."""
+    with session_scope(session) as session:
+        return list(session.scalars(latest_runs_query(tier=tier, ended=ended)))
+
+@instrumented
+@query_cache.cached
+def fetch_run_rows(
+    tier: Optional[int] = None, ended: Optional[bool] = None, session=None
+) -> List[RunRow]:
+    """Return the same entries as `fetch_all_runs`, as RunRow tuples."""
+    with session_scope(session) as session:
+        query = latest_runs_query(tier=tier, ended=ended, rows=True)
+        return _fetch_rows(session, query)
+
+
+@instrumented
+@query_cache.cached
+def fetch_all_entries_for_run(run_id: int, session=None) -> List[RunStatistics]:
+    """Return the entries of a run, in collection order."""
+    with session_scope(session) as session:
         return session.query(RunStatistics).filter_by(run_id=run_id).order_by(RunStatistics.datetime_collected).all()  # type: ignore
 
+def entries_for_run_query(run_id: int, columns=None) -> Select:
+    """
+    Build a query selecting the entries of a run, in collection order.
 
+    It selects the RunRow columns unless `columns` are given.
+    """
+    return (
+        select(*(columns or row_columns()))
+        .where(RunStatistics.run_id == run_id)
+        .order_by(RunStatistics.datetime_collected)
+    )
+
+@instrumented
+@query_cache.cached
+def fetch_entry_rows(run_id: int, session=None) -> List[RunRow]:
+    """Return the same entries as `fetch_all_entries_for_run`, as RunRow tuples."""
+    with session_scope(session) as session:
+        return _fetch_rows(session, entries_for_run_query(run_id))
+
+@instrumented
+@query_cache.cached
+def fetch_top_runs(tier: int, limit: int = 10, session=None) -> List[RunRow]:
+    """
+    Return the `limit` runs of `tier` with the highest coins per hour.
+
+    Each run is represented by its best entry, best first. Walks the (tier,
+    coins_per_hour) index downwards and stops once enough distinct runs were
+    seen, so no sort or full scan is needed.
+    """
+    query = (
+        select(*row_columns())
+        .where(RunStatistics.tier == tier, RunStatistics.coins_per_hour.is_not(None))
+        .order_by(RunStatistics.coins_per_hour.desc())
+        .execution_options(yield_per=max(limit, 1) * 4)
+    )
+    best = {}
+    with session_scope(session) as session:
+        for row in session.execute(query):
+            if len(best) >= limit:
+                break
+            best.setdefault(row.run_id, RunRow._make(row))
+    return list(best.values())
+
+
+# Columns a page of entries can be ordered by
+PAGE_ORDER_COLUMNS = (
+    "id", "run_id", "tier", "wave", "coins", "cells", "time_spent", "notes",
+    "end_of_round", "datetime_collected",
+) + RATE_FIELDS + OUTLIER_FIELDS
+
+def _page_source(
+    order_by: str = "id", run_id: Optional[int] = None, latest_only: bool = False,
+    outliers_only: bool = False,
+):
+    """Return the unordered query a page is cut from and the column it sorts on."""
+    if order_by not in PAGE_ORDER_COLUMNS:
+        raise ValueError(f"Cannot order entries by {order_by!r}")
+    query = select(*row_columns())
+    key = getattr(RunStatistics, order_by)
+    if latest_only and order_by == "run_id":
+        # Pages of runs are read straight off latest_entries' primary key
+        query = query.select_from(LatestEntry).join(
+            RunStatistics, RunStatistics.id == LatestEntry.entry_id
+        )
+        key = LatestEntry.run_id
+    elif latest_only:
+        query = query.where(RunStatistics.id.in_(select(LatestEntry.entry_id)))
+    if run_id is not None:
+        query = query.where(RunStatistics.run_id == run_id)
+    if outliers_only:
+        query = query.where(RunStatistics.outlier == True)  # noqa: E712
+    return query, key
+
+def _after(key, nullable: bool, descending: bool, after: tuple):
+    """
+    Return the condition keeping the entries past the keyset position `after`.
+
+    SQLite sorts NULL first, so the order is the one an index on the column
+    gives; row-value comparisons never match NULL, so nullable columns spell the
+    NULLs out.
+    """
+    position = tuple_(key, RunStatistics.id)
+    past = position < tuple_(*after) if descending else position > tuple_(*after)
+    if not nullable:
+        return past
+    value, entry_id = after
+    past_id = RunStatistics.id < entry_id if descending else RunStatistics.id > entry_id
+    if value is None:
+        nulls = key.is_(None) & past_id
+        return nulls if descending else or_(nulls, key.is_not(None))
+    return or_(past, key.is_(None)) if descending else past
+
+
+def page_key(row: RunRow, order_by: str = "id") -> tuple:
+    """Return the keyset position of `row`, to pass as `after` for the next page."""
+    return (getattr(row, order_by), row.id)
+
+@instrumented
+@query_cache.cached
+def fetch_page(
+    order_by: str = "id",
+    descending: bool = False,
+    after: Optional[tuple] = None,
+    offset: int = 0,
+    limit: int = 100,
+    run_id: Optional[int] = None,
+    latest_only: bool = False,
+    outliers_only: bool = False,
+    session=None,
+) -> List[RunRow]:
+    """
+    Fetch one page of entries as RunRow tuples.
+
+    Entries are ordered by `order_by`, ties broken by id. Pass the `page_key` of
+    the previous page's last row as `after` to seek straight to the next page;
+    `offset` is only meant for jumping to an arbitrary position. Entries without
+    a value come first, or last when `descending`.
+    Restrict to one run with `run_id`, or to the latest entry of each run with
+    `latest_only`; `outliers_only` keeps the entries flagged as outliers.
+    """
+    query, key = _page_source(order_by, run_id, latest_only, outliers_only)
+    if after is not None:
+        nullable = RunStatistics.__table__.c[order_by].nullable
+        query = query.where(_after(key, nullable, descending, after))
+    ordering = (
+        (key.desc(), RunStatistics.id.desc()) if descending else (key, RunStatistics.id)
+    )
+    query = query.order_by(*ordering).offset(offset).limit(limit)
+    with session_scope(session) as session:
+        return _fetch_rows(session, query)
+
+@instrumented
+@query_cache.cached
+def count_rows(
+    run_id: Optional[int] = None, latest_only: bool = False,
+    outliers_only: bool = False, session=None,
+) -> int:
+    """Count the entries `fetch_page` pages through."""
+    query, _ = _page_source(
+        run_id=run_id, latest_only=latest_only, outliers_only=outliers_only
+    )
+    with session_scope(session) as session:
+        return session.execute(
+            select(func.count()).select_from(query.subquery())
+        ).scalar_one()
+
+
+@instrumented
+@invalidates_cache
 def delete_data(entry_id: Union[Any | LiteralString]) -> bool:
     """
     Deletes a specific run entry by ID.
     """
     with get_session() as session:
-        try:
-            run = session.query(RunStatistics).filter_by(id=entry_id).first()
-            if run:
-                session.delete(run)
-                session.commit()
-                return True
-            return False
-        except Exception as e:
-            session.rollback()
-            raise e
+        deleted = remove_entry(session, entry_id)
+        session.commit()
+        return deleted
+
+def remove_entry(session, entry_id: int) -> bool:
+    """
+    Do the work of `delete_data` within the caller's transaction.
+
+    The transaction is not committed. The row is deleted without being read
+    first, so the transaction starts out as a write.
+    """
+    result = session.execute(delete(RunStatistics).where(RunStatistics.id == entry_id))
+    return result.rowcount > 0
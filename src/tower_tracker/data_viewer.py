@@ -1,26 +1,103 @@
 import pandas as pd
-from sqlalchemy import func
+from sqlalchemy import func, select
 
-from tower_tracker.database import get_session
-from tower_tracker.models.models import RunStatistics
+from tower_tracker.cache import query_cache
+from tower_tracker.crud import latest_runs_query
+from tower_tracker.database import get_session, session_scope
+from tower_tracker.instrumentation import instrumented
+from tower_tracker.models.models import RunStatistics, TierStats
+from tower_tracker.snapshot import SELECTED, frame_dtypes
 
 
-def generate_new_run_id():
+@instrumented
+@query_cache.cached
+def generate_new_run_id(session=None):
     """
     Generate a new run_id based on the highest existing run_id.
     """
-    with get_session() as session:
+    with session_scope(session) as session:
         result = session.query(func.max(RunStatistics.run_id)).scalar()
         return (result or 0) + 1
 
-def analyze_data():
+def _fresh_snapshot():
+    """Return the manifest when a columnar snapshot matches the database."""
+    from tower_tracker import snapshot
+
+    if not snapshot.snapshot_is_fresh():
+        return None
+    return snapshot.read_manifest(snapshot.default_directory())
+
+@instrumented
+def analyze_data(use_snapshot=True):
     """
-    Analyzes data from the database and calculates additional statistics.
+    Read every entry, with its stored rates, into a DataFrame.
+
+    Rates are NaN where undefined. Reads the columnar snapshot instead of SQLite
+    when it is up to date; both give the same columns and dtypes.
     """
+    if use_snapshot and _fresh_snapshot() is not None:
+        from tower_tracker.snapshot import load_snapshot
+
+        return load_snapshot()
+
     with get_session() as session:
-        df = pd.read_sql_query("SELECT * FROM run_statistics", session.bind)
-        df["coins_per_hour"] = df["coins"] / (df["time_spent"] / 3600)
-        df["coins_per_wave"] = df["coins"] / df["wave"]
-        df["cells_per_hour"] = df["cells"] / (df["time_spent"] / 3600)
-        df["cells_per_wave"] = df["cells"] / df["wave"]
+        query = select(*SELECTED).order_by(RunStatistics.id)
+        return frame_dtypes(pd.read_sql_query(query, session.bind))
+
+@instrumented
+def analyze_latest_runs(tier=None, ended=None, use_snapshot=True):
+    """Read the latest entry of every run, like `analyze_data`."""
+    manifest = _fresh_snapshot() if use_snapshot else None
+    if manifest is not None:
+        from tower_tracker.snapshot import load_snapshot
+
+        partitions = (
+            [tier] if tier is not None and manifest["partition_by"] == "tier" else None
+        )
+        df = load_snapshot(partitions=partitions)
+        if tier is not None:
+            df = df[df["tier"] == tier]
+        df = (
+            df.sort_values(["run_id", "datetime_collected", "id"])
+            .drop_duplicates("run_id", keep="last")
+            .reset_index(drop=True)
+        )
+        if ended is not None:
+            df = df[df["end_of_round"] == ended].reset_index(drop=True)
         return df
+
+    with get_session() as session:
+        query = latest_runs_query(tier=tier, ended=ended)
+        return frame_dtypes(pd.read_sql_query(query, session.bind))
+
+@instrumented
+def tier_averages():
+    """
+    Read the per-tier averages of wave and of every derived rate.
+
+    They come from the tier_stats rollup, an O(tiers) read. Tiers without
+    entries are left out.
+    """
+    metrics = (
+        "wave",
+        "coins_per_hour",
+        "coins_per_wave",
+        "cells_per_hour",
+        "cells_per_wave",
+    )
+    query = (
+        select(
+            TierStats.tier,
+            *(
+                (
+                    getattr(TierStats, f"{name}_sum")
+                    / func.nullif(getattr(TierStats, f"{name}_n"), 0)
+                ).label(f"avg_{name}")
+                for name in metrics
+            ),
+        )
+        .where(TierStats.entries > 0)
+        .order_by(TierStats.tier)
+    )
+    with get_session() as session:
+        return session.execute(query).all()
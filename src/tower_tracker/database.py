@@ -1,22 +1,100 @@
 # database.py
+import os
+import threading
 from contextlib import contextmanager
+from functools import partial
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 # Define the base model for SQLAlchemy ORM
 Base = declarative_base()
 
-# Create the database engine
-DATABASE_URL = "sqlite:///game_stats.db"  # Replace with your actual database URL
-engine = create_engine(DATABASE_URL, echo=False)  # Set echo=True for debugging
+# The database URL can be overridden through the environment
+DATABASE_URL = os.environ.get("TOWER_TRACKER_DATABASE_URL", "sqlite:///game_stats.db")
 
-# Create a configured "Session" class
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+# PRAGMAs applied to every new SQLite connection. Each one can be overridden with
+# TOWER_TRACKER_SQLITE_<NAME> (e.g. TOWER_TRACKER_SQLITE_MMAP_SIZE=0); an empty value
+# leaves SQLite's default in place.
+DEFAULT_SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",  # readers no longer block behind a writer
+    "synchronous": "NORMAL",  # safe with WAL, fsyncs only at checkpoints
+    "mmap_size": str(256 * 1024 * 1024),
+    "cache_size": str(-64 * 1024),  # negative values are KiB, so 64 MiB
+    "temp_store": "MEMORY",
+    "busy_timeout": "5000",  # milliseconds to wait on a locked database
+}
+
+
+def sqlite_pragmas_from_env(environ=os.environ) -> dict:
+    """Return the SQLite PRAGMAs to apply, with environment overrides applied."""
+    pragmas = {}
+    for name, default in DEFAULT_SQLITE_PRAGMAS.items():
+        value = environ.get(f"TOWER_TRACKER_SQLITE_{name.upper()}", default)
+        if value:
+            pragmas[name] = value
+    return pragmas
+
+
+SQLITE_PRAGMAS = sqlite_pragmas_from_env()
+
+
+def _apply_sqlite_pragmas(pragmas, dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+    finally:
+        cursor.close()
+
+
+def create_db_engine(url=DATABASE_URL, pragmas=None, **kwargs):
+    """
+    Create an engine, tuning every new SQLite connection with `pragmas`.
+
+    `pragmas` defaults to SQLITE_PRAGMAS; pass an empty dict to keep SQLite's
+    defaults.
+    """
+    engine = create_engine(url, echo=False, **kwargs)  # Set echo=True for debugging
+    pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+    if engine.dialect.name == "sqlite" and pragmas:
+        event.listen(engine, "connect", partial(_apply_sqlite_pragmas, dict(pragmas)))
+    return engine
+
+
+# The database engine, created on first use by `get_engine` so that importing
+# the package stays cheap
+engine = None
+_engine_lock = threading.Lock()
+
+# Create a configured "Session" class; it is bound once the engine exists
+SessionLocal = sessionmaker(autoflush=False, autocommit=False)
+
+
+def configure_database(url=DATABASE_URL, pragmas=None, **kwargs):
+    """
+    Point the application at another database, e.g. for tests or benchmarks.
+
+    Returns the new engine.
+    """
+    global engine
+    engine = create_db_engine(url, pragmas=pragmas, **kwargs)
+    SessionLocal.configure(bind=engine)
+    return engine
+
+
+def get_engine():
+    """Return the application's engine, creating it from DATABASE_URL on first use."""
+    if engine is None:
+        with _engine_lock:
+            if engine is None:
+                configure_database(DATABASE_URL)
+    return engine
 
 
 @contextmanager
 def get_session():
+    get_engine()
     session = SessionLocal()
     try:
         yield session
@@ -25,3 +103,17 @@ def get_session():
         raise
     finally:
         session.close()
+
+
+@contextmanager
+def session_scope(session=None):
+    """
+    Yield `session`, or a new session for the duration of the block.
+
+    Passing a session lets callers share it across several queries.
+    """
+    if session is not None:
+        yield session
+    else:
+        with get_session() as new_session:
+            yield new_session
@@ -0,0 +1,159 @@
+"""
+Streaming export of run_statistics as CSV, JSON or JSON Lines.
+
+The output is optionally gzip compressed. Entries are read with `yield_per`, so
+only one chunk of rows is buffered at a time (SQLite steps its cursor as rows are
+fetched), and each chunk is written out before the next one is read, which keeps
+memory flat however large the table is.
+"""
+import csv
+import gzip
+import io
+import json
+import math
+import sys
+from contextlib import contextmanager
+from datetime import date, datetime
+from pathlib import Path
+from typing import Iterator, List, Optional, TextIO
+
+from sqlalchemy import select
+
+from tower_tracker.crud import OUTLIER_FIELDS, RATE_FIELDS, RunRow
+from tower_tracker.database import session_scope
+from tower_tracker.models.models import RunStatistics
+
+EXPORT_FORMATS = ("csv", "json", "jsonl")
+# The recorded entry columns, without the generated rates and the outlier scores
+ENTRY_FIELDS = tuple(
+    field for field in RunRow._fields if field not in RATE_FIELDS + OUTLIER_FIELDS
+)
+CHUNK_SIZE = 1000
+
+
+def json_value(value):
+    """Return `value` as JSON can hold it: ISO dates, null for NaN and infinities."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def export_query(
+    include_rates: bool = False,
+    run_id: Optional[int] = None,
+    tier: Optional[int] = None,
+    first_run: Optional[int] = None,
+    last_run: Optional[int] = None,
+    since: Optional[datetime] = None,
+    before: Optional[datetime] = None,
+):
+    """
+    Select the ENTRY_FIELDS (and RATE_FIELDS) of the matching entries, by id.
+
+    The run range is inclusive; entries are collected at or after `since`
+    and before `before`.
+    """
+    fields = ENTRY_FIELDS + RATE_FIELDS if include_rates else ENTRY_FIELDS
+    columns = (getattr(RunStatistics, field) for field in fields)
+    query = select(*columns).order_by(RunStatistics.id)
+    if run_id is not None:
+        query = query.where(RunStatistics.run_id == run_id)
+    if tier is not None:
+        query = query.where(RunStatistics.tier == tier)
+    if first_run is not None:
+        query = query.where(RunStatistics.run_id >= first_run)
+    if last_run is not None:
+        query = query.where(RunStatistics.run_id <= last_run)
+    if since is not None:
+        query = query.where(RunStatistics.datetime_collected >= since)
+    if before is not None:
+        query = query.where(RunStatistics.datetime_collected < before)
+    return query
+
+
+def iter_chunks(
+    query, chunk_size: int = CHUNK_SIZE, session=None
+) -> Iterator[List[tuple]]:
+    """Yield the rows of `query` as lists of at most `chunk_size` tuples."""
+    with session_scope(session) as session:
+        result = session.execute(query.execution_options(yield_per=chunk_size))
+        for partition in result.partitions():
+            yield [tuple(row) for row in partition]
+
+
+def write_chunks(chunks, fields, output_format: str, out: TextIO) -> int:
+    """Write chunks of row tuples as `output_format`; return the number of rows."""
+    count = 0
+    if output_format == "csv":
+        writer = csv.writer(out, lineterminator="\n")
+        writer.writerow(fields)
+        for rows in chunks:
+            writer.writerows(rows)
+            count += len(rows)
+        return count
+
+    # JSON arrays are written element by element, like JSON Lines
+    lines = output_format == "jsonl"
+    if not lines:
+        out.write("[")
+    for rows in chunks:
+        for row in rows:
+            record = json.dumps(
+                {field: json_value(value) for field, value in zip(fields, row)}
+            )
+            if lines:
+                out.write(record + "\n")
+            else:
+                out.write((", " if count else "") + record)
+            count += 1
+    if not lines:
+        out.write("]\n")
+    return count
+
+
+@contextmanager
+def open_output(
+    path: Optional[Path] = None, compress: bool = False
+) -> Iterator[TextIO]:
+    """
+    Open `path` (stdout when None) for text output.
+
+    The output is gzip compressed when asked to or when the file name ends in .gz.
+    """
+    if path is not None:
+        if compress or path.suffix == ".gz":
+            with gzip.open(path, "wt", encoding="utf-8", newline="") as out:
+                yield out
+        else:
+            with open(path, "w", encoding="utf-8", newline="") as out:
+                yield out
+    elif compress:
+        # Closing the wrapper flushes the gzip trailer but leaves stdout open
+        with io.TextIOWrapper(
+            gzip.GzipFile(fileobj=sys.stdout.buffer, mode="wb"),
+            encoding="utf-8",
+            newline="",
+        ) as out:
+            yield out
+    else:
+        yield sys.stdout
+
+
+def export_entries(
+    out: TextIO,
+    output_format: str = "csv",
+    include_rates: bool = False,
+    chunk_size: int = CHUNK_SIZE,
+    session=None,
+    **filters,
+) -> int:
+    """
+    Stream the entries matching `filters` (see `export_query`) to `out`.
+
+    Returns the number of entries written.
+    """
+    chunks = iter_chunks(export_query(include_rates, **filters), chunk_size, session)
+    fields = ENTRY_FIELDS + RATE_FIELDS if include_rates else ENTRY_FIELDS
+    return write_chunks(chunks, fields, output_format, out)
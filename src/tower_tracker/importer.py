@@ -0,0 +1,96 @@
+"""
+Imports logged checkpoints from CSV or JSON Lines files.
+
+Usage: python -m tower_tracker.importer checkpoints.csv [more.jsonl ...]
+"""
+import argparse
+import csv
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from tower_tracker.coins import parse_coins
+from tower_tracker.crud import insert_runs_bulk
+
+TRUE_VALUES = {"1", "true", "t", "yes", "y"}
+
+
+def parse_time_spent(value) -> int:
+    """Parse a duration given in seconds or as hh:mm:ss."""
+    if isinstance(value, str) and ":" in value:
+        return sum(x * int(t) for x, t in zip([3600, 60, 1], value.split(":")))
+    return int(value)
+
+
+def parse_record(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a raw CSV/JSON record into the record `insert_runs_bulk` expects."""
+    coins = raw["coins"]
+    end_of_round = raw.get("end_of_round") or False
+    if isinstance(end_of_round, str):
+        end_of_round = end_of_round.strip().lower() in TRUE_VALUES
+    collected = raw.get("datetime_collected") or None
+    if isinstance(collected, str):
+        collected = datetime.fromisoformat(collected)
+
+    return {
+        "run_id": int(raw["run_id"]),
+        "tier": int(raw["tier"]),
+        "wave": int(raw["wave"]),
+        "coins": parse_coins(coins) if isinstance(coins, str) else float(coins),
+        "cells": int(raw["cells"]),
+        "time_spent": parse_time_spent(raw["time_spent"]),
+        "notes": raw.get("notes") or "",
+        "end_of_round": bool(end_of_round),
+        "datetime_collected": collected,
+    }
+
+
+def read_records(
+    path: Path, file_format: Optional[str] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream parsed records from a CSV or JSON Lines file, one line at a time.
+
+    The format is taken from the file extension unless given explicitly.
+    """
+    file_format = file_format or ("csv" if path.suffix.lower() == ".csv" else "jsonl")
+    with path.open(newline="") as f:
+        if file_format == "csv":
+            for raw in csv.DictReader(f):
+                yield parse_record(raw)
+        else:
+            for line in f:
+                if line.strip():
+                    yield parse_record(json.loads(line))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Import the files named on the command line."""
+    parser = argparse.ArgumentParser(
+        description="Import checkpoints into the run statistics database."
+    )
+    parser.add_argument(
+        "files", nargs="+", type=Path, help="CSV or JSON Lines files to import"
+    )
+    parser.add_argument(
+        "--format",
+        choices=("csv", "jsonl"),
+        help="override the format detected from the extension",
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=1000, help="records written per transaction"
+    )
+    args = parser.parse_args(argv)
+
+    for path in args.files:
+        count = insert_runs_bulk(
+            read_records(path, args.format), chunk_size=args.chunk_size
+        )
+        print(f"{path}: imported {count} records")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
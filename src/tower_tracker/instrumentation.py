@@ -0,0 +1,239 @@
+"""
+Query and function timing instrumentation.
+
+When enabled, SQLAlchemy cursor events time every statement, `@instrumented`
+times the crud and analytics functions, and sessions touching the database are
+counted. Each statement and function gets a latency histogram and a row count.
+When disabled, no event listeners are installed and `@instrumented` adds a single
+attribute check per call.
+
+Enable with TOWER_TRACKER_INSTRUMENTATION=1 (and set TOWER_TRACKER_INSTRUMENTATION_DUMP
+to a path to write a JSON report at exit), with `recorder.enable()`, or from the
+Diagnostics window.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in milliseconds, doubling from 0.05 ms to ~26 s
+BUCKETS_MS = tuple(0.05 * 2**i for i in range(20))
+
+
+class Histogram:
+    """
+    Latency histogram with fixed logarithmic buckets.
+
+    Percentiles are reported as the upper bound of the bucket they fall in
+    (capped at the maximum seen).
+    """
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+
+    def observe(self, ms, rows=0) -> None:
+        """Count one call taking `ms` milliseconds and returning `rows` rows."""
+        self.counts[bisect_left(BUCKETS_MS, ms)] += 1
+        self.calls += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.rows += rows
+
+    def percentile(self, fraction) -> float:
+        """Return the upper bound of the bucket holding the `fraction` quantile."""
+        if not self.calls:
+            return 0.0
+        rank = fraction * self.calls
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def to_dict(self) -> dict:
+        """Return the counts and summary statistics as a plain dict."""
+        return {
+            "calls": self.calls,
+            "total_ms": self.total_ms,
+            "mean_ms": self.total_ms / self.calls if self.calls else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "max_ms": self.max_ms,
+            "rows": self.rows,
+            "buckets_ms": {
+                f"{bound:g}": count
+                for bound, count in zip(BUCKETS_MS, self.counts)
+                if count
+            },
+            "over_ms": self.counts[-1],
+        }
+
+
+class Recorder:
+    """Collects statement and function histograms and session counts."""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Discard everything collected so far."""
+        with self._lock:
+            self.statements = {}
+            self.functions = {}
+            self.sessions = 0
+            self.started = time.time()
+
+    def enable(self) -> None:
+        """Start timing statements and counting sessions."""
+        if self.enabled:
+            return
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Session, "after_begin", _after_begin)
+        self.enabled = True
+
+    def disable(self) -> None:
+        """Stop timing statements and counting sessions."""
+        if not self.enabled:
+            return
+        self.enabled = False
+        event.remove(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.remove(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.remove(Session, "after_begin", _after_begin)
+
+    def _observe(self, table, key, ms, rows) -> None:
+        with self._lock:
+            histogram = table.get(key)
+            if histogram is None:
+                histogram = table[key] = Histogram()
+            histogram.observe(ms, rows)
+
+    def record_statement(self, statement, ms, rows) -> None:
+        """Record one execution of a SQL statement."""
+        self._observe(self.statements, " ".join(statement.split()), ms, rows)
+
+    def record_function(self, name, ms, rows) -> None:
+        """Record one call of an instrumented function."""
+        self._observe(self.functions, name, ms, rows)
+
+    def record_session(self) -> None:
+        """Count one session transaction."""
+        with self._lock:
+            self.sessions += 1
+
+    def snapshot(self) -> dict:
+        """Return the collected data as plain dicts, slowest (by total time) first."""
+        with self._lock:
+            def ordered(table):
+                items = sorted(
+                    table.items(), key=lambda item: item[1].total_ms, reverse=True
+                )
+                return {key: histogram.to_dict() for key, histogram in items}
+
+            return {
+                "enabled": self.enabled,
+                "seconds": time.time() - self.started,
+                "sessions": self.sessions,
+                "functions": ordered(self.functions),
+                "statements": ordered(self.statements),
+            }
+
+    def dump_json(self, path) -> None:
+        """Write the snapshot to `path` as JSON."""
+        with open(path, "w", encoding="utf-8") as out:
+            json.dump(self.snapshot(), out, indent=2)
+
+    def log_summary(self, top=10, level=logging.INFO) -> None:
+        """Log the `top` slowest functions and statements."""
+        snapshot = self.snapshot()
+        logger.log(
+            level, "%d sessions in %.1fs", snapshot["sessions"], snapshot["seconds"]
+        )
+        for kind in ("functions", "statements"):
+            for name, stats in list(snapshot[kind].items())[:top]:
+                logger.log(
+                    level, "%s: %d calls, %.1f ms total, p95 %.2f ms, %d rows: %s",
+                    kind, stats["calls"], stats["total_ms"], stats["p95_ms"],
+                    stats["rows"], name[:200],
+                )
+
+
+recorder = Recorder()
+
+
+def _before_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+) -> None:
+    conn.info.setdefault("instrumentation_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+) -> None:
+    starts = conn.info.get("instrumentation_start")
+    if not starts:
+        # Enabled while the statement was running
+        return
+    ms = (time.perf_counter() - starts.pop()) * 1000
+    # SELECT row counts are not known at this point (-1); functions report those
+    recorder.record_statement(statement, ms, max(cursor.rowcount, 0))
+
+
+def _after_begin(session, transaction, connection) -> None:
+    if not session.info.get("instrumented"):
+        session.info["instrumented"] = True
+        recorder.record_session()
+
+
+def _result_rows(result) -> int:
+    if isinstance(result, list):
+        return len(result)
+    shape = getattr(result, "shape", None)  # DataFrames and arrays
+    return shape[0] if shape else 0
+
+
+def instrumented(func):
+    """
+    Time a function while instrumentation is enabled.
+
+    The row count of list and DataFrame results is recorded too.
+    """
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not recorder.enabled:
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        recorder.record_function(
+            name, (time.perf_counter() - start) * 1000, _result_rows(result)
+        )
+        return result
+
+    return wrapper
+
+
+if os.environ.get("TOWER_TRACKER_INSTRUMENTATION", "") not in ("", "0"):
+    recorder.enable()
+    if os.environ.get("TOWER_TRACKER_INSTRUMENTATION_DUMP"):
+        atexit.register(
+            recorder.dump_json, os.environ["TOWER_TRACKER_INSTRUMENTATION_DUMP"]
+        )
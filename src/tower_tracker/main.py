@@ -1,19 +1,57 @@
+import importlib
 import tkinter as tk
 
-from tower_tracker.ui.windows import show_averages, show_data_viewer
+from tower_tracker.ui import tasks
+
+# Imported lazily: it pulls in NumPy and the SQLAlchemy data layer
+WINDOWS_MODULE = "tower_tracker.ui.windows"
+
+
+def open_view(name, module=WINDOWS_MODULE):
+    """
+    Return a button command opening the view `name` of `module`.
+
+    The module (ui.windows by default) is imported on first use.
+    """
+
+    def command() -> None:
+        getattr(importlib.import_module(module), name)()
+
+    return command
 
 
 def main() -> None:
     root = tk.Tk()
     root.title("Game Statistics Tracker")
 
+    # Database work from the windows runs on a thread pool
+    runner = tasks.start(root)
+
     # Button to show data viewer
-    tk.Button(root, text="View Data", command=show_data_viewer).pack(pady=10)
+    tk.Button(
+        root, text="View Data", command=open_view("show_data_viewer")
+    ).pack(pady=10)
 
     # Button to show averages
-    tk.Button(root, text="Show Averages", command=show_averages, width=20).pack(pady=10)
-
-    root.mainloop()
+    tk.Button(
+        root, text="Show Averages", command=open_view("show_averages"), width=20
+    ).pack(pady=10)
+
+    # Button to show query and function timings
+    tk.Button(
+        root,
+        text="Diagnostics",
+        command=open_view("show_diagnostics", "tower_tracker.ui.diagnostics"),
+    ).pack(pady=10)
+
+    # Once the main window is up, import the views in the background so the first
+    # click does not wait for them
+    root.after_idle(lambda: runner.submit(importlib.import_module, WINDOWS_MODULE))
+
+    try:
+        root.mainloop()
+    finally:
+        runner.shutdown()
 
 
 if __name__ == "__main__":
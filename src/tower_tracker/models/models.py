@@ -1,6 +1,17 @@
 from datetime import datetime
 
-from sqlalchemy import Boolean, Column, DateTime, Float, Integer, String
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Computed,
+    DateTime,
+    Float,
+    Index,
+    Integer,
+    String,
+    Text,
+    text,
+)
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
@@ -8,6 +19,25 @@ Base = declarative_base()
 
 class RunStatistics(Base):  # ignore: type
     __tablename__ = "run_statistics"
+    __table_args__ = (
+        Index(
+            "ix_run_statistics_run_id_datetime_collected",
+            "run_id",
+            "datetime_collected",
+        ),
+        Index(
+            "ix_run_statistics_open_runs",
+            "run_id",
+            sqlite_where=text("end_of_round = 0"),
+        ),
+        Index(
+            "uq_run_statistics_run_id_time_spent", "run_id", "time_spent", unique=True
+        ),
+        Index("ix_run_statistics_tier_coins_per_hour", "tier", "coins_per_hour"),
+        Index("ix_run_statistics_outliers", "run_id", sqlite_where=text("outlier = 1")),
+    )
+    # The generated rates are loaded when accessed, not RETURNed by every INSERT
+    __mapper_args__ = {"eager_defaults": False}
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     run_id = Column(Integer, nullable=False)
@@ -19,3 +49,160 @@ class RunStatistics(Base):  # ignore: type
     time_spent = Column(Integer, nullable=False)  # in seconds
     notes = Column(String, nullable=True)
     end_of_round = Column(Boolean, default=False, nullable=False)
+
+    # Derived rates, stored by SQLite; NULL when no time or no waves were recorded
+    coins_per_hour = Column(
+        Float,
+        Computed(
+            "CASE WHEN time_spent > 0 THEN coins / (time_spent / 3600.0) END",
+            persisted=True,
+        ),
+    )
+    coins_per_wave = Column(
+        Float, Computed("CASE WHEN wave > 0 THEN coins / wave END", persisted=True)
+    )
+    cells_per_hour = Column(
+        Float,
+        Computed(
+            "CASE WHEN time_spent > 0 THEN cells / (time_spent / 3600.0) END",
+            persisted=True,
+        ),
+    )
+    cells_per_wave = Column(
+        Float,
+        Computed("CASE WHEN wave > 0 THEN cells * 1.0 / wave END", persisted=True),
+    )
+
+    # Set by triggers and tower_tracker.outliers against the tier's reference
+    # statistics; the score is NULL until the tier has them
+    outlier_score = Column(Float, nullable=True)
+    outlier = Column(Boolean, default=False, server_default=text("0"), nullable=False)
+
+
+class TierStats(Base):
+    """
+    Per-tier rollup of run_statistics, kept up to date by SQLite triggers.
+
+    For every metric it holds the number of non-null values, their sum and their
+    sum of squares, so means and variances can be read without a table scan.
+    """
+
+    __tablename__ = "tier_stats"
+
+    tier = Column(Integer, primary_key=True)
+    entries = Column(Integer, default=0, nullable=False)
+    wave_n = Column(Integer, default=0, nullable=False)
+    wave_sum = Column(Float, default=0, nullable=False)
+    wave_sumsq = Column(Float, default=0, nullable=False)
+    coins_per_hour_n = Column(Integer, default=0, nullable=False)
+    coins_per_hour_sum = Column(Float, default=0, nullable=False)
+    coins_per_hour_sumsq = Column(Float, default=0, nullable=False)
+    coins_per_wave_n = Column(Integer, default=0, nullable=False)
+    coins_per_wave_sum = Column(Float, default=0, nullable=False)
+    coins_per_wave_sumsq = Column(Float, default=0, nullable=False)
+    cells_per_hour_n = Column(Integer, default=0, nullable=False)
+    cells_per_hour_sum = Column(Float, default=0, nullable=False)
+    cells_per_hour_sumsq = Column(Float, default=0, nullable=False)
+    cells_per_wave_n = Column(Integer, default=0, nullable=False)
+    cells_per_wave_sum = Column(Float, default=0, nullable=False)
+    cells_per_wave_sumsq = Column(Float, default=0, nullable=False)
+
+
+class TierSketch(Base):
+    """
+    A t-digest (as JSON) of one metric over the ended runs of a tier.
+
+    See tower_tracker.sketches.
+    """
+
+    __tablename__ = "tier_sketches"
+
+    tier = Column(Integer, primary_key=True)
+    metric = Column(String, primary_key=True)
+    count = Column(Integer, default=0, nullable=False)
+    digest = Column(Text, nullable=False)
+
+
+class TierSketchPending(Base):
+    """
+    Runs that ended since the sketches were last updated, queued by triggers.
+
+    Rows without a run_id ask for the tier's sketches to be rebuilt.
+    """
+
+    __tablename__ = "tier_sketch_pending"
+    __table_args__ = (Index("ix_tier_sketch_pending_run_id", "run_id"),)
+
+    id = Column(Integer, primary_key=True)
+    run_id = Column(Integer, nullable=True)
+    tier = Column(Integer, nullable=False)
+
+
+class TierOutlierStats(Base):
+    """
+    Per tier and rate, the robust statistics entries are scored against.
+
+    The median and scaled MAD of the latest entry of every run, and the IQR
+    fences outside which an entry is flagged. Computed by tower_tracker.outliers;
+    NULL where the tier has too few runs.
+    """
+
+    __tablename__ = "tier_outlier_stats"
+
+    tier = Column(Integer, primary_key=True)
+    metric = Column(String, primary_key=True)
+    runs = Column(Integer, default=0, nullable=False)
+    # tier_stats.entries when computed
+    entries = Column(Integer, default=0, nullable=False)
+    median = Column(Float, nullable=True)
+    scale = Column(Float, nullable=True)
+    lower = Column(Float, nullable=True)
+    upper = Column(Float, nullable=True)
+
+
+class SnapshotState(Base):
+    """
+    The watermark of tower_tracker.snapshot, a single row.
+
+    Triggers log changes to run_statistics rows with an id up to `watermark` in
+    snapshot_changes, so a snapshot can patch the rows it holds.
+    """
+
+    __tablename__ = "snapshot_state"
+
+    id = Column(Integer, primary_key=True)
+    watermark = Column(Integer, default=0, nullable=False)
+
+
+class SnapshotChange(Base):
+    """
+    A snapshotted run_statistics row that was updated or deleted.
+
+    `tier` and `datetime_collected` are the old values, locating the partition
+    the snapshot holds the row in. Entries are removed once the snapshot is
+    patched.
+    """
+
+    __tablename__ = "snapshot_changes"
+
+    seq = Column(Integer, primary_key=True)
+    entry_id = Column(Integer, nullable=False)
+    tier = Column(Integer, nullable=False)
+    datetime_collected = Column(DateTime, nullable=False)
+
+
+class LatestEntry(Base):
+    """
+    The latest entry of every run, by datetime_collected and then id.
+
+    Maintained by triggers on run_statistics, so the latest entries can be paged
+    through and counted without ranking every entry.
+    """
+
+    __tablename__ = "latest_entries"
+    __table_args__ = (
+        Index("uq_latest_entries_entry_id", "entry_id", unique=True),
+    )
+
+    run_id = Column(Integer, primary_key=True)
+    entry_id = Column(Integer, nullable=False)
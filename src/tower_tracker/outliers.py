@@ -0,0 +1,314 @@
+"""
+Outlier scores of entries against their tier.
+
+Every entry's rates are compared with the distribution of the same rate over the
+latest entry of each run in its tier (the population the box plots show):
+
+* `outlier_score` is the largest robust z-score of its rates,
+  |value - median| / (1.4826 * MAD), so 1 is a typical deviation;
+* `outlier` is set when any rate lies outside the tier's IQR fences,
+  [Q1 - k * IQR, Q3 + k * IQR] with k = OUTLIER_IQR_FACTOR, the points the box
+  plots draw as fliers.
+
+`backfill_outliers` computes the per-tier statistics and every entry's score in
+one vectorized pass and stores the statistics in tier_outlier_stats. From then
+on, triggers score each inserted or edited entry against the stored statistics,
+so new entries are flagged as they are written. The statistics themselves are
+only recomputed by a backfill; `refresh_outlier_scores` runs one when a tier has
+grown by more than OUTLIER_REFRESH_GROWTH since the last. The data viewer queues
+the same work on the group-commit writer (`rescore_stale_tiers`) when asked to.
+
+Usage: python -m tower_tracker.outliers {backfill,refresh,show}
+"""
+import argparse
+import os
+import sys
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+from sqlalchemy import bindparam, delete, insert, select, text, update
+
+from tower_tracker.cache import invalidates_cache
+from tower_tracker.crud import RATE_FIELDS, RunRow, latest_runs_query
+from tower_tracker.database import get_session, session_scope
+from tower_tracker.models.models import RunStatistics, TierOutlierStats, TierStats
+
+# Fences at Q1 - k * IQR and Q3 + k * IQR
+OUTLIER_IQR_FACTOR = float(os.environ.get("TOWER_TRACKER_OUTLIER_IQR_FACTOR", "1.5"))
+# Tiers with fewer runs than this are not scored
+OUTLIER_MIN_RUNS = int(os.environ.get("TOWER_TRACKER_OUTLIER_MIN_RUNS", "5"))
+# Fractional growth of a tier's entries after which `refresh_outlier_scores`
+# recomputes
+OUTLIER_REFRESH_GROWTH = float(
+    os.environ.get("TOWER_TRACKER_OUTLIER_REFRESH_GROWTH", "0.1")
+)
+
+# Makes the MAD of normally distributed values an estimate of their standard deviation
+MAD_SCALE = 1.4826
+
+
+def grouped_quantiles(groups: np.ndarray, values: np.ndarray, quantiles, n_groups: int):
+    """
+    Return the quantiles of `values` within each group (0..n_groups-1).
+
+    Interpolates like np.quantile, for all groups at once: one lexsort orders the
+    values by group and value, and every quantile is read off at its position in
+    its group. Returns a (len(quantiles), n_groups) array, NaN for empty groups,
+    and the number of values per group. Non-finite values are ignored.
+    """
+    keep = np.isfinite(values)
+    groups, values = groups[keep], values[keep]
+    ordered = values[np.lexsort((values, groups))]
+    counts = np.bincount(groups, minlength=n_groups)
+    starts = np.cumsum(counts) - counts
+
+    result = np.full((len(quantiles), n_groups), np.nan)
+    filled = counts > 0
+    fractions = np.asarray(quantiles, dtype=float)[:, None]
+    position = starts[filled] + fractions * (counts[filled] - 1)
+    low = np.floor(position).astype(np.int64)
+    high = np.ceil(position).astype(np.int64)
+    fraction = position - low
+    result[:, filled] = ordered[low] * (1 - fraction) + ordered[high] * fraction
+    return result, counts
+
+
+class ReferenceStats(NamedTuple):
+    """
+    Per-tier reference statistics of every rate.
+
+    Per rate, one value per tier (in the order of `tiers`); NaN where the tier
+    has fewer than OUTLIER_MIN_RUNS runs with the rate.
+    """
+
+    tiers: np.ndarray
+    runs: Dict[str, np.ndarray]
+    median: Dict[str, np.ndarray]
+    scale: Dict[str, np.ndarray]
+    lower: Dict[str, np.ndarray]
+    upper: Dict[str, np.ndarray]
+
+
+def reference_stats(
+    tier_index: np.ndarray,
+    tiers: np.ndarray,
+    latest: np.ndarray,
+    rates: Dict[str, np.ndarray],
+    iqr_factor: float = OUTLIER_IQR_FACTOR,
+    min_runs: int = OUTLIER_MIN_RUNS,
+) -> ReferenceStats:
+    """
+    Return the statistics of every rate over the entries selected by `latest`.
+
+    `latest` selects the latest entry of each run, and `tier_index` maps entries
+    to `tiers`. Like the box plots, only positive values are part of the
+    reference.
+    """
+    groups = tier_index[latest]
+    stats = ReferenceStats(tiers, {}, {}, {}, {}, {})
+    for metric, column in rates.items():
+        values = column[latest]
+        values = np.where(values > 0, values, np.nan)
+        quartiles, runs = grouped_quantiles(
+            groups, values, (0.25, 0.5, 0.75), len(tiers)
+        )
+        q1, median, q3 = quartiles
+        deviations = np.abs(values - median[groups])
+        (mad,), _ = grouped_quantiles(groups, deviations, (0.5,), len(tiers))
+
+        few = runs < min_runs
+        iqr = q3 - q1
+        stats.runs[metric] = runs
+        stats.median[metric] = np.where(few, np.nan, median)
+        stats.scale[metric] = np.where(few, np.nan, MAD_SCALE * mad)
+        stats.lower[metric] = np.where(few, np.nan, q1 - iqr_factor * iqr)
+        stats.upper[metric] = np.where(few, np.nan, q3 + iqr_factor * iqr)
+    return stats
+
+
+def score_entries(
+    tier_index: np.ndarray, rates: Dict[str, np.ndarray], stats: ReferenceStats
+):
+    """
+    Return the outlier score and flag of every entry.
+
+    Scores are computed as the triggers compute them for single entries, NaN
+    when no rate can be scored.
+    """
+    score = np.full(len(tier_index), np.nan)
+    flag = np.zeros(len(tier_index), dtype=bool)
+    for metric, values in rates.items():
+        median = stats.median[metric][tier_index]
+        scale = stats.scale[metric][tier_index]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z = np.abs(values - median) / np.where(scale > 0, scale, np.nan)
+        score = np.fmax(score, z)
+        lower = stats.lower[metric][tier_index]
+        upper = stats.upper[metric][tier_index]
+        flag |= (values < lower) | (values > upper)
+    return score, flag
+
+
+# A Core executemany; the ORM's bulk UPDATE would try to synchronize the session
+_UPDATE_SCORE = (
+    update(RunStatistics.__table__)
+    .where(RunStatistics.__table__.c.id == bindparam("entry_id"))
+    .values(outlier_score=bindparam("score"), outlier=bindparam("flag"))
+)
+
+
+def _nullable(value: float) -> Optional[float]:
+    """Return `value` as a float, None for NaN."""
+    return None if np.isnan(value) else float(value)
+
+
+def rescore_entries(session, chunk_size: int = 5000) -> int:
+    """
+    Do the work of `backfill_outliers` within the caller's transaction.
+
+    The transaction is not committed. Writes only the entries whose score or flag
+    changed and returns their number.
+    """
+    columns = ("id", "run_id", "tier") + RATE_FIELDS + ("outlier_score", "outlier")
+    query = select(*(getattr(RunStatistics, name) for name in columns)).order_by(
+        RunStatistics.datetime_collected, RunStatistics.id
+    )
+    rows = session.execute(query).all()
+    if not rows:
+        session.execute(delete(TierOutlierStats))
+        return 0
+
+    data = dict(zip(columns, zip(*rows)))
+    ids = np.array(data["id"], dtype=np.int64)
+    run_ids = np.array(data["run_id"], dtype=np.int64)
+    tier_ids = np.array(data["tier"], dtype=np.int64)
+    tiers, tier_index = np.unique(tier_ids, return_inverse=True)
+    rates = {name: np.array(data[name], dtype=float) for name in RATE_FIELDS}
+    # Entries are in collection order, so a run's latest entry is its last
+    _, last_from_end = np.unique(run_ids[::-1], return_index=True)
+    latest = len(run_ids) - 1 - last_from_end
+
+    stats = reference_stats(tier_index, tiers, latest, rates)
+    score, flag = score_entries(tier_index, rates, stats)
+
+    old_score = np.array(data["outlier_score"], dtype=float)
+    old_flag = np.array(data["outlier"], dtype=bool)
+    same_score = (old_score == score) | (np.isnan(old_score) & np.isnan(score))
+    changed = np.flatnonzero(~same_score | (old_flag != flag))
+
+    entries = dict(session.execute(select(TierStats.tier, TierStats.entries)).all())
+    session.execute(delete(TierOutlierStats))
+    session.execute(insert(TierOutlierStats), [
+        {
+            "tier": int(tier), "metric": metric, "runs": int(stats.runs[metric][i]),
+            "entries": entries.get(int(tier), 0),
+            "median": _nullable(stats.median[metric][i]),
+            "scale": _nullable(stats.scale[metric][i]),
+            "lower": _nullable(stats.lower[metric][i]),
+            "upper": _nullable(stats.upper[metric][i]),
+        }
+        for i, tier in enumerate(tiers) for metric in RATE_FIELDS
+    ])
+    for start in range(0, len(changed), chunk_size):
+        rows = changed[start:start + chunk_size]
+        session.execute(_UPDATE_SCORE, [
+            {
+                "entry_id": int(ids[i]), "score": _nullable(score[i]),
+                "flag": bool(flag[i]),
+            }
+            for i in rows
+        ])
+    return len(changed)
+
+
+def outlier_stats_stale(growth: float = OUTLIER_REFRESH_GROWTH, session=None) -> bool:
+    """
+    Return whether the reference statistics of a tier are missing or stale.
+
+    They are stale when the tier has grown by more than `growth` since they were
+    computed. Reads only the per-tier rollups.
+    """
+    with session_scope(session) as session:
+        current = dict(session.execute(
+            select(TierStats.tier, TierStats.entries).where(TierStats.entries > 0)
+        ).all())
+        scored = dict(session.execute(
+            select(TierOutlierStats.tier, TierOutlierStats.entries).distinct()
+        ).all())
+    return any(
+        tier not in scored or entries > scored[tier] * (1 + growth)
+        for tier, entries in current.items()
+    )
+
+
+@invalidates_cache
+def backfill_outliers(chunk_size: int = 5000) -> int:
+    """
+    Recompute the reference statistics from every entry and rescore them all.
+
+    Writes only the entries whose score or flag changed. Runs as one write
+    transaction, so no entry is written in between with the old statistics.
+    Returns the number of entries updated.
+    """
+    with get_session() as session:
+        session.execute(text("BEGIN IMMEDIATE"))
+        changed = rescore_entries(session, chunk_size)
+        session.commit()
+        return changed
+
+
+def rescore_stale_tiers(session, growth: float = OUTLIER_REFRESH_GROWTH) -> int:
+    """
+    Do the work of `refresh_outlier_scores` within the caller's transaction.
+
+    Fits `GroupCommitWriter.submit`, so the rescoring is serialized with the
+    application's other writes.
+    """
+    if not outlier_stats_stale(growth, session=session):
+        return 0
+    return rescore_entries(session)
+
+
+def refresh_outlier_scores(growth: float = OUTLIER_REFRESH_GROWTH) -> int:
+    """
+    Backfill when the reference statistics are missing or stale.
+
+    Returns the number of entries updated.
+    """
+    return backfill_outliers() if outlier_stats_stale(growth) else 0
+
+
+def flagged_runs(tier: Optional[int] = None) -> List[RunRow]:
+    """Return the latest entries of runs flagged as outliers, highest score first."""
+    ranked_query = latest_runs_query(tier=tier, rows=True).subquery()
+    query = (
+        select(*ranked_query.c)
+        .where(ranked_query.c.outlier == True)  # noqa: E712
+        .order_by(ranked_query.c.outlier_score.desc(), ranked_query.c.run_id)
+    )
+    with get_session() as session:
+        return list(map(RunRow._make, session.execute(query)))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Backfill, refresh or show the outlier scores from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Score entries as outliers within their tier."
+    )
+    parser.add_argument("command", choices=("backfill", "refresh", "show"))
+    parser.add_argument("--tier", type=int, help="only show runs of this tier")
+    args = parser.parse_args(argv)
+
+    if args.command == "backfill":
+        print(f"rescored {backfill_outliers()} entries")
+    elif args.command == "refresh":
+        print(f"rescored {refresh_outlier_scores()} entries")
+    else:
+        for row in flagged_runs(args.tier):
+            score = "-" if row.outlier_score is None else f"{row.outlier_score:.1f}"
+            print(f"run {row.run_id} (tier {row.tier}): score {score}, entry {row.id}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
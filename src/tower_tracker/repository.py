@@ -0,0 +1,71 @@
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+from tower_tracker import crud
+from tower_tracker.database import get_session
+from tower_tracker.models.models import RunStatistics
+from tower_tracker.series import RunSeries, fetch_run_series
+
+
+class RunRepository:
+    """
+    Read access to run statistics through a single shared session.
+
+    Every query issued through one repository runs on the same connection and
+    inside the same read transaction, so it sees one consistent snapshot.
+    """
+
+    def __init__(self, session) -> None:
+        self.session = session
+
+    def run_context(self, run_id: Optional[int] = None) -> crud.RunContext:
+        """See `crud.get_run_context`."""
+        return crud.get_run_context(run_id, session=self.session)
+
+    def run_tier(self, run_id: int) -> Optional[int]:
+        """See `crud.get_run_tier`."""
+        return crud.get_run_tier(run_id, session=self.session)
+
+    def run_status(self, run_id: int) -> bool:
+        """See `crud.get_run_status`."""
+        return crud.get_run_status(run_id, session=self.session)
+
+    def active_run_id(self) -> Optional[int]:
+        """See `crud.get_active_run_id`."""
+        return crud.get_active_run_id(session=self.session)
+
+    def next_run_id(self) -> int:
+        """See `data_viewer.generate_new_run_id`."""
+        # data_viewer imports pandas, which the GUI only loads when it needs it
+        from tower_tracker.data_viewer import generate_new_run_id
+
+        return generate_new_run_id(session=self.session)
+
+    def run_ids(self) -> List[int]:
+        """See `crud.fetch_all_run_ids`."""
+        return crud.fetch_all_run_ids(session=self.session)
+
+    def latest_runs(
+        self, tier: Optional[int] = None, ended: Optional[bool] = None
+    ) -> List[RunStatistics]:
+        """See `crud.fetch_all_runs`."""
+        return crud.fetch_all_runs(tier=tier, ended=ended, session=self.session)
+
+    def entries_for_run(self, run_id: int) -> List[RunStatistics]:
+        """See `crud.fetch_all_entries_for_run`."""
+        return crud.fetch_all_entries_for_run(run_id, session=self.session)
+
+    def entry_rows(self, run_id: int) -> List[crud.RunRow]:
+        """See `crud.fetch_entry_rows`."""
+        return crud.fetch_entry_rows(run_id, session=self.session)
+
+    def run_series(self, run_id: Optional[int] = None) -> RunSeries:
+        """See `series.fetch_run_series`."""
+        return fetch_run_series(run_id, session=self.session)
+
+
+@contextmanager
+def unit_of_work() -> Iterator[RunRepository]:
+    """Open one session for a batch of reads, e.g. all a window needs to open."""
+    with get_session() as session:
+        yield RunRepository(session)
@@ -0,0 +1,83 @@
+from typing import Dict, NamedTuple, Optional
+
+import numpy as np
+from sqlalchemy import select
+
+from tower_tracker.cache import query_cache
+from tower_tracker.crud import RATE_FIELDS
+from tower_tracker.database import session_scope
+from tower_tracker.instrumentation import instrumented
+from tower_tracker.models.models import RunStatistics
+
+# dtype of every RunSeries column
+COLUMN_DTYPES = {
+    "id": np.int64,
+    "run_id": np.int64,
+    "datetime_collected": "datetime64[us]",
+    "tier": np.int64,
+    "wave": np.int64,
+    "coins": np.float64,
+    "cells": np.int64,
+    "time_spent": np.int64,
+    "end_of_round": np.bool_,
+    # Stored rates; NULL (undefined) becomes NaN
+    "coins_per_hour": np.float64,
+    "coins_per_wave": np.float64,
+    "cells_per_hour": np.float64,
+    "cells_per_wave": np.float64,
+}
+
+
+class RunSeries(NamedTuple):
+    """
+    Entries as read-only NumPy columns, in collection order.
+
+    Plotting from these needs no per-row Python objects.
+    """
+
+    id: np.ndarray
+    run_id: np.ndarray
+    datetime_collected: np.ndarray
+    tier: np.ndarray
+    wave: np.ndarray
+    coins: np.ndarray
+    cells: np.ndarray
+    time_spent: np.ndarray
+    end_of_round: np.ndarray
+    coins_per_hour: np.ndarray
+    coins_per_wave: np.ndarray
+    cells_per_hour: np.ndarray
+    cells_per_wave: np.ndarray
+
+    def __len__(self) -> int:
+        """Return the number of entries."""
+        return len(self.id)
+
+    def rates(self) -> Dict[str, np.ndarray]:
+        """Return the stored rate columns by name."""
+        return {name: getattr(self, name) for name in RATE_FIELDS}
+
+
+def series_from_rows(rows) -> RunSeries:
+    """Build a RunSeries from rows holding the RunSeries columns in order."""
+    columns = list(zip(*rows)) or [()] * len(RunSeries._fields)
+    arrays = []
+    for values, dtype in zip(columns, COLUMN_DTYPES.values()):
+        array = np.array(values, dtype=dtype)
+        # Cached results are shared, so they must not be modified
+        array.flags.writeable = False
+        arrays.append(array)
+    return RunSeries(*arrays)
+
+
+@instrumented
+@query_cache.cached
+def fetch_run_series(run_id: Optional[int] = None, session=None) -> RunSeries:
+    """Return the entries of one run (or of every run) as a RunSeries, in order."""
+    query = select(
+        *(getattr(RunStatistics, name) for name in RunSeries._fields)
+    ).order_by(RunStatistics.datetime_collected, RunStatistics.id)
+    if run_id is not None:
+        query = query.where(RunStatistics.run_id == run_id)
+    with session_scope(session) as session:
+        return series_from_rows(session.execute(query))
@@ -0,0 +1,371 @@
+"""
+Per-tier quantile sketches of ended runs.
+
+For every tier and metric the tier_sketches table keeps a t-digest of the
+metric over the latest entry of each ended run, which is what the box plots and
+median columns show. Reading a tier's quartiles from a digest costs the same
+however many runs the tier has, instead of loading every run into pandas.
+
+Triggers queue a run in tier_sketch_pending when its first end-of-round entry is
+inserted (or an entry is marked end-of-round). Digests cannot forget values, so
+deleting or editing an ended entry, or a new latest end-of-round entry of a run
+already folded in, queues a rebuild of its tier instead. The
+queue is folded into the digests by `refresh_sketches`, which `load_sketches`
+runs before reading, so the sketches are never stale.
+
+Like the exact box plots, only finite, positive values are sketched.
+
+Usage: python -m tower_tracker.sketches {refresh,rebuild,show}
+"""
+import argparse
+import json
+import math
+import sys
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy import delete, select, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from tower_tracker.crud import RATE_FIELDS, RunRow, latest_runs_query, row_columns
+from tower_tracker.database import get_session
+from tower_tracker.models.models import RunStatistics, TierSketch, TierSketchPending
+
+SKETCH_METRICS = ("wave",) + RATE_FIELDS
+
+# tier -> metric -> values
+MetricValues = Dict[int, Dict[str, np.ndarray]]
+
+# Centroids kept per digest are roughly compression / 2 to compression
+DEFAULT_COMPRESSION = 200
+
+
+class TDigest:
+    """
+    A merging t-digest (Dunning & Ertl).
+
+    Sorted centroids (mean, weight) whose sizes are bounded by the k1 (arcsine)
+    scale function, so centroids near the tails stay small and extreme quantiles
+    stay accurate. Digests of disjoint data merge into a digest of their union.
+    """
+
+    def __init__(self, compression: float = DEFAULT_COMPRESSION) -> None:
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = math.inf
+        self.max = -math.inf
+
+    @property
+    def count(self) -> int:
+        """Return the number of values added."""
+        return int(self.weights.sum())
+
+    def update(self, values) -> "TDigest":
+        """Add the finite values of `values` (weight 1 each)."""
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[np.isfinite(values)]
+        if len(values):
+            self._add(values, np.ones(len(values)), values.min(), values.max())
+        return self
+
+    def merge(self, other: "TDigest") -> "TDigest":
+        """Add the centroids of `other`."""
+        if len(other.means):
+            self._add(other.means, other.weights, other.min, other.max)
+        return self
+
+    def _add(self, means, weights, minimum, maximum) -> None:
+        self.min = min(self.min, float(minimum))
+        self.max = max(self.max, float(maximum))
+        means = np.concatenate((self.means, means))
+        weights = np.concatenate((self.weights, weights))
+        order = np.argsort(means, kind="stable")
+        self.means, self.weights = self._compress(means[order], weights[order])
+
+    def _compress(self, means, weights):
+        """
+        Merge adjacent centroids in one vectorized pass.
+
+        Every centroid goes to the integer k1 bucket of its midpoint's quantile,
+        and each bucket becomes one centroid, so no centroid spans more than one
+        unit of k.
+        """
+        total = weights.sum()
+        midpoints = (np.cumsum(weights) - weights / 2) / total
+        k = self.compression / (2 * math.pi) * np.arcsin(2 * midpoints - 1)
+        buckets = np.floor(k)
+        starts = np.flatnonzero(np.diff(buckets, prepend=-np.inf))
+        merged_weights = np.add.reduceat(weights, starts)
+        merged_means = np.add.reduceat(means * weights, starts) / merged_weights
+        return merged_means, merged_weights
+
+    def quantile(self, q):
+        """
+        Return approximate quantile(s) of the added values.
+
+        Interpolates between centroid midpoints and the exact minimum and
+        maximum; NaN when empty.
+        """
+        if not len(self.means):
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else math.nan
+        midpoints = (np.cumsum(self.weights) - self.weights / 2) / self.weights.sum()
+        positions = np.concatenate(([0.0], midpoints, [1.0]))
+        values = np.concatenate(([self.min], self.means, [self.max]))
+        result = np.interp(q, positions, values)
+        return result if np.ndim(q) else float(result)
+
+    def mean(self) -> float:
+        """Return the mean of the added values, NaN when empty."""
+        if not len(self.means):
+            return math.nan
+        return float(np.average(self.means, weights=self.weights))
+
+    def to_dict(self) -> dict:
+        """Return the digest as a JSON-serializable dict."""
+        return {
+            "compression": self.compression,
+            "means": self.means.tolist(),
+            "weights": self.weights.tolist(),
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TDigest":
+        """Return the digest stored by `to_dict`."""
+        digest = cls(data["compression"])
+        digest.means = np.array(data["means"], dtype=float)
+        digest.weights = np.array(data["weights"], dtype=float)
+        if data["min"] is not None:
+            digest.min, digest.max = data["min"], data["max"]
+        return digest
+
+
+def _metric_values(rows: Iterable[RunRow]) -> MetricValues:
+    """Return the positive, finite values of every sketched metric, per tier."""
+    by_tier = defaultdict(list)
+    for row in rows:
+        by_tier[row.tier].append(row)
+    values = {}
+    for tier, tier_rows in by_tier.items():
+        values[tier] = {}
+        for metric in SKETCH_METRICS:
+            column = np.array([getattr(row, metric) for row in tier_rows], dtype=float)
+            values[tier][metric] = column[np.isfinite(column) & (column > 0)]
+    return values
+
+
+def ended_run_values(tier: Optional[int] = None, session=None) -> MetricValues:
+    """
+    Return the exact values the sketches approximate.
+
+    Every metric of the latest entry of each ended run, per tier.
+    """
+    query = latest_runs_query(tier=tier, ended=True, rows=True)
+    if session is not None:
+        return _metric_values(map(RunRow._make, session.execute(query)))
+    with get_session() as session:
+        return _metric_values(map(RunRow._make, session.execute(query)))
+
+
+def _latest_ended_entries(session, run_ids) -> List[RunRow]:
+    """Return the latest entry of each of the given runs that has ended."""
+    rows = session.execute(
+        select(*row_columns())
+        .where(RunStatistics.run_id.in_(run_ids))
+        .order_by(
+            RunStatistics.run_id, RunStatistics.datetime_collected.desc(),
+            RunStatistics.id.desc(),
+        )
+    )
+    latest = {}
+    for row in map(RunRow._make, rows):
+        latest.setdefault(row.run_id, row)
+    return [row for row in latest.values() if row.end_of_round]
+
+
+def _store(session, tier: int, digests: Dict[str, TDigest]) -> None:
+    statement = sqlite_insert(TierSketch).values([
+        {
+            "tier": tier, "metric": metric, "count": digest.count,
+            "digest": json.dumps(digest.to_dict()),
+        }
+        for metric, digest in digests.items()
+    ])
+    session.execute(statement.on_conflict_do_update(
+        index_elements=[TierSketch.tier, TierSketch.metric],
+        set_={"count": statement.excluded.count, "digest": statement.excluded.digest},
+    ))
+
+
+def _load(session, tiers=None) -> Dict[int, Dict[str, TDigest]]:
+    query = select(TierSketch).order_by(TierSketch.tier)
+    if tiers is not None:
+        query = query.where(TierSketch.tier.in_(tiers))
+    sketches = defaultdict(dict)
+    for sketch in session.scalars(query):
+        digest = TDigest.from_dict(json.loads(sketch.digest))
+        sketches[sketch.tier][sketch.metric] = digest
+    return dict(sketches)
+
+
+def refresh_sketches() -> int:
+    """
+    Fold the queued runs into their tiers' digests.
+
+    Also rebuilds the tiers queued for a rebuild, all in one write transaction.
+    Returns the number of queued items.
+    """
+    # A plain read first, so readers with nothing queued never take the write lock
+    with get_session() as session:
+        if session.execute(select(TierSketchPending.id).limit(1)).first() is None:
+            return 0
+
+    with get_session() as session:
+        session.execute(text("BEGIN IMMEDIATE"))
+        # Another writer may have applied the queue meanwhile
+        queue = TierSketchPending
+        pending = session.execute(select(queue.id, queue.run_id, queue.tier)).all()
+        if not pending:
+            session.rollback()
+            return 0
+
+        rebuilt = {tier for _, run_id, tier in pending if run_id is None}
+        for tier in sorted(rebuilt):
+            session.execute(delete(TierSketch).where(TierSketch.tier == tier))
+            values = ended_run_values(tier, session=session).get(tier)
+            if values is not None:
+                _store(session, tier, {
+                    metric: TDigest().update(values[metric])
+                    for metric in SKETCH_METRICS
+                })
+
+        # Runs of rebuilt tiers are already in the rebuilt digests
+        run_ids = sorted({
+            run_id for _, run_id, tier in pending
+            if run_id is not None and tier not in rebuilt
+        })
+        added = {}
+        if run_ids:
+            rows = _latest_ended_entries(session, run_ids)
+            added = _metric_values(row for row in rows if row.tier not in rebuilt)
+        current = _load(session, tiers=list(added))
+        for tier, values in added.items():
+            digests = current.get(tier, {})
+            _store(session, tier, {
+                metric: digests.get(metric, TDigest()).update(values[metric])
+                for metric in SKETCH_METRICS
+            })
+
+        last = max(row[0] for row in pending)
+        session.execute(delete(queue).where(queue.id <= last))
+        session.commit()
+        return len(pending)
+
+
+def rebuild_sketches() -> int:
+    """Queue a rebuild of every tier and refresh. Return the number of tiers."""
+    with get_session() as session:
+        session.execute(delete(TierSketchPending))
+        session.execute(delete(TierSketch))
+        tiers = session.scalars(select(RunStatistics.tier).distinct()).all()
+        session.add_all(TierSketchPending(tier=tier) for tier in tiers)
+        session.commit()
+    refresh_sketches()
+    return len(tiers)
+
+
+def load_sketches() -> Dict[int, Dict[str, TDigest]]:
+    """Return every tier's digests (tier -> metric -> TDigest), refreshed first."""
+    refresh_sketches()
+    with get_session() as session:
+        return _load(session)
+
+
+def box_stats(digest: TDigest, label) -> Optional[dict]:
+    """
+    Return box plot statistics in the form `Axes.bxp` takes.
+
+    Whiskers reach 1.5 IQR past the quartiles, clamped to the data range; the
+    minimum and maximum are the only fliers drawn. None for an empty digest.
+    """
+    if not digest.count:
+        return None
+    q1, median, q3 = digest.quantile([0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    whislo = max(digest.min, q1 - 1.5 * iqr)
+    whishi = min(digest.max, q3 + 1.5 * iqr)
+    extremes = (digest.min, digest.max)
+    fliers = [value for value in extremes if value < whislo or value > whishi]
+    return {
+        "label": label, "med": median, "q1": q1, "q3": q3, "whislo": whislo,
+        "whishi": whishi, "mean": digest.mean(), "fliers": fliers,
+    }
+
+
+def tier_box_stats(metrics=RATE_FIELDS, sketches=None) -> Dict[str, List[dict]]:
+    """Return per metric the box plot statistics of every tier with values."""
+    sketches = load_sketches() if sketches is None else sketches
+    stats = {}
+    for metric in metrics:
+        boxes = (
+            box_stats(digests[metric], str(tier))
+            for tier, digests in sorted(sketches.items()) if metric in digests
+        )
+        stats[metric] = [box for box in boxes if box is not None]
+    return stats
+
+
+def tier_medians(metrics=SKETCH_METRICS, exact: bool = False) -> List[tuple]:
+    """
+    Return (tier, median of each metric...) per tier with ended runs.
+
+    The medians come from the sketches or, with `exact`, from every ended run.
+    Medians without values are NaN.
+    """
+    def exact_median(values):
+        return np.median(values) if len(values) else math.nan
+
+    if exact:
+        medians = {
+            tier: [exact_median(by_metric[metric]) for metric in metrics]
+            for tier, by_metric in ended_run_values().items()
+        }
+    else:
+        medians = {
+            tier: [
+                digests[metric].quantile(0.5) if metric in digests else math.nan
+                for metric in metrics
+            ]
+            for tier, digests in load_sketches().items()
+        }
+    return [(tier, *medians[tier]) for tier in sorted(medians)]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Refresh, rebuild or show the sketches from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Maintain the per-tier quantile sketches."
+    )
+    parser.add_argument("command", choices=("refresh", "rebuild", "show"))
+    args = parser.parse_args(argv)
+
+    if args.command == "refresh":
+        print(f"applied {refresh_sketches()} queued changes")
+    elif args.command == "rebuild":
+        print(f"rebuilt sketches for {rebuild_sketches()} tiers")
+    else:
+        for tier, digests in load_sketches().items():
+            for metric, digest in digests.items():
+                q1, median, q3 = digest.quantile([0.25, 0.5, 0.75])
+                print(
+                    f"tier {tier} {metric}: n={digest.count} q1={q1:.6g}"
+                    f" median={median:.6g} q3={q3:.6g}"
+                )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
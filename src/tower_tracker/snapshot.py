@@ -0,0 +1,337 @@
+"""
+Columnar (Feather) snapshots of run_statistics for analytics.
+
+The snapshot is a directory with one sub-directory per partition (a tier, or the
+month of datetime_collected) holding uncompressed Feather files, plus a manifest
+recording the highest row id written. Updating appends rows above that
+watermark; loading memory-maps the files instead of converting rows from SQLite.
+
+Rows changed in place or deleted after they were snapshotted (re-imported
+values, runs being ended) cannot be appended. Triggers log them in
+snapshot_changes, and the next update rewrites only the partitions holding them.
+The outlier fields are left out of the snapshot, so rescoring changes nothing.
+
+Usage: python -m tower_tracker.snapshot [--rebuild] [--partition-by {tier,month}]
+
+Requires pyarrow (pip install tower_tracker[analytics]).
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+import pandas as pd
+from sqlalchemy import delete, func, or_, select, text, update
+
+from tower_tracker import database
+from tower_tracker.database import get_session
+from tower_tracker.models.models import RunStatistics, SnapshotChange, SnapshotState
+
+MANIFEST = "manifest.json"
+PARTITIONS = ("tier", "month")
+# Rescored for whole tiers at a time, so not worth patching into the snapshot
+OUTLIER_COLUMNS = ("outlier_score", "outlier")
+# Snapshots written before a schema change are rebuilt rather than patched
+COLUMNS = [
+    column.name for column in RunStatistics.__table__.columns
+    if column.name not in OUTLIER_COLUMNS
+]
+SELECTED = [RunStatistics.__table__.c[name] for name in COLUMNS]
+# Stored as bool; SQLite returns 0 and 1
+BOOLEAN_COLUMNS = ("end_of_round",)
+
+
+def pyarrow_available() -> bool:
+    """Return whether pyarrow, needed for Feather files, is installed."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def default_directory() -> Path:
+    """
+    Return the directory snapshots are written to.
+
+    TOWER_TRACKER_SNAPSHOT_DIR, or a `<database name>_snapshot` directory next to
+    the SQLite database file.
+    """
+    if "TOWER_TRACKER_SNAPSHOT_DIR" in os.environ:
+        return Path(os.environ["TOWER_TRACKER_SNAPSHOT_DIR"])
+    db_path = Path(database.get_engine().url.database or "game_stats.db")
+    return db_path.with_name(f"{db_path.stem}_snapshot")
+
+
+def read_manifest(directory: Path) -> Optional[dict]:
+    """Return the manifest of the snapshot in `directory`, or None."""
+    path = directory / MANIFEST
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def _database_state(session=None):
+    """Return (highest id, row count, logged changes) of run_statistics."""
+    changes = select(func.count()).select_from(SnapshotChange)
+    query = select(
+        func.coalesce(func.max(RunStatistics.id), 0),
+        func.count(),
+        changes.scalar_subquery(),
+    ).select_from(RunStatistics)
+    if session is not None:
+        return tuple(session.execute(query).one())
+    with get_session() as session:
+        return tuple(session.execute(query).one())
+
+
+def _track_changes(max_id: int) -> None:
+    """
+    Make the triggers log changes to every row up to `max_id`.
+
+    Runs before those rows are read, so any change after the read is logged.
+    """
+    with get_session() as session:
+        session.execute(text("BEGIN IMMEDIATE"))
+        session.execute(
+            update(SnapshotState)
+            .where(SnapshotState.id == 1, SnapshotState.watermark < max_id)
+            .values(watermark=max_id)
+        )
+        session.commit()
+
+
+def frame_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Give run_statistics rows read from SQLite the columns and dtypes of the snapshot.
+
+    Drops the outlier fields, parses datetime_collected and turns the 0/1 flags
+    into booleans.
+    """
+    df = df.drop(columns=[name for name in OUTLIER_COLUMNS if name in df.columns])
+    if "datetime_collected" in df.columns:
+        df["datetime_collected"] = pd.to_datetime(df["datetime_collected"])
+    for name in BOOLEAN_COLUMNS:
+        if name in df.columns:
+            df[name] = df[name].astype(bool)
+    return df
+
+
+def _partition_keys(df: pd.DataFrame, partition_by: str) -> pd.Series:
+    if partition_by == "tier":
+        return df["tier"].astype(str)
+    return pd.to_datetime(df["datetime_collected"]).dt.strftime("%Y-%m")
+
+
+def _read_partition(directory: Path, parts: List[dict]) -> pd.DataFrame:
+    """Read the parts of one partition into a DataFrame."""
+    from pyarrow import feather
+
+    return pd.concat(
+        [feather.read_feather(directory / part["path"]) for part in parts],
+        ignore_index=True,
+    )
+
+
+def _clear_changes(last_seq: int) -> None:
+    """Remove the logged changes up to `last_seq`, now in the snapshot."""
+    with get_session() as session:
+        session.execute(delete(SnapshotChange).where(SnapshotChange.seq <= last_seq))
+        session.commit()
+
+
+def update_snapshot(
+    directory: Optional[Path] = None, partition_by: str = "tier", rebuild: bool = False
+) -> int:
+    """
+    Bring the snapshot up to date with the database.
+
+    Creates the snapshot if needed, rewrites the partitions holding rows that were
+    changed or deleted since the last update and appends the rows added since.
+    Returns the number of rows read from the database.
+    """
+    from pyarrow import Table, feather
+
+    directory = directory or default_directory()
+    manifest = read_manifest(directory)
+    max_id, _, _ = _database_state()
+    _track_changes(max_id)
+
+    # The rows and the change log are read in one transaction
+    with get_session() as session:
+        max_id, rows, _ = _database_state(session)
+        changes = pd.DataFrame(
+            session.execute(
+                select(
+                    SnapshotChange.seq, SnapshotChange.entry_id, SnapshotChange.tier,
+                    SnapshotChange.datetime_collected,
+                ).order_by(SnapshotChange.seq)
+            ).all(),
+            columns=["seq", "entry_id", "tier", "datetime_collected"],
+        )
+        rebuild = (
+            rebuild
+            or manifest is None
+            or manifest["partition_by"] != partition_by
+            or manifest.get("columns") != COLUMNS
+            or "sequence" not in manifest
+        )
+        if rebuild:
+            shutil.rmtree(directory, ignore_errors=True)
+            manifest = {
+                "partition_by": partition_by,
+                "columns": COLUMNS,
+                "watermark": 0,
+                "rows": 0,
+                "sequence": 0,
+                "parts": [],
+            }
+
+        # Changed rows the snapshot holds are read again; deleted ones are gone
+        changes = changes[changes["entry_id"] <= manifest["watermark"]]
+        changed = SnapshotChange.entry_id <= manifest["watermark"]
+        df = frame_dtypes(pd.read_sql_query(
+            select(*SELECTED)
+            .where(or_(
+                RunStatistics.id.in_(select(SnapshotChange.entry_id).where(changed)),
+                (RunStatistics.id > manifest["watermark"])
+                & (RunStatistics.id <= max_id),
+            ))
+            .order_by(RunStatistics.id),
+            session.bind,
+        ))
+
+    # The partitions holding old versions are rewritten without them, together
+    # with the rows read into them; the others only get a part of new rows
+    stale = set(_partition_keys(changes, partition_by))
+    new_rows = {}
+    if not df.empty:
+        new_rows = dict(list(df.groupby(_partition_keys(df, partition_by))))
+    frames = {}
+    for key in sorted(stale | set(new_rows)):
+        frame = new_rows.get(key)
+        if key in stale:
+            held = _read_partition(
+                directory,
+                [part for part in manifest["parts"] if part["partition"] == key],
+            )
+            held = held[~held["id"].isin(changes["entry_id"])]
+            frame = held if frame is None else pd.concat([held, frame])
+        frames[key] = frame.sort_values("id", ignore_index=True)
+
+    removed = [part for part in manifest["parts"] if part["partition"] in stale]
+    parts = [part for part in manifest["parts"] if part["partition"] not in stale]
+    parts += [
+        {"partition": key, "rows": len(frame)}
+        for key, frame in frames.items() if not frame.empty
+    ]
+    if sum(part["rows"] for part in parts) != rows and not rebuild:
+        # Changes the log missed, e.g. made before the triggers existed
+        return update_snapshot(directory, partition_by, rebuild=True)
+
+    sequence = manifest["sequence"] + 1
+    for part in parts:
+        if "path" in part:
+            continue
+        relative = Path(f"{partition_by}={part['partition']}")
+        relative /= f"part-{sequence:06d}.feather"
+        part["path"] = relative.as_posix()
+        (directory / relative).parent.mkdir(parents=True, exist_ok=True)
+        # Uncompressed, so the file can be memory-mapped on load
+        feather.write_feather(
+            Table.from_pandas(frames[part["partition"]], preserve_index=False),
+            directory / relative,
+            compression="uncompressed",
+        )
+
+    manifest["watermark"] = max(manifest["watermark"], int(max_id))
+    manifest["rows"] = rows
+    manifest["sequence"] = sequence
+    manifest["parts"] = parts
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / MANIFEST).write_text(json.dumps(manifest, indent=2))
+    for part in removed:
+        (directory / part["path"]).unlink(missing_ok=True)
+    if not changes.empty:
+        _clear_changes(int(changes["seq"].max()))
+    return len(df)
+
+
+def snapshot_is_fresh(directory: Optional[Path] = None) -> bool:
+    """
+    Return whether the snapshot holds exactly the rows currently in the database.
+
+    Rows changed in place since the snapshot was written make it stale too.
+    """
+    if not pyarrow_available():
+        return False
+    manifest = read_manifest(directory or default_directory())
+    if manifest is None or manifest.get("columns") != COLUMNS:
+        return False
+    # Logged changes are not patched in yet
+    return (manifest["watermark"], manifest["rows"], 0) == _database_state()
+
+
+def load_snapshot(
+    directory: Optional[Path] = None,
+    partitions: Optional[List] = None,
+    columns: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """
+    Load the snapshot into a DataFrame ordered by id.
+
+    Optionally only some partitions or columns are read; the Feather files are
+    memory-mapped.
+    """
+    from pyarrow import concat_tables, feather
+
+    directory = directory or default_directory()
+    manifest = read_manifest(directory)
+    if manifest is None:
+        raise FileNotFoundError(f"No snapshot in {directory}")
+
+    wanted = (
+        None if partitions is None else {str(partition) for partition in partitions}
+    )
+    tables = [
+        feather.read_table(directory / part["path"], columns=columns, memory_map=True)
+        for part in manifest["parts"]
+        if wanted is None or part["partition"] in wanted
+    ]
+    if not tables:
+        return pd.DataFrame(columns=columns or COLUMNS)
+    df = concat_tables(tables).to_pandas()
+    if "id" in df.columns:
+        df = df.sort_values("id", ignore_index=True)
+    return df
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Update the snapshot from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Update the columnar analytics snapshot."
+    )
+    parser.add_argument(
+        "--directory",
+        type=Path,
+        help="snapshot directory (default: next to the database)",
+    )
+    parser.add_argument("--partition-by", choices=PARTITIONS, default="tier")
+    parser.add_argument(
+        "--rebuild", action="store_true", help="rewrite the snapshot from scratch"
+    )
+    args = parser.parse_args(argv)
+
+    directory = args.directory or default_directory()
+    rows = update_snapshot(
+        directory, partition_by=args.partition_by, rebuild=args.rebuild
+    )
+    print(f"{directory}: read {rows} rows from the database")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
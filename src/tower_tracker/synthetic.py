@@ -0,0 +1,111 @@
+"""
+Seeded synthetic run statistics for tests and benchmarks.
+
+Runs follow each other in time. Every run farms one tier and logs `checkpoints`
+entries at irregular intervals. Waves, coins and cells grow with time at rates
+that rise with the tier, with per-run and per-checkpoint noise. Every run but the
+last is ended, so there is exactly one active run. The same seed always produces
+the same records.
+
+Usage: python -m tower_tracker.synthetic [--runs 10000] [--checkpoints 100] [--seed 0]
+
+The records are written to the configured database (TOWER_TRACKER_DATABASE_URL),
+whose schema must already exist (alembic upgrade head).
+"""
+import argparse
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from tower_tracker.crud import insert_runs_bulk
+
+TIERS = tuple(range(1, 19))
+START = datetime(2024, 1, 1)
+
+
+def generate_records(
+    runs: int = 10_000,
+    checkpoints: int = 100,
+    tiers: Sequence[int] = TIERS,
+    seed: int = 0,
+    start: datetime = START,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield `runs` x `checkpoints` records, run by run in collection order.
+
+    Records are keyed like the `insert_run` arguments, plus datetime_collected.
+    """
+    rng = np.random.default_rng(seed)
+    tiers = np.asarray(tiers)
+    collected_at = start
+
+    for run_id in range(1, runs + 1):
+        tier = int(rng.choice(tiers))
+        # Seconds between checkpoints, at least one so time_spent stays unique
+        intervals = np.maximum(rng.gamma(4.0, 150.0, checkpoints), 1).astype(np.int64)
+        time_spent = np.cumsum(intervals)
+        hours = time_spent / 3600
+
+        waves_per_hour = rng.uniform(250, 450) / (1 + tier / 10)
+        wave = np.maximum(np.ceil(hours * waves_per_hour), 1).astype(np.int64)
+        wave = np.maximum.accumulate(wave + rng.integers(0, 3, checkpoints))
+
+        # Income per wave rises steeply with the tier
+        coins_per_wave = 10.0 ** (3 + tier * 0.45) * rng.lognormal(0, 0.25)
+        coins = wave * coins_per_wave * rng.lognormal(0, 0.05, checkpoints)
+        cells = np.floor(wave * tier * rng.uniform(0.05, 0.15)).astype(np.int64)
+
+        ended = run_id < runs
+        for i in range(checkpoints):
+            seconds = int(time_spent[i])
+            yield {
+                "run_id": run_id,
+                "tier": tier,
+                "wave": int(wave[i]),
+                "coins": float(coins[i]),
+                "cells": int(cells[i]),
+                "time_spent": seconds,
+                "notes": "",
+                "end_of_round": ended and i == checkpoints - 1,
+                "datetime_collected": collected_at + timedelta(seconds=seconds),
+            }
+        # The next run starts a little after this one ends
+        pause = int(rng.integers(60, 3600))
+        collected_at += timedelta(seconds=int(time_spent[-1]) + pause)
+
+
+def populate(
+    runs: int = 10_000, checkpoints: int = 100, seed: int = 0, chunk_size: int = 5000
+) -> int:
+    """
+    Write a synthetic data set to the configured database.
+
+    Returns the number of records written.
+    """
+    return insert_runs_bulk(
+        generate_records(runs, checkpoints, seed=seed), chunk_size=chunk_size
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Fill the database from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Fill the database with synthetic run statistics."
+    )
+    parser.add_argument("--runs", type=int, default=10_000)
+    parser.add_argument("--checkpoints", type=int, default=100, help="entries per run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--chunk-size", type=int, default=5000, help="records written per transaction"
+    )
+    args = parser.parse_args(argv)
+
+    count = populate(args.runs, args.checkpoints, args.seed, args.chunk_size)
+    print(f"wrote {count} records")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+Maintenance of the tier_stats rollup table.
+
+Usage: python -m tower_tracker.tier_stats {rebuild,check}
+"""
+import argparse
+import sys
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import delete, func, insert, select
+
+from tower_tracker.database import get_session
+from tower_tracker.models.models import RunStatistics, TierStats
+
+METRICS = (
+    "wave",
+    "coins_per_hour",
+    "coins_per_wave",
+    "cells_per_hour",
+    "cells_per_wave",
+)
+# The stored counters of every tier
+COLUMNS = ["entries"] + [
+    f"{name}_{part}" for name in METRICS for part in ("n", "sum", "sumsq")
+]
+
+
+class Mismatch(NamedTuple):
+    """A stored tier_stats value that differs from the recomputed one."""
+
+    tier: int
+    column: str
+    stored: Optional[float]
+    expected: Optional[float]
+
+
+def recompute_query(magnitudes: bool = False):
+    """
+    Recompute every tier_stats row from run_statistics with a full scan.
+
+    With `magnitudes`, every metric also gets a `<metric>_abs` column, the sum of
+    the absolute values its sum adds up.
+    """
+    columns = [RunStatistics.tier.label("tier"), func.count().label("entries")]
+    for name in METRICS:
+        value = getattr(RunStatistics, name)
+        columns += [
+            func.count(value).label(f"{name}_n"),
+            func.total(value).label(f"{name}_sum"),
+            func.total(value * value).label(f"{name}_sumsq"),
+        ]
+        if magnitudes:
+            columns.append(func.total(func.abs(value)).label(f"{name}_abs"))
+    return select(*columns).group_by(RunStatistics.tier).order_by(RunStatistics.tier)
+
+
+def rebuild_tier_stats() -> int:
+    """Replace the rollup with a full recompute; return the number of tiers."""
+    query = recompute_query()
+    with get_session() as session:
+        session.execute(delete(TierStats))
+        result = session.execute(
+            insert(TierStats).from_select(
+                [column.name for column in query.selected_columns], query
+            )
+        )
+        session.commit()
+        return result.rowcount
+
+
+def _tolerance(expected: Optional[dict], column: str, rel_tol: float) -> float:
+    """
+    Return how far a stored counter may be from its recomputed value.
+
+    Counts must match exactly. Incremental updates round a sum differently than
+    a recompute, by at most a small fraction of the magnitude of the values
+    added up, so sums are compared relative to that magnitude rather than to the
+    sum itself, which may be small after cancellation.
+    """
+    if expected is None or column.endswith(("_n", "entries")):
+        return 0.0
+    if column.endswith("_sumsq"):
+        return rel_tol * expected[column]
+    return rel_tol * expected[column.removesuffix("_sum") + "_abs"]
+
+
+def check_tier_stats(rel_tol: float = 1e-9) -> List[Mismatch]:
+    """
+    Compare the rollup with a full recompute and return every differing value.
+
+    Sums are compared with a tolerance scaled to their size, see `_tolerance`.
+    """
+    with get_session() as session:
+        expected = {
+            row.tier: row._asdict()
+            for row in session.execute(recompute_query(magnitudes=True))
+        }
+        stored = {stats.tier: stats for stats in session.scalars(select(TierStats))}
+
+    mismatches = []
+    for tier in sorted(set(expected) | set(stored)):
+        for column in COLUMNS:
+            want = expected[tier][column] if tier in expected else 0
+            have = getattr(stored[tier], column) if tier in stored else None
+            tolerance = _tolerance(expected.get(tier), column, rel_tol)
+            close = have is not None and abs(have - want) <= tolerance
+            if not close:
+                mismatches.append(Mismatch(tier, column, have, want))
+    return mismatches
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Rebuild or check the rollup from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Maintain the tier_stats rollup table."
+    )
+    parser.add_argument("command", choices=("rebuild", "check"))
+    args = parser.parse_args(argv)
+
+    if args.command == "rebuild":
+        print(f"rebuilt tier_stats for {rebuild_tier_stats()} tiers")
+        return 0
+
+    mismatches = check_tier_stats()
+    for mismatch in mismatches:
+        print(
+            f"tier {mismatch.tier}: {mismatch.column} is {mismatch.stored}, "
+            f"expected {mismatch.expected}"
+        )
+    print(f"{len(mismatches)} mismatches" if mismatches else "tier_stats is consistent")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+import tkinter as tk
+from tkinter import filedialog, ttk
+
+from tower_tracker.instrumentation import recorder
+from tower_tracker.ui.utils import clear_rows, insert_row, sortable_treeview
+
+COLUMNS = {
+    "name": "Function / Statement",
+    "calls": "Calls",
+    "total_ms": "Total ms",
+    "mean_ms": "Mean ms",
+    "p50_ms": "p50 ms",
+    "p95_ms": "p95 ms",
+    "max_ms": "Max ms",
+    "rows": "Rows",
+}
+REFRESH_MS = 2000
+
+
+def _stats_tree(master):
+    tree = ttk.Treeview(master, columns=tuple(COLUMNS), show="headings", height=12)
+    for col, col_label in COLUMNS.items():
+        tree.heading(col, text=col_label)
+        tree.column(col, width=90, anchor=tk.E)
+    tree.column("name", width=480, anchor=tk.W)
+    sortable_treeview(tree)
+    tree.pack(fill=tk.BOTH, expand=True)
+    return tree
+
+
+def _fill(tree, table) -> None:
+    clear_rows(tree)
+    for name, stats in table.items():
+        raw = (name,) + tuple(stats[col] for col in COLUMNS if col != "name")
+        shown = (" ".join(name.split())[:200],) + tuple(
+            f"{value:.2f}" if isinstance(value, float) else value for value in raw[1:]
+        )
+        insert_row(tree, shown, raw_values=raw)
+
+
+def show_diagnostics() -> None:
+    """
+    Display the query and function timings collected by the instrumentation.
+
+    They are refreshed every few seconds while the window is open.
+    """
+    window = tk.Toplevel()
+    window.title("Diagnostics")
+
+    enabled = tk.BooleanVar(value=recorder.enabled)
+
+    def toggle() -> None:
+        if enabled.get():
+            recorder.enable()
+        else:
+            recorder.disable()
+
+    controls = tk.Frame(window)
+    controls.pack(fill=tk.X, padx=5, pady=5)
+    tk.Checkbutton(
+        controls, text="Record timings", variable=enabled, command=toggle
+    ).pack(side=tk.LEFT)
+    summary = tk.Label(controls)
+    summary.pack(side=tk.LEFT, padx=10)
+
+    notebook = ttk.Notebook(window)
+    notebook.pack(fill=tk.BOTH, expand=True)
+    trees = {}
+    for kind, title in (("functions", "Functions"), ("statements", "Statements")):
+        frame = ttk.Frame(notebook)
+        notebook.add(frame, text=title)
+        trees[kind] = _stats_tree(frame)
+
+    def refresh() -> None:
+        snapshot = recorder.snapshot()
+        summary.configure(
+            text=f"{snapshot['sessions']} sessions in {snapshot['seconds']:.0f}s"
+        )
+        for kind, tree in trees.items():
+            _fill(tree, snapshot[kind])
+
+    def auto_refresh() -> None:
+        if window.winfo_exists():
+            refresh()
+            window.after(REFRESH_MS, auto_refresh)
+
+    def reset() -> None:
+        recorder.reset()
+        refresh()
+
+    def save() -> None:
+        path = filedialog.asksaveasfilename(
+            parent=window, defaultextension=".json", filetypes=[("JSON", "*.json")]
+        )
+        if path:
+            recorder.dump_json(path)
+
+    buttons = tk.Frame(window)
+    buttons.pack(pady=5)
+    tk.Button(buttons, text="Refresh", command=refresh).pack(side=tk.LEFT, padx=5)
+    tk.Button(buttons, text="Reset", command=reset).pack(side=tk.LEFT, padx=5)
+    tk.Button(buttons, text="Save JSON...", command=save).pack(side=tk.LEFT, padx=5)
+    tk.Button(buttons, text="Close", command=window.destroy).pack(side=tk.LEFT, padx=5)
+
+    auto_refresh()
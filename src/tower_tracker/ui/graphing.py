@@ -1,25 +1,229 @@
+import os
+from typing import Dict, List, NamedTuple
+
+import numpy as np
 from matplotlib import pyplot as plt
 
-# TODO: This function is not used in the current implementation. It needs to be used instead of the current, nested method.
-def plot_outliers(df):
+METRICS = ("coins_per_hour", "coins_per_wave", "cells_per_hour", "cells_per_wave")
+
+# Points drawn per time series; 0 draws every point
+MAX_PLOT_POINTS = int(os.environ.get("TOWER_TRACKER_MAX_PLOT_POINTS", "1000"))
+
+
+class TierDistributions(NamedTuple):
+    """The values of every metric per tier, ready to be drawn as box plots."""
+
+    tiers: np.ndarray
+    # metric -> one array of values per tier, in the order of `tiers`
+    values: Dict[str, List[np.ndarray]]
+
+
+def tier_distributions(df, metrics=METRICS, positive_only=True) -> TierDistributions:
     """
-    Plots a box-and-whisker plot grouped by tier.
+    Split every metric of `df` into one array per tier, in a single pass.
 
-    Each box corresponds to a tier, and the plot shows the distribution of
-    coins_per_hour, coins_per_wave, cells_per_hour, and cells_per_wave for that tier.
+    Rows are sorted by tier once (a stable argsort) and each metric column is cut
+    at the tier boundaries, so the cost is O(rows log rows + metrics x rows) instead
+    of one filter of the whole frame per tier and metric. NaN and infinite values
+    (rates of entries without time or waves) are dropped, and with `positive_only`
+    so are values <= 0.
     """
-    metrics = ["coins_per_hour", "coins_per_wave", "cells_per_hour", "cells_per_wave"]
+    tier_column = df["tier"].to_numpy()
+    order = np.argsort(tier_column, kind="stable")
+    tiers, starts = np.unique(tier_column[order], return_index=True)
+    boundaries = starts[1:]
 
+    values = {}
     for metric in metrics:
-        grouped_data = [
-            df[df["tier"] == tier][metric].dropna()
-            for tier in sorted(df["tier"].unique())
-        ]
-
-        plt.figure(figsize=(10, 6))
-        plt.boxplot(grouped_data, labels=sorted(df["tier"].unique()), showfliers=True)
-        plt.title(f"{metric.replace('_', ' ').capitalize()} by Tier")
-        plt.xlabel("Tier")
-        plt.ylabel(metric.replace("_", " ").capitalize())
-        plt.grid(axis="y")
-        plt.show()
+        column = df[metric].to_numpy(dtype=float)[order]
+        keep = np.isfinite(column)
+        if positive_only:
+            keep &= column > 0
+        groups = zip(np.split(column, boundaries), np.split(keep, boundaries))
+        values[metric] = [group[mask] for group, mask in groups]
+    return TierDistributions(tiers, values)
+
+
+def metric_label(metric) -> str:
+    """Return the axis label of `metric`."""
+    return metric.replace("_", " ").capitalize()
+
+
+def plot_tier_distributions(distributions, jitter=0.05, seed=None, figsize=(14, 10)):
+    """
+    Draw one box-and-whisker subplot per metric, grouped by tier, on one figure.
+
+    Every data point is overlaid as a jittered scatter. Returns the figure.
+    """
+    metrics = list(distributions.values)
+    columns = 2 if len(metrics) > 1 else 1
+    rows = -(-len(metrics) // columns)
+    fig, axes = plt.subplots(rows, columns, figsize=figsize, squeeze=False)
+    rng = np.random.default_rng(seed)
+
+    positions = np.arange(1, len(distributions.tiers) + 1)
+    labels = [str(tier) for tier in distributions.tiers]
+    for ax, metric in zip(axes.flat, metrics):
+        groups = distributions.values[metric]
+        ax.boxplot(groups, positions=positions, patch_artist=True, showfliers=True)
+
+        # All points of the metric in one scatter call, spread slightly along x
+        counts = [len(group) for group in groups]
+        points = np.concatenate(groups) if groups else np.empty(0)
+        x = np.repeat(positions, counts) + rng.normal(0, jitter, len(points))
+        ax.scatter(x, points, alpha=0.6, s=12, color="blue")
+
+        ax.set_xticks(positions, labels)
+        ax.set_title(f"{metric_label(metric)} by Tier")
+        ax.set_xlabel("Tier")
+        ax.set_ylabel(metric_label(metric))
+        ax.grid(axis="y", linestyle="--", alpha=0.7)
+
+    # Hide the unused subplot of an odd number of metrics
+    for ax in list(axes.flat)[len(metrics):]:
+        ax.set_visible(False)
+    fig.tight_layout()
+    return fig
+
+
+def plot_outliers(df, metrics=METRICS):
+    """
+    Plot a box-and-whisker plot grouped by tier.
+
+    Each box corresponds to a tier, and the plot shows the distribution of
+    coins_per_hour, coins_per_wave, cells_per_hour, and cells_per_wave for that tier,
+    one subplot per metric with the individual data points.
+    """
+    fig = plot_tier_distributions(tier_distributions(df, metrics))
+    plt.show()
+    return fig
+
+
+def plot_tier_sketches(stats, figsize=(14, 10)):
+    """
+    Draw the approximate box plots of `sketches.tier_box_stats`.
+
+    `stats` maps each metric to one `Axes.bxp` dict per tier. Draws one subplot
+    per metric like `plot_tier_distributions`, but without the individual
+    points. Returns the figure.
+    """
+    metrics = list(stats)
+    columns = 2 if len(metrics) > 1 else 1
+    rows = -(-len(metrics) // columns)
+    fig, axes = plt.subplots(rows, columns, figsize=figsize, squeeze=False)
+
+    for ax, metric in zip(axes.flat, metrics):
+        if stats[metric]:
+            ax.bxp(stats[metric], patch_artist=True, showfliers=True)
+        ax.set_title(f"{metric_label(metric)} by Tier (approximate)")
+        ax.set_xlabel("Tier")
+        ax.set_ylabel(metric_label(metric))
+        ax.grid(axis="y", linestyle="--", alpha=0.7)
+
+    for ax in list(axes.flat)[len(metrics):]:
+        ax.set_visible(False)
+    fig.tight_layout()
+    return fig
+
+
+def lttb(x, y, max_points) -> np.ndarray:
+    """
+    Downsample a series with Largest-Triangle-Three-Buckets.
+
+    Returns the indices of at most `max_points` points of the series (x sorted
+    ascending) that keep its visual shape. The first and last points are always
+    kept; every bucket in between contributes the point forming the largest
+    triangle with the point kept from the previous bucket and the average of the
+    next bucket.
+
+    Bucket boundaries and averages are computed for all buckets at once; only the
+    choice of one point per bucket, which depends on the previous choice, loops.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    # max_points - 2 buckets over the points between the first and the last
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    counts = np.diff(edges)
+    average_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / counts
+    average_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / counts
+    # The bucket after the last one is the final point
+    next_x = np.append(average_x[1:], x[-1])
+    next_y = np.append(average_y[1:], y[-1])
+
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for bucket, (start, stop) in enumerate(zip(edges[:-1], edges[1:])):
+        # Twice the triangle area; the constant factor does not change the argmax
+        area = np.abs(
+            (x[a] - next_x[bucket]) * (y[start:stop] - y[a])
+            - (x[a] - x[start:stop]) * (next_y[bucket] - y[a])
+        )
+        a = start + int(area.argmax())
+        selected[bucket + 1] = a
+    return selected
+
+
+class DownsampledLine:
+    """
+    A line drawing at most `max_points` points of a series.
+
+    Whenever the x limits change (zooming or panning) the visible range is
+    re-sampled from the full series, so zooming in brings back full resolution.
+    """
+
+    def __init__(self, ax, x, y, max_points=MAX_PLOT_POINTS, **line_kwargs) -> None:
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        finite = np.isfinite(x) & np.isfinite(y)
+        order = np.argsort(x[finite], kind="stable")
+        self.x, self.y = x[finite][order], y[finite][order]
+        self.max_points = max_points
+
+        (self.line,) = ax.plot(*self.visible_points(-np.inf, np.inf), **line_kwargs)
+        # A closure rather than a bound method: the callback registry only keeps
+        # weak references to methods
+        ax.callbacks.connect(
+            "xlim_changed", lambda changed_ax: self.on_xlim_changed(changed_ax)
+        )
+
+    def visible_points(self, xmin, xmax):
+        """
+        Return the (downsampled) points within [xmin, xmax].
+
+        One more point on each side makes the line run to the edges of the view.
+        """
+        start = max(int(np.searchsorted(self.x, xmin, side="left")) - 1, 0)
+        stop = int(np.searchsorted(self.x, xmax, side="right")) + 1
+        x, y = self.x[start:stop], self.y[start:stop]
+        if self.max_points and len(x) > self.max_points:
+            keep = lttb(x, y, self.max_points)
+            x, y = x[keep], y[keep]
+        return x, y
+
+    def on_xlim_changed(self, ax) -> None:
+        """Re-sample the line for the new x limits of `ax`."""
+        self.line.set_data(*self.visible_points(*sorted(ax.get_xlim())))
+        ax.figure.canvas.draw_idle()
+
+
+def plot_time_series(
+    x, y, title, xlabel, ylabel, max_points=MAX_PLOT_POINTS, figsize=(10, 6)
+):
+    """
+    Plot a metric over time, downsampled to `max_points` per view.
+
+    Returns the figure and its DownsampledLine.
+    """
+    fig, ax = plt.subplots(figsize=figsize)
+    line = DownsampledLine(ax, x, y, max_points=max_points, marker="o", markersize=3)
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.grid(True)
+    fig.tight_layout()
+    return fig, line
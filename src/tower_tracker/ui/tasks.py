@@ -0,0 +1,157 @@
+import sys
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import messagebox, ttk
+
+
+class Task:
+    """A submitted call and the callbacks to run on the main thread when it ends."""
+
+    def __init__(self, future, owner, on_done, on_error, indicator) -> None:
+        self.future = future
+        self.owner = owner
+        self.on_done = on_done
+        self.on_error = on_error
+        self.indicator = indicator
+        self.cancelled = False
+
+
+class TaskRunner:
+    """
+    Runs blocking database and analytics calls on a thread pool.
+
+    Worker threads never touch Tk: finished tasks are picked up by polling with
+    `root.after`, and their callbacks run on the main thread. Tasks belonging to a
+    window are cancelled when it is destroyed, so their callbacks never see a dead
+    widget.
+    """
+
+    def __init__(self, root, max_workers=4, poll_interval=50) -> None:
+        self.root = root
+        self.poll_interval = poll_interval
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="tower-tracker"
+        )
+        self._pending = []
+        self._polling = False
+        self._owners = set()
+
+    def submit(
+        self,
+        fn,
+        *args,
+        owner=None,
+        on_done=None,
+        on_error=None,
+        indicator=None,
+        **kwargs,
+    ):
+        """
+        Run `fn(*args, **kwargs)` off the main thread.
+
+        Then `on_done(result)` or `on_error(exception)` is called on the main
+        thread. Errors are shown in a message box when no `on_error` is given.
+        `owner` is the window the task belongs to and `indicator` a BusyIndicator
+        shown while it runs.
+        """
+        future = self.executor.submit(fn, *args, **kwargs)
+        self._pending.append(Task(future, owner, on_done, on_error, indicator))
+        if indicator is not None:
+            indicator.start()
+        if owner is not None and str(owner) not in self._owners:
+            self._owners.add(str(owner))
+            owner.bind(
+                "<Destroy>",
+                lambda event, _owner=owner: self._on_destroy(event, _owner),
+                add="+",
+            )
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_interval, self._poll)
+        return future
+
+    def cancel(self, owner) -> None:
+        """Cancel every pending task of `owner`; their callbacks will not run."""
+        for task in self._pending:
+            if task.owner is owner:
+                task.cancelled = True
+                task.future.cancel()
+
+    def shutdown(self) -> None:
+        """Cancel every pending task and stop the worker threads."""
+        for task in self._pending:
+            task.cancelled = True
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _on_destroy(self, event, owner) -> None:
+        # <Destroy> is also delivered for every child of the window
+        if event.widget is owner:
+            self._owners.discard(str(owner))
+            self.cancel(owner)
+
+    def _poll(self) -> None:
+        # Iterate over a copy: callbacks may submit new tasks or destroy windows,
+        # cancelling tasks that have not been handled yet
+        for task in list(self._pending):
+            if not task.cancelled and not task.future.done():
+                continue
+            self._pending.remove(task)
+            if task.cancelled:
+                continue
+            if task.indicator is not None:
+                task.indicator.stop()
+            try:
+                error = task.future.exception()
+                if error is not None:
+                    if task.on_error is not None:
+                        task.on_error(error)
+                    else:
+                        messagebox.showerror("Error", str(error))
+                elif task.on_done is not None:
+                    task.on_done(task.future.result())
+            except Exception:
+                self.root.report_callback_exception(*sys.exc_info())
+
+        if self._pending:
+            self.root.after(self.poll_interval, self._poll)
+        else:
+            self._polling = False
+
+
+class BusyIndicator(ttk.Progressbar):
+    """An indeterminate progress bar that is only visible while tasks are running."""
+
+    def __init__(self, master, **kwargs) -> None:
+        super().__init__(master, mode="indeterminate", **kwargs)
+        self._running = 0
+
+    def start(self, interval=None) -> None:
+        """Show the progress bar for one more running task."""
+        self._running += 1
+        if self._running == 1:
+            self.pack(side=tk.BOTTOM, fill=tk.X, padx=5, pady=5)
+            super().start(interval or 10)
+
+    def stop(self) -> None:
+        """Hide the progress bar once no task is running anymore."""
+        self._running = max(self._running - 1, 0)
+        if self._running == 0:
+            super().stop()
+            self.pack_forget()
+
+
+runner = None
+
+
+def start(root, **kwargs) -> TaskRunner:
+    """Create the application's task runner for `root`."""
+    global runner
+    runner = TaskRunner(root, **kwargs)
+    return runner
+
+
+def get_runner() -> TaskRunner:
+    """Return the application's task runner, created on the default root if needed."""
+    if runner is None:
+        return start(tk._default_root)
+    return runner
@@ -1,55 +1,252 @@
+import bisect
+import weakref
 from typing import Any
 
+import numpy as np
 
-def format_coins(value) -> str:
+# The scalar coin functions live in tower_tracker.coins; re-exported for the UI
+from tower_tracker.coins import (  # noqa: F401
+    COIN_MULTIPLIERS,
+    COIN_SUFFIXES,
+    format_coins,
+    parse_coins,
+)
+
+_SCALES = np.array([1000.0**power for power in range(len(COIN_SUFFIXES))])
+_THRESHOLDS = _SCALES[1:]
+_SUFFIX_ARRAY = np.array(COIN_SUFFIXES)
+_SUFFIX_CODES = np.array(
+    sorted(ord(suffix) for suffix in COIN_MULTIPLIERS), dtype=np.uint32
+)
+_SUFFIX_CODE_MULTIPLIERS = np.array(
+    [COIN_MULTIPLIERS[chr(code)] for code in _SUFFIX_CODES]
+)
+_WHOLE_TEXT = np.array([str(whole) for whole in range(1000)])
+_HUNDREDTHS_TEXT = np.array([f".{cents:02d}" for cents in range(100)])
+
+
+def format_coins_array(values) -> np.ndarray:
+    """
+    Format an array of coin values like `format_coins`.
+
+    Takes a NumPy array, pandas Series or sequence of numbers. Missing values
+    (None/NaN) become empty strings, infinities "inf".
+
+    Scaled values below 1000 are built from lookup tables of their integer and
+    hundredths digits; the rest (and values within rounding noise of a .005 tie)
+    go through printf-style formatting, so the output matches `format_coins`.
+    """
+    values = np.asarray(values, dtype=float)
+    missing = np.isnan(values)
+    power = np.searchsorted(_THRESHOLDS, np.where(missing, 0, values), side="right")
+    scaled = values / _SCALES[power]
+
+    with np.errstate(invalid="ignore"):
+        hundredths = scaled * 100
+        cents = np.round(hundredths)
+        tie = np.abs(hundredths - np.floor(hundredths) - 0.5) < 1e-6
+        fast = (cents >= 0) & (cents < 100_000) & ~tie
+    cents = np.where(fast, cents, 0).astype(np.int64)
+    text = np.char.add(
+        np.char.add(_WHOLE_TEXT[cents // 100], _HUNDREDTHS_TEXT[cents % 100]),
+        _SUFFIX_ARRAY[power],
+    )
+
+    slow = ~fast & ~missing
+    if slow.any():
+        text = text.astype(object)
+        text[slow] = np.char.add(
+            np.char.mod("%.2f", scaled[slow]), _SUFFIX_ARRAY[power[slow]]
+        )
+        text = text.astype(str)
+    text[missing] = ""
+    infinite = np.isinf(values)
+    if infinite.any():
+        text = text.astype(object)
+        text[infinite] = np.where(values[infinite] > 0, "inf", "-inf")
+        text = text.astype(str)
+    return text
+
+
+def parse_coins_array(values) -> np.ndarray:
+    """
+    Parse an array, pandas Series or sequence of strings like `parse_coins`.
+
+    Raises ValueError when a value is not a number.
+
+    Plain decimals ("-12.34") are parsed arithmetically from their code points;
+    anything else (exponents, very long numbers) falls back to NumPy's conversion.
+    """
+    text = np.char.strip(np.asarray(values, dtype=str))
+    shape = text.shape
+    text = text.reshape(-1)
+    if text.size == 0:
+        return np.zeros(shape)
+
+    # View the fixed-width strings as a matrix of code points, one row per value
+    codes = text.view(np.uint32).reshape(text.size, -1).copy()
+    rows = np.arange(text.size)
+    last = np.maximum(np.char.str_len(text) - 1, 0)
+    suffix = codes[rows, last]
+    match = np.minimum(np.searchsorted(_SUFFIX_CODES, suffix), len(_SUFFIX_CODES) - 1)
+    has_suffix = _SUFFIX_CODES[match] == suffix
+    multipliers = np.where(has_suffix, _SUFFIX_CODE_MULTIPLIERS[match], 1.0)
+    # Drop the suffix characters
+    codes[rows[has_suffix], last[has_suffix]] = 0
+
+    # Drop the sign by shifting the rest of the value left, so the fallback below
+    # converts the unsigned text
+    negative = codes[:, 0] == ord("-")
+    codes[negative, :-1] = codes[negative, 1:]
+    codes[negative, -1] = 0
+
+    # Horner's method over the columns: the digits form an integer mantissa,
+    # scaled down by the number of digits after the dot
+    mantissa = np.zeros(text.size, dtype=np.int64)
+    decimals = np.zeros(text.size, dtype=np.int64)
+    digit_count = np.zeros(text.size, dtype=np.int64)
+    dots = np.zeros(text.size, dtype=np.int64)
+    simple = np.ones(text.size, dtype=bool)
+    for column in codes.T:
+        digit = column.astype(np.int64) - ord("0")
+        is_digit = (digit >= 0) & (digit <= 9)
+        is_dot = column == ord(".")
+        simple &= is_digit | is_dot | (column == 0)
+        mantissa = np.where(is_digit, mantissa * 10 + digit, mantissa)
+        decimals += is_digit & (dots > 0)
+        digit_count += is_digit
+        dots += is_dot
+    simple &= (dots <= 1) & (digit_count > 0) & (digit_count <= 15)
+    numbers = np.where(negative, -1.0, 1.0) * mantissa / 10.0**decimals
+
+    if not simple.all():
+        # Strings with the sign and suffix removed again, for NumPy to convert
+        stripped = codes.view(text.dtype).reshape(-1)
+        numbers[~simple] = stripped[~simple].astype(float) * np.where(
+            negative[~simple], -1.0, 1.0
+        )
+    return (numbers * multipliers).reshape(shape)
+
+
+# Raw (typed) values of the rows inserted with `insert_row`, per Treeview and item id
+row_values = weakref.WeakKeyDictionary()
+
+
+def insert_row(tree, values, raw_values=None) -> str:
     """
-    Formats a numeric value into a human-readable format with suffixes.
-    For example:
-    - 17090000 -> 17.09M
-    - 1000 -> 1.00K
-    - 999 -> 999.00
+    Insert a row of displayed `values` at the end of the Treeview.
+
+    Keeps `raw_values` (defaulting to `values`), one per column, for sorting.
+    """
+    item = tree.insert("", "end", values=values)
+    row_values.setdefault(tree, {})[item] = tuple(
+        values if raw_values is None else raw_values
+    )
+    return item
+
+
+def clear_rows(tree) -> None:
+    """Delete every row of the Treeview together with its raw values."""
+    tree.delete(*tree.get_children(""))
+    row_values.pop(tree, None)
+
+
+def sort_order(values, reverse=False) -> np.ndarray:
+    """
+    Return the indices that sort `values`, stably.
+
+    Numeric columns compare as numbers, anything else as strings; None always
+    sorts last.
     """
-    if value >= 1e9:
-        return f"{value / 1e9:.2f}B"
-    elif value >= 1e6:
-        return f"{value / 1e6:.2f}M"
-    elif value >= 1e3:
-        return f"{value / 1e3:.2f}K"
+    if set(map(type, values)) <= {int, float, type(None), np.int64, np.float64}:
+        # None converts to NaN
+        keys = np.array(values, dtype=float)
     else:
-        return f"{value:.2f}"
+        # Rank the strings so both directions can be sorted as numbers
+        strings = np.array(
+            ["" if value is None else str(value) for value in values], dtype=str
+        )
+        _, ranks = np.unique(strings, return_inverse=True)
+        keys = ranks.astype(float)
+        keys[[value is None for value in values]] = np.nan
+    # NaN sorts last either way, as -NaN is NaN
+    return np.argsort(-keys if reverse else keys, kind="stable")
 
 
-def parse_coins(coins_str) -> float:
+def reorder_moves(items, order) -> list:
     """
-    Parses a string with a suffix (k, M, B) into a numerical value.
+    Return the (item, index) moves that reorder `items` into `items[order]`.
+
+    Moves are in increasing index. Items on a longest increasing subsequence of
+    `order` are already in relative order and stay put; only the others move.
     """
-    multiplier = {"K": 1e3, "M": 1e6, "B": 1e9}
-    if coins_str[-1] in multiplier:
-        return float(coins_str[:-1]) * multiplier[coins_str[-1]]
-    return float(coins_str)
+    # Patience sorting: tails[k] is the position in `order` ending the best
+    # increasing run of length k + 1
+    order = [int(source) for source in order]
+    tails, tail_values, previous = [], [], [-1] * len(order)
+    for position, source in enumerate(order):
+        k = bisect.bisect_left(tail_values, source)
+        if k:
+            previous[position] = tails[k - 1]
+        if k == len(tails):
+            tails.append(position)
+            tail_values.append(source)
+        else:
+            tails[k] = position
+            tail_values[k] = source
 
+    keep = set()
+    position = tails[-1] if tails else -1
+    while position >= 0:
+        keep.add(position)
+        position = previous[position]
+    return [
+        (items[source], index)
+        for index, source in enumerate(order)
+        if index not in keep
+    ]
 
-def sort_column(tree, col, reverse) -> Any:
+
+def parse_column(texts) -> list:
     """
-    Sorts the Treeview by the specified column.
-    Uses `parse_coins` for correctly sorting human-readable coin values.
+    Parse the displayed texts of a column for sorting.
+
+    When every non-empty text is a number (coin values included) they are
+    parsed in one pass with `parse_coins_array`; otherwise the column is text.
+    Empty texts become None.
     """
+    texts = np.asarray(texts, dtype=str)
+    filled = texts != ""
+    try:
+        numbers = parse_coins_array(texts[filled])
+    except ValueError:
+        return [text if text else None for text in texts.tolist()]
+    values = np.full(len(texts), None, dtype=object)
+    values[filled] = numbers
+    return values.tolist()
 
-    def parse_value(value):
-        try:
-            # Attempt to parse coins if the column contains formatted coin values
-            return parse_coins(value)
-        except (ValueError, IndexError):
-            # Fallback to original value for non-coin columns
-            return value
 
-    # Extract data and parse values for sorting
-    data = [(parse_value(tree.set(k, col)), k) for k in tree.get_children("")]
-    data.sort(key=lambda t: t[0], reverse=reverse)
+def sort_column(tree, col, reverse) -> Any:
+    """
+    Sorts the Treeview by the specified column.
+    Uses the raw values stored by `insert_row` when available, otherwise parses
+    the displayed text with `parse_column` for correctly sorting coin values.
+    """
+    items = tree.get_children("")
+    raw = row_values.get(tree, {})
+    if all(item in raw for item in items):
+        column = list(tree["columns"]).index(col)
+        values = [raw[item][column] for item in items]
+    else:
+        values = parse_column([tree.set(item, col) for item in items])
 
-    # Reorder the Treeview
-    for index, (_, k) in enumerate(data):
-        tree.move(k, "", index)
+    # Detach the rows that are out of place and re-insert them at their index;
+    # the rest are already in relative order
+    moves = reorder_moves(items, sort_order(values, reverse))
+    if moves:
+        tree.detach(*[item for item, _ in moves])
+    for item, index in moves:
+        tree.move(item, "", index)
 
     # Update the column heading to toggle sorting direction
     tree.heading(col, command=lambda: sort_column(tree, col, not reverse))
@@ -61,5 +258,7 @@ def sortable_treeview(tree) -> None:
     """
     for col in tree["columns"]:
         tree.heading(
-            col, text=col, command=lambda _col=col: sort_column(tree, _col, False)
+            col,
+            text=tree.heading(col, "text") or col,
+            command=lambda _col=col: sort_column(tree, _col, False),
         )
@@ -0,0 +1,308 @@
+import tkinter as tk
+from collections import OrderedDict
+from tkinter import messagebox, ttk
+
+from tower_tracker.crud import count_rows, fetch_page, page_key
+from tower_tracker.ui.tasks import get_runner
+
+
+class VirtualTable(ttk.Frame):
+    """
+    A Treeview that pages entries in from the database on demand.
+
+    Only a fixed number of Treeview items exist, one per visible line; scrolling
+    re-fills them from a small cache of pages around the visible window. Pages are
+    fetched with keyset pagination when the previous page is cached, and by offset
+    when jumping. Clicking a heading re-issues an ordered page query instead of
+    sorting client-side. Every read runs on the application's TaskRunner, with
+    `indicator` (a BusyIndicator) shown meanwhile; the Tk thread only renders.
+
+    `columns` maps column ids to heading labels and `format_rows` turns a page of
+    entries into their displayed values in one pass; pages are formatted once, when
+    they are read. `row_tags`, when given, returns the Treeview tags of an entry
+    (e.g. to highlight it). Any other keyword arguments (`run_id`, `latest_only`,
+    `outliers_only`) are passed to `fetch_page` and `count_rows`. With `load=False`
+    nothing is read until the first `refresh`, or until `load` (which may run in
+    the background) is followed by `show`.
+    """
+
+    def __init__(
+        self, master, columns, format_rows, order_by="id", descending=False, height=20,
+        page_size=100, prefetch_pages=1, column_width=100, anchor=tk.W, load=True,
+        row_tags=None, indicator=None, **query
+    ) -> None:
+        super().__init__(master)
+        self.format_rows = format_rows
+        self.row_tags = row_tags
+        self.indicator = indicator
+        self.order_by = order_by
+        self.descending = descending
+        self.page_size = page_size
+        self.prefetch_pages = prefetch_pages
+        self.query = query
+        self.height = height
+        self.offset = 0
+        self.total = 0
+        self._pages = OrderedDict()
+        self._selected = {}  # entry id -> entry, kept across scrolling
+        self._slots = {}  # item id -> entry currently shown in it
+        # Bumped whenever the cached pages are replaced, so pages read for the old
+        # ones are dropped
+        self._generation = 0
+        self._reading = False
+
+        self.tree = ttk.Treeview(
+            self, columns=tuple(columns), show="headings", height=height
+        )
+        self.scrollbar = ttk.Scrollbar(
+            self, orient=tk.VERTICAL, command=self._on_scrollbar
+        )
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.labels = dict(columns)
+        for col, col_label in columns.items():
+            self.tree.heading(
+                col, text=col_label, command=lambda _col=col: self.sort_by(_col)
+            )
+            self.tree.column(col, width=column_width, anchor=anchor)
+        self.items = [self.tree.insert("", tk.END, values=()) for _ in range(height)]
+
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, self._on_wheel)
+        self.tree.bind("<Prior>", lambda event: self._on_key(-self.height))
+        self.tree.bind("<Next>", lambda event: self._on_key(self.height))
+
+        if load:
+            self.refresh()
+
+    # Data access
+
+    def _fetch(self, pages, page_index, session=None):
+        """
+        Return a page of (entries, displayed values) from `pages`.
+
+        The page is read from the database (and added to `pages`) when it is not
+        there yet.
+        """
+        if page_index in pages:
+            pages.move_to_end(page_index)
+            return pages[page_index]
+
+        previous = pages.get(page_index - 1)
+        if previous:
+            after = page_key(previous[0][-1], self.order_by)
+            rows = fetch_page(
+                self.order_by,
+                self.descending,
+                after=after,
+                limit=self.page_size,
+                session=session,
+                **self.query,
+            )
+        else:
+            rows = fetch_page(
+                self.order_by,
+                self.descending,
+                offset=page_index * self.page_size,
+                limit=self.page_size,
+                session=session,
+                **self.query,
+            )
+        pages[page_index] = rows, self.format_rows(rows)
+        return pages[page_index]
+
+    def _clamp(self, offset, total):
+        return max(min(int(offset), total - self.height), 0)
+
+    def _page_range(self, start, stop, total):
+        """Return the pages holding entries [start, stop) plus the prefetch buffer."""
+        first_page = max(start // self.page_size - self.prefetch_pages, 0)
+        last_page = (max(stop - 1, 0) // self.page_size) + self.prefetch_pages
+        return first_page, min(last_page, max(total - 1, 0) // self.page_size)
+
+    def _missing_pages(self, start, stop):
+        """Return the pages needed to show entries [start, stop) that are not cached."""
+        first_page, last_page = self._page_range(start, stop, self.total)
+        pages = range(first_page, last_page + 1)
+        return [page_index for page_index in pages if page_index not in self._pages]
+
+    def _read_pages(self, pages, page_indexes):
+        """
+        Read the given pages and return them.
+
+        Reading continues from `pages` (a copy of the cache) where it has their
+        predecessors. Touches no Tk state, so it runs on a worker thread.
+        """
+        for page_index in page_indexes:
+            self._fetch(pages, page_index)
+        return {page_index: pages[page_index] for page_index in page_indexes}
+
+    def _rows(self, start, stop):
+        """
+        Return entries [start, stop) and their displayed values.
+
+        They are taken from the cached pages, which must include them and their
+        prefetch buffer. Evicts the rest.
+        """
+        first_page, last_page = self._page_range(start, stop, self.total)
+
+        rows, values = [], []
+        for page_index in range(first_page, last_page + 1):
+            page_rows, page_values = self._pages[page_index]
+            page_start = page_index * self.page_size
+            window = slice(max(start - page_start, 0), max(stop - page_start, 0))
+            rows.extend(page_rows[window])
+            values.extend(page_values[window])
+
+        for page_index in list(self._pages):
+            if not first_page <= page_index <= last_page:
+                del self._pages[page_index]
+        return rows, values
+
+    def load(self, session=None):
+        """
+        Read the entry count and the pages around the current position.
+
+        Optionally reads through a session shared with other reads. Touches no Tk
+        state, so it may run on a worker thread; pass the result to `show`.
+        """
+        ordering = (self.order_by, self.descending)
+        total = count_rows(session=session, **self.query)
+        offset = self._clamp(self.offset, total)
+        pages = OrderedDict()
+        first_page, last_page = self._page_range(offset, offset + self.height, total)
+        for page_index in range(first_page, last_page + 1):
+            self._fetch(pages, page_index, session)
+        return ordering, total, pages
+
+    # Rendering
+
+    def show(self, loaded) -> None:
+        """Display the result of `load`, unless the table was re-sorted meanwhile."""
+        ordering, total, pages = loaded
+        if ordering != (self.order_by, self.descending):
+            return
+        self.total, self._pages = total, pages
+        self._generation += 1
+        self.scroll_to(self.offset)
+
+    def refresh(self) -> None:
+        """Drop every cached page and re-read the visible window in the background."""
+        get_runner().submit(
+            self.load, owner=self, on_done=self.show, indicator=self.indicator
+        )
+
+    def scroll_to(self, offset) -> None:
+        """
+        Show the entries from `offset` on.
+
+        Pages that are not cached are read in the background, and the window is
+        drawn once they arrive.
+        """
+        self.offset = self._clamp(offset, self.total)
+        self._set_scrollbar()
+        missing = self._missing_pages(self.offset, self.offset + self.height)
+        if not missing:
+            self._render()
+        elif not self._reading:
+            # One read at a time; when it is done, the latest offset is shown
+            self._reading = True
+            generation = self._generation
+            get_runner().submit(
+                self._read_pages, OrderedDict(self._pages), missing,
+                owner=self, indicator=self.indicator,
+                on_done=lambda pages: self._pages_read(generation, pages),
+                on_error=self._read_failed,
+            )
+
+    def _pages_read(self, generation, pages) -> None:
+        self._reading = False
+        # Pages read before a refresh or re-sort belong to the old window
+        if generation == self._generation:
+            self._pages.update(pages)
+        self.scroll_to(self.offset)
+
+    def _read_failed(self, error) -> None:
+        self._reading = False
+        messagebox.showerror("Error", str(error))
+
+    def _set_scrollbar(self) -> None:
+        if self.total:
+            end = min((self.offset + self.height) / self.total, 1.0)
+            self.scrollbar.set(self.offset / self.total, end)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _render(self) -> None:
+        rows, values = self._rows(self.offset, self.offset + self.height)
+
+        self._slots.clear()
+        selection = []
+        for index, item in enumerate(self.items):
+            if index < len(rows):
+                row = rows[index]
+                self._slots[item] = row
+                tags = self.row_tags(row) if self.row_tags else ()
+                self.tree.item(item, values=values[index], tags=tags)
+                self.tree.move(item, "", index)
+                if row.id in self._selected:
+                    selection.append(item)
+            elif self.tree.exists(item):
+                self.tree.detach(item)
+        self.tree.selection_set(selection)
+
+    def sort_by(self, col) -> None:
+        """Order the table by `col`, toggling the direction when it already is."""
+        self.descending = not self.descending if col == self.order_by else False
+        self.order_by = col
+        for column, label in self.labels.items():
+            arrow = (" ▼" if self.descending else " ▲") if column == col else ""
+            self.tree.heading(column, text=label + arrow)
+        self.offset = 0
+        # Pages of the old order must not be mixed with the new one
+        self._pages = OrderedDict()
+        self._generation += 1
+        self.refresh()
+
+    # Selection
+
+    def _on_select(self, event=None) -> None:
+        visible = {row.id: row for row in self._slots.values()}
+        for key in visible:
+            self._selected.pop(key, None)
+        for item in self.tree.selection():
+            if item in self._slots:
+                row = self._slots[item]
+                self._selected[row.id] = row
+
+    def selected_rows(self):
+        """Return the selected entries, including ones scrolled out of view."""
+        return list(self._selected.values())
+
+    def clear_selection(self) -> None:
+        """Deselect every entry, including ones scrolled out of view."""
+        self._selected.clear()
+        self.tree.selection_set(())
+
+    # Scrolling
+
+    def _on_scrollbar(self, action, amount, unit=None) -> None:
+        if action == "moveto":
+            self.scroll_to(float(amount) * self.total)
+        elif unit == "pages":
+            self.scroll_to(self.offset + int(amount) * self.height)
+        else:
+            self.scroll_to(self.offset + int(amount))
+
+    def _on_wheel(self, event) -> str:
+        if event.num == 4 or getattr(event, "delta", 0) > 0:
+            self.scroll_to(self.offset - 3)
+        else:
+            self.scroll_to(self.offset + 3)
+        return "break"
+
+    def _on_key(self, lines) -> str:
+        self.scroll_to(self.offset + lines)
+        return "break"
@@ -2,14 +2,92 @@ import tkinter as tk
 from tkinter import messagebox, ttk
 
 import numpy as np
-import pandas as pd
-from matplotlib import pyplot as plt
 
-from tower_tracker.crud import delete_data, fetch_all_entries_for_run, fetch_all_runs, get_run_status, get_run_tier, get_active_run_id, insert_run
-from tower_tracker.data_viewer import generate_new_run_id
-from tower_tracker.database import get_session
-from tower_tracker.models.models import RunStatistics
-from tower_tracker.ui.utils import format_coins, parse_coins, sortable_treeview
+from tower_tracker.crud import get_run_context
+from tower_tracker.outliers import rescore_stale_tiers
+from tower_tracker.repository import unit_of_work
+from tower_tracker.series import fetch_run_series
+from tower_tracker.ui.tasks import BusyIndicator, get_runner
+from tower_tracker.ui.utils import (
+    clear_rows,
+    format_coins_array,
+    insert_row,
+    parse_coins,
+    sortable_treeview,
+)
+from tower_tracker.ui.virtual_table import VirtualTable
+from tower_tracker.writer import get_writer
+
+
+def entry_columns(entries, *names):
+    """Return the named attributes of `entries`, as one list per attribute."""
+    return [[getattr(entry, name) for entry in entries] for name in names]
+
+def format_decimals(values):
+    """
+    Format numbers rounded to two decimals.
+
+    Missing values (None/NaN) become empty strings.
+    """
+    values = np.asarray(values, dtype=float)
+    return np.where(np.isnan(values), "", np.char.mod("%.2f", values.round(2)))
+
+# pandas (data_viewer) and matplotlib (graphing) are imported when first needed,
+# keeping them off the application's startup path. The data_viewer imports run on
+# worker threads.
+
+def load_latest_runs():
+    """Return the latest entry of every run, with rates."""
+    from tower_tracker.data_viewer import analyze_latest_runs
+
+    return analyze_latest_runs()
+
+def load_tier_averages(exact_medians=False):
+    """Return the tier averages with the median wave and coins per hour."""
+    from tower_tracker.data_viewer import tier_averages
+    from tower_tracker.sketches import tier_medians
+
+    rows = tier_medians(("wave", "coins_per_hour"), exact=exact_medians)
+    medians = {row[0]: row[1:] for row in rows}
+    nan = float("nan")
+    return [tuple(row) + medians.get(row.tier, (nan, nan)) for row in tier_averages()]
+
+def load_tier_box_stats():
+    """Return the sketched box plot statistics of every tier."""
+    from tower_tracker.sketches import tier_box_stats
+
+    return tier_box_stats()
+
+def delete_selected_entries(window, table, indicator, refresh) -> None:
+    """
+    Delete the entries selected in `table` in the background.
+
+    Reports the outcome and refreshes.
+    """
+    selected_rows = table.selected_rows()
+    if not selected_rows:
+        messagebox.showwarning("No Selection", "Please select an entry to delete.")
+        return
+
+    # Queued together, the deletes share one commit
+    def delete_rows():
+        writer = get_writer()
+        futures = [(row.id, writer.delete_data(row.id)) for row in selected_rows]
+        return [(entry_id, future.result()) for entry_id, future in futures]
+
+    def report(results) -> None:
+        for entry_id, deleted in results:
+            if deleted:
+                messagebox.showinfo(
+                    "Success", f"Entry ID {entry_id} deleted successfully!"
+                )
+            else:
+                messagebox.showerror("Error", f"Failed to delete entry ID {entry_id}.")
+
+        table.clear_selection()
+        refresh()
+
+    get_runner().submit(delete_rows, owner=window, on_done=report, indicator=indicator)
 
 def show_run_entries(run_id):
     """
@@ -19,9 +97,6 @@ def show_run_entries(run_id):
     entries_window = tk.Toplevel()
     entries_window.title(f"Entries for Run {run_id}")
 
-    tree = ttk.Treeview(entries_window, columns=("id", "tier", "wave", "coins", "coins_per_hour", "cells", "cells_per_hour", "time_spent", "notes", "datetime_collected"), show="headings")
-    tree.pack(fill=tk.BOTH, expand=True)
-
     # Define column headers
     column_names = {
         "id": "Id",
@@ -35,74 +110,92 @@ def show_run_entries(run_id):
         "notes": "Notes",
         "datetime_collected": "Datetime Collected",
     }
-    for col, col_label in column_names.items():
-        tree.heading(col, text=col_label)
-        tree.column(col, width=120, anchor=tk.CENTER)
 
-    # Populate EntryViewer with data
-    data = []
+    def format_entries(entries):
+        # The rates are stored with the entries, NULL where no time was recorded
+        (
+            ids, tiers, waves, coins, coins_per_hour, cells, cells_per_hour,
+            time_spent, notes, collected,
+        ) = entry_columns(entries, *column_names)
+        return list(zip(
+            ids,
+            tiers,
+            waves,
+            format_coins_array(coins),
+            format_coins_array(coins_per_hour),
+            cells,
+            format_decimals(cells_per_hour),
+            time_spent,
+            notes,
+            collected,
+        ))
+
+    # Database work runs in the background while the bar is shown
+    indicator = BusyIndicator(entries_window)
+    runner = get_runner()
+
+    # Entries are paged in on demand, ordered by collection time
+    table = VirtualTable(
+        entries_window, column_names, format_entries, order_by="datetime_collected",
+        column_width=120, anchor=tk.CENTER, load=False, indicator=indicator,
+        run_id=run_id,
+    )
+    table.pack(fill=tk.BOTH, expand=True)
+
     def load_data() -> None:
-        for row in tree.get_children():
-            tree.delete(row)
-
-        # Clear the data list
-        data.clear()
-
-        entries = fetch_all_entries_for_run(run_id)
-        for entry in entries:
-            coins_per_hour = entry.coins / (entry.time_spent / 3600) if entry.time_spent else 0
-            cells_per_hour = entry.cells / (entry.time_spent / 3600) if entry.time_spent else 0
-            tree.insert(
-                "",
-                tk.END,
-                values=(
-                    entry.id,
-                    entry.tier,
-                    entry.wave,
-                    format_coins(entry.coins),
-                    format_coins(coins_per_hour),
-                    entry.cells,
-                    f"{cells_per_hour:.2f}",
-                    entry.time_spent,
-                    entry.notes,
-                    entry.datetime_collected,
-                ),
-            )
-            data.append({
-                "datetime": entry.datetime_collected,
-                "coins": entry.coins,
-                "coins_per_hour": coins_per_hour,
-                "cells": entry.cells,
-                "cells_per_hour": cells_per_hour,
-                "time_spent": entry.time_spent,
-            })
+        runner.submit(
+            table.load, owner=entries_window, on_done=table.show, indicator=indicator
+        )
 
-    load_data()
+    # The first page and the run status are read through one session
+    def load_window():
+        with unit_of_work() as repo:
+            return table.load(repo.session), repo.run_status(run_id)
+
+    def show_window(result) -> None:
+        loaded, run_ended = result
+        table.show(loaded)
+        # Lock/unlock adding entries based on the run status
+        add_entry_button.configure(state=tk.DISABLED if run_ended else tk.NORMAL)
+
+    # Plots need the whole run, so its columns are only read when a plot is requested
+    def load_plot_data():
+        series = fetch_run_series(run_id)
+        if not len(series):
+            return None
+        return {
+            "time_spent": series.time_spent,
+            "coins": series.coins,
+            "cells": series.cells,
+            **series.rates(),
+        }
 
     # Helper function to plot a specific metric
     def plot_metric(metric_key, ylabel, title):
+        runner.submit(
+            load_plot_data, owner=entries_window, indicator=indicator,
+            on_done=lambda data: draw_metric(data, metric_key, ylabel, title),
+        )
+
+    def draw_metric(data, metric_key, ylabel, title):
         if not data:
             messagebox.showwarning("No Data", "No data available to plot.")
             return
 
-        timestamps = [entry["time_spent"] for entry in data]
-        metric_values = [entry[metric_key] for entry in data]
+        from matplotlib import pyplot as plt
 
-        plt.figure(figsize=(10, 6))
-        plt.plot(timestamps, metric_values, marker='o')
-        plt.title(title)
-        plt.xlabel("Time")
-        plt.ylabel(ylabel)
-        plt.grid(True)
-        plt.tight_layout()
-        plt.show()
+        from tower_tracker.ui.graphing import plot_time_series
 
-    # Lock/unlock the tier field based on the active run
-    entry_state = tk.DISABLED if get_run_status(run_id=run_id) else tk.NORMAL
+        # Long runs are downsampled; zooming in re-reads the full series
+        plot_time_series(data["time_spent"], data[metric_key], title, "Time", ylabel)
+        plt.show()
 
-    # Add button to open Add Entry UI
-    add_entry_button = tk.Button(entries_window, text="Add New Entry", state=entry_state, command=lambda: show_add_entry_window(
-        load_data, run_id=run_id)
+    # Add button to open Add Entry UI, enabled once the run is known to be open
+    add_entry_button = tk.Button(
+        entries_window,
+        text="Add New Entry",
+        state=tk.DISABLED,
+        command=lambda: show_add_entry_window(load_data, run_id=run_id),
     )
     add_entry_button.pack(pady=5)
 
@@ -125,21 +218,7 @@ def show_run_entries(run_id):
 
     # Add delete button
     def delete_selected() -> None:
-        selected_item = tree.selection()
-        if not selected_item:
-            messagebox.showwarning("No Selection", "Please select an entry to delete.")
-            return
-
-        for item in selected_item:
-            entry_id = tree.item(item, "values")[0]
-            if delete_data(entry_id):
-                messagebox.showinfo(
-                    "Success", f"Entry ID {entry_id} deleted successfully!"
-                )
-            else:
-                messagebox.showerror("Error", f"Failed to delete entry ID {entry_id}.")
-
-        load_data()
+        delete_selected_entries(entries_window, table, indicator, load_data)
 
     delete_button = tk.Button(entries_window, text="Delete Selected", command=delete_selected)
     delete_button.pack(pady=5)
@@ -147,6 +226,11 @@ def show_run_entries(run_id):
     # Close button
     tk.Button(entries_window, text="Close", command=entries_window.destroy).pack(pady=10)
 
+    runner.submit(
+        load_window, owner=entries_window, on_done=show_window, indicator=indicator
+    )
+
+
 def show_add_entry_window(refresh_callback, run_id=None):
     """
     Opens a window to add a new entry and refreshes the table after submission.
@@ -154,30 +238,16 @@ def show_add_entry_window(refresh_callback, run_id=None):
     add_window = tk.Toplevel()
     add_window.title("Add Entry")
 
-    # Determine current active run or generate a new one.
-    active_run_id = get_active_run_id()
-
-    if run_id is None:  # No run_id provided, determine if a new run should be created
-        current_run_id = active_run_id or generate_new_run_id()
-    else:  # Use the provided run_id
-        current_run_id = run_id
-
-    run_id_var = tk.StringVar(value=str(current_run_id))
+    run_id_var = tk.StringVar()
 
     # Display current run_id
     tk.Label(add_window, text="Run ID").grid(row=0, column=0)
     tk.Entry(add_window, textvariable=run_id_var, state="readonly").grid(row=0, column=1)
 
-    # Determine the tier based on the current run
-    tier_value = get_run_tier(current_run_id)  # Fetch the tier for the active run, or None for a new run
-    tier_var = tk.StringVar(value=str(tier_value) if tier_value is not None else "")
-
-    # Lock/unlock the tier field based on the active run
-    tier_state = "readonly" if tier_value is not None else "normal"
-
-    # Display tier field
+    # Display tier field, locked until the run is known
+    tier_var = tk.StringVar()
     tk.Label(add_window, text="Tier").grid(row=1, column=0)
-    tier = tk.Entry(add_window, textvariable=tier_var, state=tier_state)
+    tier = tk.Entry(add_window, textvariable=tier_var, state="readonly")
     tier.grid(row=1, column=1)
 
     tk.Label(add_window, text="Wave").grid(row=2, column=0)
@@ -215,21 +285,49 @@ def show_add_entry_window(refresh_callback, run_id=None):
             end_round_value = end_of_round.get()
             current_run_id = int(run_id_var.get())
 
-            if active_run_id and end_round_value:
-                # End the current run
-                with get_session() as session:
-                    session.query(RunStatistics).filter_by(run_id=current_run_id).update({"end_of_round": True})
-                    session.commit()
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to add data: {e}")
+            return
 
-            # Add the new entry
-            insert_run(current_run_id, tier_value, wave_value, coins_value, cells_value, time_value, notes_value, end_round_value)
+        def on_added(_) -> None:
             messagebox.showinfo("Success", "Entry added successfully!")
             refresh_callback()
             add_window.destroy()
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to add data: {e}")
 
-    tk.Button(add_window, text="Submit", command=submit).grid(row=8, column=1)
+        # Add the new entry; an end-of-round entry also ends the run
+        def add_entry():
+            future = get_writer().insert_run(
+                current_run_id, tier_value, wave_value, coins_value, cells_value,
+                time_value, notes_value, end_round_value,
+            )
+            return future.result()
+
+        get_runner().submit(
+            add_entry,
+            owner=add_window,
+            on_done=on_added,
+            on_error=lambda e: messagebox.showerror(
+                "Error", f"Failed to add data: {e}"
+            ),
+        )
+
+    submit_button = tk.Button(
+        add_window, text="Submit", state=tk.DISABLED, command=submit
+    )
+    submit_button.grid(row=8, column=1)
+
+    def show_context(context) -> None:
+        run_id_var.set(str(context.run_id))
+        # The tier of the active run, or None for a new run
+        tier_var.set(str(context.tier) if context.tier is not None else "")
+        # Lock/unlock the tier field based on the active run
+        tier.configure(state="readonly" if context.tier is not None else "normal")
+        submit_button.configure(state=tk.NORMAL)
+
+    # Determine current active run or generate a new one, along with its tier,
+    # in a single background query. Without a run_id the active run, or else a
+    # new one, is used.
+    get_runner().submit(get_run_context, run_id, owner=add_window, on_done=show_context)
 
 
 def show_data_viewer() -> None:
@@ -240,25 +338,6 @@ def show_data_viewer() -> None:
     viewer = tk.Toplevel()
     viewer.title("Data Viewer")
 
-    # Create Treeview
-    tree = ttk.Treeview(
-        viewer,
-        columns=(
-            "id",
-            "run_id",
-            "tier",
-            "wave",
-            "coins",
-            "cells",
-            "time_spent",
-            "notes",
-            "end_of_round",
-            "datetime_collected",
-        ),
-        show="headings",
-    )
-    tree.pack(fill=tk.BOTH, expand=True)
-
     # Define columns
     column_names = {
         "id": "ID",
@@ -271,69 +350,77 @@ def show_data_viewer() -> None:
         "notes": "Notes",
         "end_of_round": "End of Round",
         "datetime_collected": "Datetime Collected",
+        "outlier_score": "Outlier Score",
     }
-    for col, col_label in column_names.items():
-        tree.heading(col, text=col_label)
-        tree.column(col, width=100, anchor=tk.W)
 
-    # Populate Treeview with data
+    def format_runs(runs):
+        (
+            ids, run_ids, tiers, waves, coins, cells, time_spent, notes, ended,
+            collected, scores,
+        ) = entry_columns(
+            runs, "id", "run_id", "tier", "wave", "coins", "cells", "time_spent",
+            "notes", "end_of_round", "datetime_collected", "outlier_score",
+        )
+        return list(zip(
+            ids, run_ids, tiers, waves, format_coins_array(coins), cells, time_spent,
+            notes, ended, collected, format_decimals(scores),
+        ))
+
+    # Database work runs in the background while the bar is shown
+    indicator = BusyIndicator(viewer)
+    runner = get_runner()
+
+    # The latest entry of every run, paged in on demand; headings sort in the database.
+    # Runs flagged as outliers within their tier are highlighted
+    table = VirtualTable(
+        viewer, column_names, format_runs, order_by="run_id", load=False,
+        indicator=indicator, latest_only=True,
+        row_tags=lambda row: ("outlier",) if row.outlier else (),
+    )
+    table.tree.tag_configure("outlier", background="#f8d7da")
+    table.pack(fill=tk.BOTH, expand=True)
+
     def load_data() -> None:
-        for row in tree.get_children():
-            tree.delete(row)
-
-        data = fetch_all_runs()
-        for run in data:
-            tree.insert(
-                "",
-                tk.END,
-                values=(
-                    run.id,
-                    run.run_id,
-                    run.tier,
-                    run.wave,
-                    format_coins(run.coins),
-                    run.cells,
-                    run.time_spent,
-                    run.notes,
-                    run.end_of_round,
-                    run.datetime_collected,
-                ),
-            )
+        runner.submit(table.load, owner=viewer, on_done=table.show, indicator=indicator)
 
     load_data()
 
-    # Enable sorting
-    sortable_treeview(tree)
+    def filter_outliers() -> None:
+        table.query["outliers_only"] = outliers_only.get()
+        table.offset = 0
+        table.clear_selection()
+        load_data()
+
+    outliers_only = tk.BooleanVar(value=False)
+    tk.Checkbutton(
+        viewer, text="Outliers only", variable=outliers_only, command=filter_outliers
+    ).pack()
+
+    # Scores entries against fresh tier statistics when the tiers have grown.
+    # Loading the table only reads; the rescoring is queued on the writer
+    def rescore_outliers() -> None:
+        future = get_writer().submit(rescore_stale_tiers)
+        runner.submit(
+            future.result, owner=viewer, on_done=lambda _: load_data(),
+            indicator=indicator,
+        )
+
+    tk.Button(viewer, text="Rescore Outliers", command=rescore_outliers).pack(pady=5)
 
     # View all entries for a specific run
     def view_run_details():
-        selected_item = tree.selection()
-        if not selected_item:
+        selected_rows = table.selected_rows()
+        if not selected_rows:
             messagebox.showwarning("No Selection", "Please select a run to view.")
             return
 
-        run_id = tree.item(selected_item[0], "values")[1]
-        show_run_entries(run_id)
+        show_run_entries(selected_rows[0].run_id)
 
     tk.Button(viewer, text="View Run Details", command=view_run_details).pack(pady=5)
 
     # Add delete button
     def delete_selected() -> None:
-        selected_item = tree.selection()
-        if not selected_item:
-            messagebox.showwarning("No Selection", "Please select an entry to delete.")
-            return
-
-        for item in selected_item:
-            entry_id = tree.item(item, "values")[0]
-            if delete_data(entry_id):
-                messagebox.showinfo(
-                    "Success", f"Entry ID {entry_id} deleted successfully!"
-                )
-            else:
-                messagebox.showerror("Error", f"Failed to delete entry ID {entry_id}.")
-
-        load_data()
+        delete_selected_entries(viewer, table, indicator, load_data)
 
     delete_button = tk.Button(viewer, text="Delete Selected", command=delete_selected)
     delete_button.pack(pady=5)
@@ -349,85 +436,50 @@ def show_data_viewer() -> None:
     add_entry_button.pack(pady=5)
 
     # Add box-and-whisker plot buttons
-    # TODO: This sucks, refactor into the graphing.py module
+    # By default the boxes come from the per-tier sketches of ended runs; the exact
+    # plots load every run and overlay its data point
+    exact_boxplots = tk.BooleanVar(value=False)
+
     def view_boxplot() -> None:
         """
         Fetch aggregated data and show box-and-whisker plots grouped by tier.
         Includes datapoints to visualize outliers and distribution.
         """
-        with get_session() as session:
-            # Subquery to get the latest entry for each run_id
-            subquery = """
-            SELECT run_id, MAX(datetime_collected) AS latest_datetime
-            FROM run_statistics
-            GROUP BY run_id
-            """
-
-            # Main query to fetch the latest entries for each run_id
-            query = f"""
-            SELECT rs.*
-            FROM run_statistics rs
-            INNER JOIN ({subquery}) AS sub
-            ON rs.run_id = sub.run_id AND rs.datetime_collected = sub.latest_datetime
-            """
-
-            # Execute the query
-            df = pd.read_sql_query(query, session.bind)
-            df["coins_per_hour"] = df["coins"] / (df["time_spent"] / 3600)
-            df["coins_per_wave"] = df["coins"] / df["wave"]
-            df["cells_per_hour"] = df["cells"] / (df["time_spent"] / 3600)
-            df["cells_per_wave"] = df["cells"] / df["wave"]
-
-        metrics = [
-            "coins_per_hour",
-            "coins_per_wave",
-            "cells_per_hour",
-            "cells_per_wave",
-        ]
-
-        for metric in metrics:
-            grouped_data = [
-                # Filter out zero values
-                df[(df["tier"] == tier) & (df[metric] > 0)][metric].dropna()
-                for tier in sorted(df["tier"].unique())
-            ]
-            tiers = sorted(df["tier"].unique())
-
-            plt.figure(figsize=(12, 8))
-
-            # Create the box-and-whisker plot
-            boxplot = plt.boxplot(
-                grouped_data, labels=tiers, patch_artist=True, showfliers=True
+        if exact_boxplots.get():
+            runner.submit(
+                load_latest_runs, owner=viewer, on_done=draw_boxplots,
+                indicator=indicator,
+            )
+        else:
+            runner.submit(
+                load_tier_box_stats, owner=viewer, on_done=draw_sketched_boxplots,
+                indicator=indicator,
             )
 
-            # Add individual data points
-            for i, tier in enumerate(tiers):
-                data_points = grouped_data[i]
-                # Add jitter to x-axis to spread data points slightly
-                jittered_x = np.random.normal(
-                    loc=i + 1, scale=0.05, size=len(data_points)
-                )
-                plt.scatter(
-                    jittered_x,
-                    data_points,
-                    alpha=0.6,
-                    label=f"Tier {tier}",
-                    color="blue",
-                )
+    def draw_boxplots(df) -> None:
+        if df.empty:
+            messagebox.showwarning("No Data", "No data available to plot.")
+            return
+        from tower_tracker.ui.graphing import plot_outliers
 
-            plt.title(
-                f"{metric.replace('_', ' ').capitalize()} by Tier with Data Points"
-            )
-            plt.xlabel("Tier")
-            plt.ylabel(metric.replace("_", " ").capitalize())
-            plt.grid(axis="y", linestyle="--", alpha=0.7)
-            plt.tight_layout()
-            plt.show()
+        plot_outliers(df)
+
+    def draw_sketched_boxplots(stats) -> None:
+        if not any(stats.values()):
+            messagebox.showwarning("No Data", "No ended runs available to plot.")
+            return
+        from matplotlib import pyplot as plt
+
+        from tower_tracker.ui.graphing import plot_tier_sketches
+
+        plot_tier_sketches(stats)
+        plt.show()
 
     plot_button = tk.Button(
         viewer, text="View Box-and-Whisker Plots", command=view_boxplot
     )
     plot_button.pack(pady=5)
+    tk.Checkbutton(viewer, text="Exact box plots", variable=exact_boxplots).pack()
 
 
 def show_averages() -> None:
@@ -447,6 +499,8 @@ def show_averages() -> None:
             "avg_coins_per_wave",
             "avg_cells_per_hour",
             "avg_cells_per_wave",
+            "median_wave",
+            "median_coins_per_hour",
         ),
         show="headings",
     )
@@ -460,45 +514,49 @@ def show_averages() -> None:
         "avg_coins_per_wave": "Avg Coins/Wave",
         "avg_cells_per_hour": "Avg Cells/Hour",
         "avg_cells_per_wave": "Avg Cells/Wave",
+        "median_wave": "Median Wave",
+        "median_coins_per_hour": "Median Coins/Hour",
     }
     for col, col_label in column_names.items():
         tree.heading(col, text=col_label)
         tree.column(col, width=150, anchor=tk.CENTER)
 
-    # Fetch data and populate Treeview
-    with get_session() as session:
-        df = pd.read_sql_query("SELECT * FROM run_statistics", session.bind)
-        df["avg_wave"] = df.groupby("tier")["wave"].transform("mean")
-        df["coins_per_hour"] = df["coins"] / (df["time_spent"] / 3600)
-        df["coins_per_wave"] = df["coins"] / df["wave"]
-        df["cells_per_hour"] = df["cells"] / (df["time_spent"] / 3600)
-        df["cells_per_wave"] = df["cells"] / df["wave"]
-
-        averages = (
-            df.groupby("tier")
-            .agg(
-                avg_wave=("avg_wave", "first"),
-                avg_coins_per_hour=("coins_per_hour", "mean"),
-                avg_coins_per_wave=("coins_per_wave", "mean"),
-                avg_cells_per_hour=("cells_per_hour", "mean"),
-                avg_cells_per_wave=("cells_per_wave", "mean"),
-            )
-            .reset_index()
+    # Fetch the per-tier averages, aggregated by the database, and the medians of
+    # ended runs, approximated by the tier sketches unless exact ones are asked for.
+    # Rates are None for tiers whose entries all have zero time or waves
+    def fill(averages) -> None:
+        clear_rows(tree)
+        (
+            tiers, waves, coins_per_hour, coins_per_wave, cells_per_hour,
+            cells_per_wave, median_waves, median_coins_per_hour,
+        ) = list(zip(*averages)) or [()] * 8
+        values = zip(
+            tiers,
+            format_decimals(waves),
+            format_coins_array(coins_per_hour),
+            format_coins_array(coins_per_wave),
+            format_decimals(cells_per_hour),
+            format_decimals(cells_per_wave),
+            format_decimals(median_waves),
+            format_coins_array(median_coins_per_hour),
         )
+        for row, row_values in zip(averages, values):
+            # Sorting uses the raw numbers, not the formatted text
+            insert_row(tree, row_values, raw_values=tuple(row))
 
-        for _, row in averages.iterrows():
-            tree.insert(
-                "",
-                tk.END,
-                values=(
-                    int(row["tier"]),
-                    round(row["avg_wave"], 2),
-                    format_coins(row["avg_coins_per_hour"]),
-                    format_coins(row["avg_coins_per_wave"]),
-                    round(row["avg_cells_per_hour"], 2),
-                    round(row["avg_cells_per_wave"], 2),
-                ),
-            )
+    exact_medians = tk.BooleanVar(value=False)
+    indicator = BusyIndicator(averages_window)
+
+    def load() -> None:
+        get_runner().submit(
+            load_tier_averages, exact_medians.get(), owner=averages_window,
+            on_done=fill, indicator=indicator,
+        )
+
+    load()
+    tk.Checkbutton(
+        averages_window, text="Exact medians", variable=exact_medians, command=load
+    ).pack()
 
     # Enable sorting
     sortable_treeview(tree)
@@ -0,0 +1,309 @@
+"""
+Group-commit write queue.
+
+Everything in a process that writes entries one at a time (the GUI, scripted
+loggers) can hand its `insert_run` and `delete_data` calls to a single writer
+thread instead of committing each one itself. The thread takes whatever is
+queued, up to WRITER_BATCH requests, and applies the batch in one transaction
+with a single commit. Requests arriving while a batch commits make up the next
+one; WRITER_DELAY_MS additionally lingers after the first request of a batch,
+trading latency for larger batches. Consecutive inserts become one executemany
+and consecutive deletes one DELETE, each in a savepoint; when one of those fails
+(e.g. on a duplicate checkpoint) its requests are replayed one savepoint each,
+so only the offending request's future fails.
+
+The transaction takes SQLite's write lock up front (BEGIN IMMEDIATE), so other
+processes make it wait through busy_timeout rather than deadlock it. When the
+database stays locked beyond that, the batch is retried with exponential backoff.
+
+Usage:
+    future = get_writer().insert_run(
+        run_id, tier, wave, coins, cells, time_spent, notes, end_of_round
+    )
+    entry_id = future.result()  # waits for the commit
+"""
+import atexit
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+from itertools import groupby
+from typing import Any, List, NamedTuple
+
+from sqlalchemy import delete, insert, text, update
+from sqlalchemy.exc import OperationalError
+
+from tower_tracker.cache import query_cache
+from tower_tracker.crud import add_run, remove_entry
+from tower_tracker.database import get_session
+from tower_tracker.models.models import RunStatistics
+
+# Longest wait for more requests after the first one, and the most requests per
+# transaction
+WRITER_DELAY_MS = float(os.environ.get("TOWER_TRACKER_WRITER_DELAY_MS", "0"))
+WRITER_BATCH = int(os.environ.get("TOWER_TRACKER_WRITER_BATCH", "500"))
+
+# SQLITE_BUSY and SQLITE_LOCKED, the primary result codes of a locked database
+_BUSY_CODES = (5, 6)
+
+
+def is_busy_error(error: OperationalError) -> bool:
+    """Return whether `error` means the database was locked by another writer."""
+    code = getattr(error.orig, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in _BUSY_CODES
+    return "database is locked" in str(error.orig)
+
+
+class Request(NamedTuple):
+    """A queued write and the future resolved once it is committed."""
+
+    kind: str  # "insert" (params are add_run's), "delete" (the entry id) or "call"
+    params: Any
+    future: Future
+
+    def apply(self, session):
+        """Run this request alone, as `crud.insert_run`/`delete_data` would."""
+        if self.kind == "insert":
+            return add_run(session, **self.params)
+        if self.kind == "delete":
+            return remove_entry(session, self.params)
+        return self.params(session)
+
+
+_STOP = object()
+
+
+class GroupCommitWriter:
+    """
+    A queue of write requests consumed by one thread, committing them in batches.
+
+    `apply` callables get the batch's session and must not commit.
+    """
+
+    def __init__(
+        self,
+        max_delay_ms: float = WRITER_DELAY_MS,
+        max_batch: int = WRITER_BATCH,
+        retries: int = 8,
+        backoff: float = 0.01,
+        max_backoff: float = 1.0,
+    ) -> None:
+        self.max_delay = max_delay_ms / 1000
+        self.max_batch = max(max_batch, 1)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.batches = 0
+        self.requests = 0
+        self.busy_retries = 0
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="tower-tracker-writer", daemon=True
+        )
+        self._thread.start()
+
+    def _put(self, kind: str, params) -> Future:
+        if self._closed:
+            raise RuntimeError("The writer is closed")
+        future = Future()
+        self._queue.put(Request(kind, params, future))
+        return future
+
+    def submit(self, apply) -> Future:
+        """Queue `apply(session)`; the future resolves to its result once committed."""
+        return self._put("call", apply)
+
+    def insert_run(
+        self, run_id, tier, wave, coins, cells, time_spent, notes, end_of_round
+    ) -> Future:
+        """Queue `crud.insert_run`; the future resolves to the new entry's id."""
+        return self._put("insert", {
+            "run_id": run_id, "tier": tier, "wave": wave, "coins": coins,
+            "cells": cells, "time_spent": time_spent, "notes": notes,
+            "end_of_round": bool(end_of_round),
+        })
+
+    def delete_data(self, entry_id) -> Future:
+        """Queue `crud.delete_data`; the future resolves to whether it deleted."""
+        return self._put("delete", entry_id)
+
+    def flush(self) -> None:
+        """Wait until everything queued so far is committed."""
+        self.submit(lambda session: None).result()
+
+    def close(self, timeout=None) -> None:
+        """Commit what is queued and stop the writer thread."""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        """Return the batch, request and retry counters and the queue length."""
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "busy_retries": self.busy_retries,
+            "pending": self._queue.qsize(),
+        }
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch = [first]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    remaining = max(deadline - time.monotonic(), 0)
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if request is _STOP:
+                    stopping = True
+                    break
+                batch.append(request)
+            batch = [
+                request
+                for request in batch
+                if request.future.set_running_or_notify_cancel()
+            ]
+            if batch:
+                self._commit(batch)
+
+    def _commit(self, batch: List[Request]) -> None:
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            try:
+                outcomes = self._apply(batch)
+                break
+            except OperationalError as error:
+                if not is_busy_error(error) or attempt == self.retries:
+                    self._fail(batch, error)
+                    return
+                self.busy_retries += 1
+                time.sleep(delay * random.uniform(0.5, 1.5))
+                delay = min(delay * 2, self.max_backoff)
+            except Exception as error:
+                self._fail(batch, error)
+                return
+
+        query_cache.bump()
+        self.batches += 1
+        self.requests += len(batch)
+        for request, (error, result) in zip(batch, outcomes):
+            if error is not None:
+                request.future.set_exception(error)
+            else:
+                request.future.set_result(result)
+
+    def _apply(self, batch: List[Request]) -> list:
+        """Run the batch in one transaction; return an (error, result) per request."""
+        outcomes = []
+        with get_session() as session:
+            session.execute(text("BEGIN IMMEDIATE"))
+            # Runs of the same kind are applied together, in queue order
+            for kind, requests in groupby(batch, key=lambda request: request.kind):
+                requests = list(requests)
+                bulk = {"insert": _insert_many, "delete": _delete_many}.get(kind)
+                if bulk is not None:
+                    try:
+                        with session.begin_nested():
+                            results = bulk(session, requests)
+                        outcomes += [(None, result) for result in results]
+                        continue
+                    except OperationalError as error:
+                        if is_busy_error(error):
+                            raise
+                    except Exception:
+                        pass
+                outcomes += [_apply_one(session, request) for request in requests]
+            session.commit()
+        return outcomes
+
+    @staticmethod
+    def _fail(batch: List[Request], error: Exception) -> None:
+        for request in batch:
+            request.future.set_exception(error)
+
+
+def _apply_one(session, request: Request) -> tuple:
+    try:
+        with session.begin_nested():
+            return None, request.apply(session)
+    except OperationalError as error:
+        if is_busy_error(error):
+            raise
+        return error, None
+    except Exception as error:
+        return error, None
+
+
+_INSERT = insert(RunStatistics).returning(
+    RunStatistics.id, sort_by_parameter_order=True
+)
+
+
+def _insert_many(session, requests: List[Request]) -> List[int]:
+    """
+    Insert the entries with one executemany.
+
+    Then the runs that got an end-of-round entry are ended: like `add_run` in
+    turn, only the entries inserted before a run's last end-of-round entry are
+    marked.
+    """
+    params = [request.params for request in requests]
+    ids = session.execute(_INSERT, params).scalars().all()
+    last_end = {}
+    for request, entry_id in zip(requests, ids):
+        if request.params["end_of_round"]:
+            last_end[request.params["run_id"]] = entry_id
+    for run_id, entry_id in last_end.items():
+        session.execute(
+            update(RunStatistics)
+            .where(
+                RunStatistics.run_id == run_id,
+                RunStatistics.id < entry_id,
+                RunStatistics.end_of_round == False,  # noqa: E712
+            )
+            .values(end_of_round=True)
+        )
+    return ids
+
+
+def _delete_many(session, requests: List[Request]) -> List[bool]:
+    """
+    Delete the entries with one statement.
+
+    A repeated id only counts as deleted for its first request.
+    """
+    ids = [request.params for request in requests]
+    deleted = set(session.execute(
+        delete(RunStatistics).where(RunStatistics.id.in_(ids)).returning(RunStatistics.id)
+    ).scalars())
+    results = []
+    for entry_id in ids:
+        results.append(entry_id in deleted)
+        deleted.discard(entry_id)
+    return results
+
+
+writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> GroupCommitWriter:
+    """Return the process's writer, started on first use and drained at exit."""
+    global writer
+    if writer is None:
+        with _writer_lock:
+            if writer is None:
+                writer = GroupCommitWriter()
+                atexit.register(writer.close)
+    return writer
@@ -0,0 +1,32 @@
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+from alembic.config import Config
+from sqlalchemy.engine import Engine
+
+from alembic import command
+from tower_tracker import database
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def upgrade_database(url: str, revision: str = "head") -> None:
+    """Build a database schema by running the Alembic migrations up to `revision`."""
+    config = Config()
+    config.set_main_option("script_location", str(ROOT / "alembic"))
+    config.set_main_option("sqlalchemy.url", url)
+    command.upgrade(config, revision)
+
+
+@pytest.fixture
+def db_engine(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[Engine]:
+    """Point the application at a freshly migrated, empty database."""
+    url = f"sqlite:///{tmp_path / 'game_stats.db'}"
+    upgrade_database(url)
+    original = database.engine
+    monkeypatch.setattr(database, "engine", original)
+    engine = database.configure_database(url)
+    yield engine
+    database.SessionLocal.configure(bind=original)
+    engine.dispose()
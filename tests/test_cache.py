@@ -0,0 +1,76 @@
+import sqlite3
+
+from sqlalchemy.engine import Engine
+
+from tower_tracker import crud
+from tower_tracker.cache import QueryCache, query_cache
+from tower_tracker.database import get_session
+from tower_tracker.models.models import RunStatistics
+
+
+def test_reads_are_cached_until_a_write(db_engine: Engine) -> None:
+    """Reads are served from the cache until crud writes."""
+    crud.insert_run(1, 5, 40, 1e5, 2, 300, "", False)
+    before = query_cache.stats()
+
+    assert crud.get_run_tier(1) == 5
+    assert crud.get_run_tier(1) == 5
+    stats = query_cache.stats()
+    assert stats["misses"] - before["misses"] == 1
+    assert stats["hits"] - before["hits"] == 1
+
+    crud.insert_run(1, 5, 80, 3e5, 4, 600, "", True)
+    assert crud.get_run_status(1) is True
+    assert [entry.wave for entry in crud.fetch_all_entries_for_run(1)] == [40, 80]
+
+
+def test_writes_from_other_connections_invalidate(db_engine: Engine) -> None:
+    """Commits from other connections invalidate the cache."""
+    crud.insert_run(1, 5, 40, 1e5, 2, 300, "", False)
+    assert crud.get_active_run_id() == 1
+
+    with sqlite3.connect(db_engine.url.database) as conn:
+        conn.execute("UPDATE run_statistics SET end_of_round = 1")
+    assert crud.get_active_run_id() is None
+
+
+def test_lru_eviction() -> None:
+    """The least recently used result is evicted first."""
+    cache = QueryCache(maxsize=2, check_data_version=False)
+    calls = []
+
+    @cache.cached
+    def square(x: int) -> int:
+        calls.append(x)
+        return x * x
+
+    for x in (1, 2, 1, 3, 1, 2):
+        square(x)
+    # 2 was the least recently used entry when 3 was added
+    assert calls == [1, 2, 3, 2]
+    assert cache.stats()["size"] == 2
+
+
+def test_reads_in_a_session_bypass_the_cache(db_engine: Engine) -> None:
+    """Reads given a session are neither cached nor served from the cache."""
+    crud.insert_run(1, 5, 40, 1e5, 2, 300, "", False)
+    assert crud.get_run_tier(1) == 5
+    before = query_cache.stats()
+
+    with get_session() as session:
+        session.add(RunStatistics(
+            run_id=2, tier=7, wave=10, coins=1e4, cells=1, time_spent=60,
+            notes="", end_of_round=False,
+        ))
+        session.flush()
+        # The uncommitted entry is visible inside the session only, and is not
+        # cached
+        assert crud.get_run_tier(2, session=session) == 7
+        assert crud.get_run_tier(1, session=session) == 5
+        # Also when the session is passed by position
+        assert crud.fetch_all_run_ids(session) == [1, 2]
+        session.rollback()
+    assert crud.get_run_tier(2) is None
+    stats = query_cache.stats()
+    assert stats["misses"] - before["misses"] == 1
+    assert stats["hits"] == before["hits"]
@@ -0,0 +1,67 @@
+import csv
+import io
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy.engine import Engine
+
+from tower_tracker import cli
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def run_cli(capsys: pytest.CaptureFixture, *argv: str):
+    """Run the command line and return what it printed."""
+    assert cli.main(list(argv)) == 0
+    return capsys.readouterr().out
+
+
+def test_add_and_reports(
+    db_engine: Engine, capsys: pytest.CaptureFixture, tmp_path: Path
+) -> None:
+    """Entries added from the command line show up in the reports and exports."""
+    added = json.loads(run_cli(
+        capsys, "add", "--tier", "5", "--wave", "100", "--coins", "1.5T",
+        "--cells", "20", "--time", "00:30:00",
+    ))
+    assert added == [{"run_id": 1, "tier": 5, "wave": 100, "coins": 1.5e12, "cells": 20,
+                      "time_spent": 1800, "notes": "", "end_of_round": False}]
+    # The active run and its tier are picked up
+    run_cli(
+        capsys, "add", "--wave", "200", "--coins", "4T", "--cells", "40",
+        "--time", "3600", "--end-of-round",
+    )
+
+    averages = json.loads(run_cli(capsys, "averages"))
+    assert [row["tier"] for row in averages] == [5]
+    assert averages[0]["avg_wave"] == 150
+
+    out = run_cli(capsys, "latest-runs", "--ended", "--output-format", "csv")
+    latest = list(csv.DictReader(io.StringIO(out)))
+    assert [(row["run_id"], row["wave"]) for row in latest] == [("1", "200")]
+    assert float(latest[0]["coins_per_hour"]) == 4e12
+    assert json.loads(run_cli(capsys, "latest-runs", "--open")) == []
+
+    out_file = tmp_path / "entries.csv"
+    run_cli(capsys, "export", "--output-format", "csv", "--output", str(out_file))
+    rows = list(csv.DictReader(out_file.open()))
+    assert [row["wave"] for row in rows] == ["100", "200"]
+    assert rows[0]["end_of_round"] == "True"
+
+
+def test_cli_does_not_import_gui_modules() -> None:
+    """The command line and importer load neither Tk, matplotlib nor the UI."""
+    code = (
+        "import sys, tower_tracker.cli, tower_tracker.importer; "
+        "gui = {'tkinter', 'matplotlib'}; "
+        "print(sorted({m.split('.')[0] for m in sys.modules} & gui)"
+        " + [m for m in sys.modules if m.startswith('tower_tracker.ui')])"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True,
+        env={"PYTHONPATH": str(ROOT / "src")},
+    )
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,182 @@
+import itertools
+
+import numpy as np
+import pytest
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from tower_tracker import crud, data_viewer, tier_stats
+from tower_tracker.series import RunSeries, fetch_run_series
+
+
+def seed_runs() -> None:
+    """Insert two ended runs on different tiers and one open run."""
+    crud.insert_run(1, 5, 40, 1e5, 2, 300, "", False)
+    crud.insert_run(1, 5, 90, 4e5, 9, 900, "", True)
+    crud.insert_run(2, 7, 20, 2e5, 1, 200, "", False)
+    crud.insert_run(2, 7, 60, 8e5, 5, 700, "", True)
+    crud.insert_run(3, 7, 10, 5e4, 0, 120, "", False)
+
+
+def test_fetch_all_runs_returns_latest_entry_per_run(db_engine: Engine) -> None:
+    """Each run is represented by its most recent entry."""
+    seed_runs()
+    runs = crud.fetch_all_runs()
+    assert [(run.run_id, run.wave) for run in runs] == [(1, 90), (2, 60), (3, 10)]
+
+
+def test_fetch_all_runs_filters(db_engine: Engine) -> None:
+    """Runs can be filtered by tier and by whether they ended."""
+    seed_runs()
+    assert [run.run_id for run in crud.fetch_all_runs(tier=7)] == [2, 3]
+    assert [run.run_id for run in crud.fetch_all_runs(ended=True)] == [1, 2]
+    assert [run.run_id for run in crud.fetch_all_runs(tier=7, ended=False)] == [3]
+
+
+def test_analyze_latest_runs_matches_fetch_all_runs(db_engine: Engine) -> None:
+    """The DataFrame of latest runs holds the same entries as `fetch_all_runs`."""
+    seed_runs()
+    df = data_viewer.analyze_latest_runs()
+    assert df["id"].tolist() == [run.id for run in crud.fetch_all_runs()]
+    assert df.loc[0, "coins_per_hour"] == 4e5 / (900 / 3600)
+
+
+def test_insert_runs_bulk_is_idempotent(db_engine: Engine) -> None:
+    """Re-importing checkpoints updates them instead of adding duplicates."""
+    records = [
+        {"run_id": 1, "tier": 3, "wave": w, "coins": w * 1e3, "cells": w,
+         "time_spent": w * 10, "notes": "", "end_of_round": w == 30}
+        for w in (10, 20, 30)
+    ]
+    assert crud.insert_runs_bulk(records, chunk_size=2) == 3
+    assert crud.insert_runs_bulk(records, chunk_size=2) == 3
+
+    entries = crud.fetch_all_entries_for_run(1)
+    assert [entry.wave for entry in entries] == [10, 20, 30]
+    assert all(entry.end_of_round for entry in entries)
+
+
+def test_get_run_context(db_engine: Engine) -> None:
+    """The context resolves the active run, or a new one when none is open."""
+    assert crud.get_run_context() == crud.RunContext(1, None, False, None, 1)
+
+    seed_runs()
+    assert crud.get_run_context() == crud.RunContext(3, 7, False, 3, 4)
+    assert crud.get_run_context(1) == crud.RunContext(1, 5, True, 3, 4)
+
+    crud.insert_run(3, 7, 30, 9e4, 1, 400, "", True)
+    assert crud.get_run_context() == crud.RunContext(4, None, False, None, 4)
+
+
+def test_fetch_page_keyset_pagination(db_engine: Engine) -> None:
+    """Seeking with page_key visits the same entries as one ordered read."""
+    seed_runs()
+    crud.insert_run(3, 7, 30, 5e4, 0, 240, None, False)
+    # No time recorded, so no hourly rates
+    crud.insert_run(4, 6, 0, 0, 0, 0, None, False)
+
+    orderings = [
+        ("id", False), ("coins", True), ("notes", False), ("notes", True),
+        ("coins_per_hour", False), ("coins_per_hour", True),
+        ("datetime_collected", True), ("run_id", False), ("run_id", True),
+    ]
+    for (order_by, descending), latest_only in itertools.product(
+        orderings, (False, True)
+    ):
+        query = {"latest_only": latest_only}
+        expected = crud.fetch_page(order_by, descending, limit=100, **query)
+        pages, after = [], None
+        while page := crud.fetch_page(
+            order_by, descending, after=after, limit=2, **query
+        ):
+            pages += page
+            after = crud.page_key(page[-1], order_by)
+        assert [row.id for row in pages] == [row.id for row in expected]
+        assert [
+            row.id
+            for row in crud.fetch_page(order_by, descending, offset=2, limit=2, **query)
+        ] == [row.id for row in expected[2:4]]
+    by_rate = crud.fetch_page("coins_per_hour", limit=100)
+    assert by_rate[0].run_id == 4
+    assert crud.fetch_page("coins_per_hour", True, limit=100)[-1].run_id == 4
+
+    assert [row.wave for row in crud.fetch_page("wave", run_id=3)] == [10, 30]
+    latest = crud.fetch_page("run_id", latest_only=True)
+    assert [(row.run_id, row.wave) for row in latest] == [
+        (1, 90), (2, 60), (3, 30), (4, 0)
+    ]
+    assert crud.count_rows() == 7
+    assert crud.count_rows(run_id=1) == 2
+    assert crud.count_rows(latest_only=True) == 4
+
+
+def test_latest_entries_follow_changes(db_engine: Engine) -> None:
+    """The triggers keep the latest entry of each run through deletes and edits."""
+    seed_runs()
+    latest = crud.fetch_page("run_id", latest_only=True)
+    crud.delete_data(latest[0].id)
+    with db_engine.begin() as connection:
+        connection.execute(
+            text("UPDATE run_statistics SET run_id = 4 WHERE id = :id"),
+            {"id": latest[1].id},
+        )
+
+    runs = crud.fetch_page("run_id", latest_only=True)
+    assert [(row.run_id, row.wave) for row in runs] == [
+        (1, 40), (2, 20), (3, 10), (4, 60)
+    ]
+    assert [run.id for run in crud.fetch_all_runs()] == [row.id for row in runs]
+
+
+
+def test_row_queries_match_orm_entities(db_engine: Engine) -> None:
+    """The RunRow queries read the same values as the ORM queries."""
+    seed_runs()
+    entries = crud.fetch_all_entries_for_run(1)
+    rows = crud.fetch_entry_rows(1)
+    assert rows == [
+        tuple(getattr(entry, field) for field in crud.RunRow._fields)
+        for entry in entries
+    ]
+
+    latest = crud.fetch_run_rows(tier=7)
+    assert [row.id for row in latest] == [run.id for run in crud.fetch_all_runs(tier=7)]
+    assert len(crud.fetch_all_rows()) == 5
+
+
+def test_stored_rates_are_generated_with_zero_guards(db_engine: Engine) -> None:
+    """Rates are stored by SQLite, NULL where no time or no waves were recorded."""
+    seed_runs()
+    crud.insert_run(3, 7, 0, 0, 0, 0, "", False)
+    rows = crud.fetch_entry_rows(3)
+    assert rows[0].coins_per_hour == 5e4 / (120 / 3600) and rows[0].cells_per_wave == 0
+    assert [getattr(rows[1], field) for field in crud.RATE_FIELDS] == [None] * 4
+
+    # The analytics frame and the series read the same stored values
+    series = fetch_run_series()
+    df = data_viewer.analyze_data(use_snapshot=False)
+    df = df.sort_values(["datetime_collected", "id"])
+    assert isinstance(series, RunSeries) and len(series) == len(df)
+    for name, values in series.rates().items():
+        np.testing.assert_array_equal(values, df[name].to_numpy(dtype=float))
+    assert tier_stats.check_tier_stats() == []
+
+
+def test_fetch_top_runs_returns_best_entry_per_run(db_engine: Engine) -> None:
+    """Top runs are ranked by the best entry of each run."""
+    seed_runs()
+    crud.insert_run(4, 7, 30, 9e5, 3, 300, "", False)
+    top = crud.fetch_top_runs(7, limit=2)
+    expected = [(4, 1.08e7), (2, 8e5 / (700 / 3600))]
+    assert [(row.run_id, row.coins_per_hour) for row in top] == expected
+    assert [row.run_id for row in crud.fetch_top_runs(7)] == [4, 2, 3]
+
+
+def test_run_series_is_read_only(db_engine: Engine) -> None:
+    """Series arrays, shared through the cache, cannot be modified."""
+    seed_runs()
+    series = fetch_run_series(2)
+    assert series.wave.tolist() == [20, 60]
+    with pytest.raises(ValueError):
+        series.coins[0] = 0
+    assert len(fetch_run_series(99)) == 0
@@ -0,0 +1,57 @@
+import random
+
+import pandas as pd
+import pytest
+from sqlalchemy.engine import Engine
+
+from tower_tracker import crud, data_viewer
+from tower_tracker.database import get_session
+
+
+def pandas_tier_averages() -> pd.DataFrame:
+    """Compute the per-tier averages in pandas, as show_averages used to."""
+    with get_session() as session:
+        df = pd.read_sql_query("SELECT * FROM run_statistics", session.bind)
+    df["avg_wave"] = df.groupby("tier")["wave"].transform("mean")
+    df["coins_per_hour"] = df["coins"] / (df["time_spent"] / 3600)
+    df["coins_per_wave"] = df["coins"] / df["wave"]
+    df["cells_per_hour"] = df["cells"] / (df["time_spent"] / 3600)
+    df["cells_per_wave"] = df["cells"] / df["wave"]
+    return (
+        df.groupby("tier")
+        .agg(
+            avg_wave=("avg_wave", "first"),
+            avg_coins_per_hour=("coins_per_hour", "mean"),
+            avg_coins_per_wave=("coins_per_wave", "mean"),
+            avg_cells_per_hour=("cells_per_hour", "mean"),
+            avg_cells_per_wave=("cells_per_wave", "mean"),
+        )
+        .reset_index()
+    )
+
+
+def test_tier_averages_match_pandas(db_engine: Engine) -> None:
+    """The rollup's averages equal those computed from every entry."""
+    rng = random.Random(7)
+    crud.insert_runs_bulk(
+        {
+            "run_id": run_id,
+            "tier": run_id % 4 + 1,
+            "wave": rng.randint(1, 5000),
+            "coins": rng.uniform(1e3, 1e9),
+            "cells": rng.randint(0, 5000),
+            "time_spent": checkpoint * 600 + rng.randint(1, 599),
+            "notes": "",
+            "end_of_round": checkpoint == 4,
+        }
+        for run_id in range(1, 41)
+        for checkpoint in range(5)
+    )
+
+    expected = pandas_tier_averages()
+    actual = pd.DataFrame([row._asdict() for row in data_viewer.tier_averages()])
+
+    assert actual.columns.tolist() == expected.columns.tolist()
+    for column in expected.columns:
+        expected_values = pytest.approx(expected[column].tolist(), rel=1e-9)
+        assert actual[column].tolist() == expected_values
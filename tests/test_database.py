@@ -0,0 +1,63 @@
+import shutil
+import sqlite3
+from pathlib import Path
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from tests.conftest import ROOT, upgrade_database
+from tower_tracker import database
+
+
+def test_connections_are_tuned(db_engine: Engine) -> None:
+    """New connections get the tuned PRAGMAs."""
+    with db_engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+        assert conn.execute(text("PRAGMA temp_store")).scalar() == 2  # MEMORY
+
+
+def test_pragmas_can_be_overridden_or_disabled() -> None:
+    """Environment variables override PRAGMAs, and empty values drop them."""
+    pragmas = database.sqlite_pragmas_from_env(
+        {"TOWER_TRACKER_SQLITE_MMAP_SIZE": "0", "TOWER_TRACKER_SQLITE_JOURNAL_MODE": ""}
+    )
+    assert pragmas["mmap_size"] == "0"
+    assert "journal_mode" not in pragmas
+    assert pragmas["synchronous"] == "NORMAL"
+
+
+def test_upgrading_legacy_rows_keeps_every_entry(tmp_path: Path) -> None:
+    """Legacy rows without a run are numbered as runs of their own, not deleted."""
+    # The shipped database predates run ids; some of its runs share a time_spent
+    path = tmp_path / "game_stats.db"
+    shutil.copy(ROOT / "game_stats.db", path)
+    with sqlite3.connect(path) as conn:
+        before = conn.execute("SELECT id FROM run_statistics ORDER BY id").fetchall()
+
+    upgrade_database(f"sqlite:///{path}")
+    with sqlite3.connect(path) as conn:
+        rows = conn.execute(
+            "SELECT id, run_id FROM run_statistics ORDER BY id"
+        ).fetchall()
+    assert [(entry_id,) for entry_id, _ in rows] == before
+    assert sorted(run_id for _, run_id in rows) == list(range(1, len(rows) + 1))
+
+
+def test_upgrade_stops_on_duplicate_checkpoints(tmp_path: Path) -> None:
+    """Duplicate checkpoints stop the upgrade with a list of the entries."""
+    path = tmp_path / "game_stats.db"
+    shutil.copy(ROOT / "game_stats.db", path)
+    # The revision before the unique index
+    upgrade_database(f"sqlite:///{path}", "a735f12cc5ae")
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "UPDATE run_statistics SET run_id = 1, time_spent = 60 WHERE id IN (3, 4)"
+        )
+
+    with pytest.raises(RuntimeError, match="ids 3,4"):
+        upgrade_database(f"sqlite:///{path}")
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM run_statistics").fetchone()[0] == 19
@@ -0,0 +1,69 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy.engine import Engine
+
+from tower_tracker import cli, crud, export, synthetic
+
+
+def test_iter_chunks_streams_in_bounded_chunks(db_engine: Engine) -> None:
+    """Every row is read, in chunks of at most chunk_size rows."""
+    synthetic.populate(runs=10, checkpoints=25, seed=4)
+    query = export.export_query(include_rates=True)
+    chunks = list(export.iter_chunks(query, chunk_size=40))
+    assert [len(rows) for rows in chunks] == [40] * 6 + [10]
+    fields = export.ENTRY_FIELDS + crud.RATE_FIELDS
+    assert [row for rows in chunks for row in rows] == [
+        tuple(getattr(row, field) for field in fields) for row in crud.fetch_all_rows()
+    ]
+
+
+def test_export_filters_and_rates(db_engine: Engine) -> None:
+    """Filters select the matching entries; missing rates are exported as null."""
+    synthetic.populate(runs=10, checkpoints=5, seed=4)
+    crud.insert_run(11, 3, 0, 0, 0, 0, "", False)
+    rows = crud.fetch_all_rows()
+
+    out = io.StringIO()
+    start = synthetic.START + timedelta(hours=5)
+    count = export.export_entries(out, "csv", include_rates=True, chunk_size=7,
+                                  first_run=3, last_run=8, since=start)
+    records = list(csv.DictReader(io.StringIO(out.getvalue())))
+    expected = [
+        row for row in rows if 3 <= row.run_id <= 8 and row.datetime_collected >= start
+    ]
+    assert count == len(records) == len(expected) > 0
+    assert [int(record["id"]) for record in records] == [row.id for row in expected]
+    hours = expected[0].time_spent / 3600
+    assert float(records[0]["coins_per_hour"]) == expected[0].coins / hours
+
+    out = io.StringIO()
+    export.export_entries(out, "jsonl", include_rates=True, run_id=11)
+    (record,) = map(json.loads, out.getvalue().splitlines())
+    assert record["coins_per_hour"] is None and record["cells_per_wave"] is None
+
+
+def test_cli_export_gzip_and_dates(db_engine: Engine, tmp_path: Path) -> None:
+    """The export command compresses .gz files and takes dates as bounds."""
+    crud.insert_runs_bulk([
+        {
+            "run_id": 1, "tier": 5, "wave": 10 * day, "coins": 1e6, "cells": 1,
+            "time_spent": 60 * day, "notes": "", "end_of_round": False,
+            "datetime_collected": datetime(2024, 3, day, 12),
+        }
+        for day in (1, 2, 3)
+    ])
+    path = tmp_path / "entries.jsonl.gz"
+    assert cli.main(["export", "--output-format", "jsonl", "--output", str(path),
+                     "--since", "2024-03-02", "--until", "2024-03-02"]) == 0
+    with gzip.open(path, "rt") as f:
+        assert [json.loads(line)["wave"] for line in f] == [20]
+
+    path = tmp_path / "entries.json"
+    argv = ["export", "--output", str(path), "--until", "2024-03-02T12:00:00"]
+    assert cli.main(argv) == 0
+    assert [record["wave"] for record in json.loads(path.read_text())] == [10, 20]
@@ -0,0 +1,84 @@
+import matplotlib
+import numpy as np
+import pandas as pd
+
+matplotlib.use("Agg")
+
+from tower_tracker.sketches import TDigest, box_stats  # noqa: E402
+from tower_tracker.ui.graphing import (  # noqa: E402
+    METRICS,
+    lttb,
+    plot_tier_distributions,
+    plot_tier_sketches,
+    plot_time_series,
+    tier_distributions,
+)
+
+
+def test_tier_distributions_match_per_tier_filtering() -> None:
+    """Grouping once gives the same values as filtering each tier separately."""
+    rng = np.random.default_rng(3)
+    df = pd.DataFrame({"tier": rng.integers(1, 6, 500)})
+    for metric in METRICS:
+        df[metric] = rng.normal(10, 5, len(df))
+    df.loc[::7, "coins_per_hour"] = np.inf
+    df.loc[::11, "cells_per_wave"] = np.nan
+
+    distributions = tier_distributions(df)
+    assert list(distributions.tiers) == sorted(df["tier"].unique())
+    for metric in METRICS:
+        for tier, values in zip(distributions.tiers, distributions.values[metric]):
+            column = df.loc[df["tier"] == tier, metric]
+            expected = column[np.isfinite(column) & (column > 0)]
+            np.testing.assert_array_equal(values, expected.to_numpy())
+
+    fig = plot_tier_distributions(distributions, seed=0)
+    axes = [ax for ax in fig.axes if ax.get_visible()]
+    assert [ax.get_title() for ax in axes] == [
+        f"{metric.replace('_', ' ').capitalize()} by Tier" for metric in METRICS
+    ]
+    # One scatter of every kept point per metric
+    points = distributions.values[METRICS[0]]
+    assert len(axes[0].collections[-1].get_offsets()) == sum(map(len, points))
+
+
+def test_tier_sketches_plot_one_box_per_tier() -> None:
+    """The sketched box plots draw one box per tier."""
+    rng = np.random.default_rng(4)
+
+    def box(tier):
+        return box_stats(TDigest().update(rng.lognormal(tier, 1, 300)), str(tier))
+
+    stats = {metric: [box(tier) for tier in (3, 5, 8)] for metric in METRICS}
+    fig = plot_tier_sketches(stats)
+    axes = [ax for ax in fig.axes if ax.get_visible()]
+    assert len(axes) == len(METRICS)
+    assert [label.get_text() for label in axes[0].get_xticklabels()] == ["3", "5", "8"]
+
+
+def test_lttb_keeps_shape_and_endpoints() -> None:
+    """LTTB keeps the endpoints and spikes, in order."""
+    x = np.arange(10_000, dtype=float)
+    y = np.sin(x / 500)
+    y[4321] = 50  # a spike must survive downsampling
+
+    keep = lttb(x, y, 200)
+    assert len(keep) == 200
+    assert keep[0] == 0 and keep[-1] == len(x) - 1
+    assert np.all(np.diff(keep) > 0)
+    assert 4321 in keep
+    np.testing.assert_array_equal(lttb(x[:50], y[:50], 200), np.arange(50))
+
+
+def test_time_series_reloads_full_resolution_on_zoom() -> None:
+    """Zooming in re-samples the visible range from the full series."""
+    x = np.arange(20_000) * 60
+    y = np.log1p(x)
+    fig, line = plot_time_series(x, y, "Coins", "Time", "Coins", max_points=500)
+    assert len(line.line.get_xdata()) == 500
+
+    ax = fig.axes[0]
+    ax.set_xlim(60 * 1000, 60 * 1200)
+    shown = line.line.get_xdata()
+    # Every point in view plus one neighbour on each side
+    np.testing.assert_array_equal(shown, x[999:1202])
@@ -0,0 +1,28 @@
+from pathlib import Path
+
+from sqlalchemy.engine import Engine
+
+from tower_tracker import crud, importer
+
+
+def test_import_csv_and_jsonl(db_engine: Engine, tmp_path: Path) -> None:
+    """CSV and JSON Lines files are imported, with coin suffixes and durations."""
+    csv_file = tmp_path / "runs.csv"
+    csv_file.write_text(
+        "run_id,tier,wave,coins,cells,time_spent,notes,end_of_round\n"
+        "1,4,100,1.50M,20,00:10:00,,false\n"
+        "1,4,200,3.25M,45,1200,,true\n"
+    )
+    jsonl_file = tmp_path / "runs.jsonl"
+    jsonl_file.write_text(
+        '{"run_id": 2, "tier": 6, "wave": 50, "coins": 250000, "cells": 3,'
+        ' "time_spent": 300, "datetime_collected": "2025-01-05T10:00:00"}\n'
+    )
+
+    assert importer.main([str(csv_file), str(jsonl_file)]) == 0
+    assert importer.main([str(csv_file)]) == 0
+
+    first, second = crud.fetch_all_entries_for_run(1)
+    assert (first.coins, first.time_spent, first.end_of_round) == (1.5e6, 600, True)
+    assert (second.coins, second.time_spent) == (3.25e6, 1200)
+    assert crud.get_active_run_id() == 2
@@ -0,0 +1,61 @@
+import json
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+from sqlalchemy.engine import Engine
+
+from tower_tracker import crud
+from tower_tracker.cache import query_cache
+from tower_tracker.instrumentation import Histogram, recorder
+
+
+@pytest.fixture
+def recording(db_engine: Engine) -> Iterator[None]:
+    """Record timings during the test, starting from nothing."""
+    recorder.reset()
+    recorder.enable()
+    yield
+    recorder.disable()
+    recorder.reset()
+
+
+def test_histogram_percentiles() -> None:
+    """Percentiles are bucket upper bounds, capped at the maximum."""
+    histogram = Histogram()
+    for ms in [0.04] * 90 + [3.0] * 9 + [40.0]:
+        histogram.observe(ms)
+    assert histogram.percentile(0.5) == 0.05  # the upper bound of its bucket
+    assert histogram.percentile(0.95) == 3.2
+    assert histogram.percentile(1.0) == 40.0  # capped at the maximum seen
+    assert histogram.to_dict()["calls"] == 100
+
+
+def test_records_functions_statements_and_sessions(
+    recording: None, tmp_path: Path
+) -> None:
+    """Instrumented calls, statements and sessions are recorded and dumped."""
+    crud.insert_run(1, 4, 10, 1e6, 1, 60, "", False)
+    crud.insert_run(1, 4, 20, 2e6, 2, 120, "", False)
+    query_cache.clear()
+    assert len(crud.fetch_all_entries_for_run(1)) == 2
+
+    snapshot = recorder.snapshot()
+    fetch = snapshot["functions"]["tower_tracker.crud.fetch_all_entries_for_run"]
+    assert (fetch["calls"], fetch["rows"]) == (1, 2)
+    assert snapshot["functions"]["tower_tracker.crud.insert_run"]["calls"] == 2
+    inserts = [
+        stats for sql, stats in snapshot["statements"].items()
+        if sql.startswith("INSERT INTO run_statistics")
+    ]
+    assert inserts[0]["calls"] == 2 and inserts[0]["rows"] == 2
+    assert snapshot["sessions"] >= 3
+
+    path = tmp_path / "timings.json"
+    recorder.dump_json(path)
+    dumped = json.loads(path.read_text())
+    assert dumped["functions"].keys() == snapshot["functions"].keys()
+
+    recorder.disable()
+    crud.fetch_all_runs()
+    assert recorder.snapshot()["functions"].keys() == snapshot["functions"].keys()
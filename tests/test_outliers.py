@@ -0,0 +1,129 @@
+import numpy as np
+import pytest
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+from tower_tracker import crud, outliers, synthetic
+from tower_tracker.database import get_session
+from tower_tracker.models.models import RunStatistics, TierOutlierStats
+from tower_tracker.writer import GroupCommitWriter
+
+
+def test_grouped_quantiles_match_numpy_per_group() -> None:
+    """Grouped quantiles match np.quantile within every group."""
+    rng = np.random.default_rng(8)
+    groups = rng.integers(0, 6, 1000)
+    values = rng.lognormal(0, 1, 1000)
+    values[::13] = np.nan
+    quantiles = (0.1, 0.25, 0.5, 0.75)
+
+    result, counts = outliers.grouped_quantiles(groups, values, quantiles, 7)
+    for group in range(6):
+        group_values = values[(groups == group) & np.isfinite(values)]
+        assert counts[group] == len(group_values)
+        expected = np.quantile(group_values, quantiles)
+        np.testing.assert_allclose(result[:, group], expected)
+    assert counts[6] == 0 and np.isnan(result[:, 6]).all()
+
+
+def test_backfill_matches_statistics_and_triggers_score_new_entries(
+    db_engine: Engine,
+) -> None:
+    """The backfill matches per-tier statistics; triggers score new entries."""
+    synthetic.populate(runs=120, checkpoints=4, seed=9, chunk_size=100)
+    # A run like the median run of the most common tier, but earning ten times
+    # the coins
+    latest = crud.fetch_run_rows(ended=True)
+    tier = max(set(row.tier for row in latest), key=[row.tier for row in latest].count)
+    tier_latest = sorted(
+        (row for row in latest if row.tier == tier),
+        key=lambda row: row.coins_per_hour,
+    )
+    typical = tier_latest[len(tier_latest) // 2]
+
+    def insert_like_typical(run_id, coins_factor) -> None:
+        crud.insert_run(
+            run_id, tier, typical.wave, typical.coins * coins_factor, typical.cells,
+            typical.time_spent, "", True,
+        )
+
+    insert_like_typical(1000, 10)
+
+    assert outliers.outlier_stats_stale()
+    assert outliers.backfill_outliers() > 0
+    assert not outliers.outlier_stats_stale()
+    assert outliers.backfill_outliers() == 0
+
+    rows = crud.fetch_run_rows()
+    tier_rows = [row for row in rows if row.tier == tier]
+    values = np.array([row.coins_per_hour for row in tier_rows])
+    q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+    mad = np.median(np.abs(values - median))
+    lower, upper = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+    scale = outliers.MAD_SCALE * mad
+    for row in tier_rows:
+        # The score is the largest of the rates' scores
+        assert row.outlier_score >= abs(row.coins_per_hour - median) / scale - 1e-9
+        if not lower <= row.coins_per_hour <= upper:
+            assert row.outlier
+    flagged = outliers.flagged_runs(tier)
+    assert flagged[0].run_id == 1000
+
+    # New entries are scored by the triggers against the stored statistics
+    insert_like_typical(1001, 20)
+    insert_like_typical(1002, 1.05)
+    new = {row.run_id: row for row in crud.fetch_run_rows(tier=tier)}
+    assert new[1001].outlier and new[1001].outlier_score > new[1000].outlier_score
+    scores, _ = outliers.score_entries(
+        np.zeros(1, dtype=np.int64),
+        {name: np.array([getattr(new[1002], name)]) for name in crud.RATE_FIELDS},
+        _stored_stats(tier),
+    )
+    assert new[1002].outlier_score == pytest.approx(scores[0])
+
+    # Editing an entry rescores it
+    with get_session() as session:
+        session.get(RunStatistics, new[1001].id).coins = typical.coins
+        session.commit()
+    assert not crud.fetch_entry_rows(1001)[0].outlier
+
+
+def _stored_stats(tier) -> outliers.ReferenceStats:
+    """Return the stored reference statistics of `tier`."""
+    stats = outliers.ReferenceStats(np.array([tier]), {}, {}, {}, {}, {})
+    query = select(TierOutlierStats).where(TierOutlierStats.tier == tier)
+    with get_session() as session:
+        for row in session.scalars(query):
+            for field in ("median", "scale", "lower", "upper"):
+                value = getattr(row, field)
+                value = np.nan if value is None else value
+                getattr(stats, field)[row.metric] = np.array([value])
+    return stats
+
+
+def test_pages_can_be_restricted_to_outliers(db_engine: Engine) -> None:
+    """Pages can be restricted to and ordered by outliers."""
+    for run_id in range(1, 9):
+        crud.insert_run(run_id, 5, 100, 1e6 * (1 + run_id / 100), 10, 3600, "", True)
+    crud.insert_run(9, 5, 100, 5e7, 10, 3600, "", True)
+    crud.insert_run(10, 5, 50, 5.2e5, 5, 1800, "", False)
+    outliers.backfill_outliers()
+
+    page = crud.fetch_page(latest_only=True, outliers_only=True)
+    assert [row.run_id for row in page] == [9]
+    assert crud.count_rows(latest_only=True, outliers_only=True) == 1
+    assert crud.count_rows(latest_only=True) == 10
+    page = crud.fetch_page("outlier_score", descending=True, latest_only=True, limit=1)
+    assert [row.run_id for row in page] == [9]
+
+
+def test_rescoring_runs_on_the_writer(db_engine: Engine) -> None:
+    """Stale tiers are rescored as a writer request, and only when stale."""
+    synthetic.populate(runs=40, checkpoints=2, seed=3)
+    writer = GroupCommitWriter()
+    try:
+        assert writer.submit(outliers.rescore_stale_tiers).result() > 0
+        assert not outliers.outlier_stats_stale()
+        assert writer.submit(outliers.rescore_stale_tiers).result() == 0
+    finally:
+        writer.close()
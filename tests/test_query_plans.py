@@ -0,0 +1,111 @@
+from typing import Any, Callable, Iterator, List, Tuple
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+
+from tower_tracker import crud, data_viewer
+from tower_tracker.series import fetch_run_series
+
+# Statements whose query plans are checked
+RECORDED_STATEMENTS = ("SELECT", "WITH", "UPDATE", "DELETE")
+# Queries that are expected to scan run_statistics; everything else must SEARCH it
+FULL_SCAN_ALLOWED = {
+    # Reads every entry by design
+    "fetch_all_data",
+    # Walks the partial index of flagged entries, which holds only the outliers
+    "fetch_page_outliers",
+}
+
+CRUD_QUERIES: List[Tuple[str, Callable[[], Any]]] = [
+    ("get_run_tier", lambda: crud.get_run_tier(1)),
+    ("get_run_status", lambda: crud.get_run_status(1)),
+    ("get_active_run_id", crud.get_active_run_id),
+    ("get_run_context", crud.get_run_context),
+    ("get_run_context_for_run", lambda: crud.get_run_context(1)),
+    ("insert_run", lambda: crud.insert_run(2, 5, 80, 1e6, 10, 600, "", True)),
+    ("insert_runs_bulk", lambda: crud.insert_runs_bulk([
+        {"run_id": 1, "tier": 5, "wave": 60, "coins": 6e5, "cells": 5,
+         "time_spent": 360, "notes": "", "end_of_round": True},
+    ])),
+    ("fetch_all_data", crud.fetch_all_data),
+    ("fetch_all_run_ids", crud.fetch_all_run_ids),
+    ("fetch_all_runs", crud.fetch_all_runs),
+    ("fetch_all_runs_filtered", lambda: crud.fetch_all_runs(tier=5, ended=True)),
+    ("fetch_all_entries_for_run", lambda: crud.fetch_all_entries_for_run(1)),
+    ("fetch_entry_rows", lambda: crud.fetch_entry_rows(1)),
+    ("fetch_run_rows", lambda: crud.fetch_run_rows(tier=5, ended=True)),
+    ("fetch_run_series", lambda: fetch_run_series(1)),
+    ("fetch_top_runs", lambda: crud.fetch_top_runs(5)),
+    ("fetch_page", lambda: crud.fetch_page("id", after=(1, 1))),
+    ("fetch_page_run_entries", lambda: crud.fetch_page("datetime_collected", run_id=1)),
+    ("fetch_page_outliers", lambda: crud.fetch_page("run_id", outliers_only=True)),
+    ("fetch_page_latest", lambda: crud.fetch_page(
+        "run_id", after=(1, 1), latest_only=True
+    )),
+    ("fetch_page_latest_nullable", lambda: crud.fetch_page(
+        "coins_per_hour", descending=True, after=(5e5, 1), latest_only=True
+    )),
+    ("count_rows_latest", lambda: crud.count_rows(latest_only=True)),
+    ("delete_data", lambda: crud.delete_data(1)),
+    ("generate_new_run_id", data_viewer.generate_new_run_id),
+]
+
+
+@pytest.fixture
+def recorded_statements(db_engine: Engine) -> Iterator[List[Tuple[str, Any]]]:
+    """Capture every SQL statement the application sends to the database."""
+    crud.insert_run(1, 5, 50, 5e5, 4, 300, "", False)
+    statements: List[Tuple[str, Any]] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):  # type: ignore
+        if statement.lstrip().upper().startswith(RECORDED_STATEMENTS):
+            statements.append((statement, parameters))
+
+    event.listen(db_engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(db_engine, "before_cursor_execute", record)
+
+
+def query_plan(engine: Engine, statement: str, parameters: Any) -> List[str]:
+    """Return the detail lines of ``EXPLAIN QUERY PLAN`` for a statement."""
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return [row[-1] for row in rows]
+
+
+def is_full_scan(detail: str) -> bool:
+    """Whether a plan line scans run_statistics, even through a whole index."""
+    return detail.startswith("SCAN run_statistics")
+
+
+@pytest.mark.parametrize("name, call", CRUD_QUERIES, ids=[n for n, _ in CRUD_QUERIES])
+def test_crud_queries_use_indexes(
+    name: str,
+    call: Callable[[], Any],
+    recorded_statements: List[Tuple[str, Any]],
+    db_engine: Engine,
+) -> None:
+    """Every crud query must be answered from an index, not a table scan."""
+    call()
+    assert recorded_statements, f"{name} issued no queries"
+    if name in FULL_SCAN_ALLOWED:
+        return
+
+    for statement, parameters in recorded_statements:
+        plan = query_plan(db_engine, statement, parameters)
+        scans = [detail for detail in plan if is_full_scan(detail)]
+        assert not scans, f"{name} falls back to a full scan: {statement!r} -> {plan}"
+
+
+def test_indexes_exist(db_engine: Engine) -> None:
+    """The migrations create the indexes the query plans rely on."""
+    with db_engine.connect() as conn:
+        names = {
+            row[0]
+            for row in conn.execute(
+                text("SELECT name FROM sqlite_master WHERE type = 'index'")
+            )
+        }
+    assert "ix_run_statistics_run_id_datetime_collected" in names
+    assert "ix_run_statistics_open_runs" in names
@@ -0,0 +1,22 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from tower_tracker import crud
+from tower_tracker.repository import unit_of_work
+
+
+def test_unit_of_work_shares_one_connection(db_engine: Engine) -> None:
+    """All reads of a unit of work run on one connection."""
+    crud.insert_run(1, 5, 40, 1e5, 2, 300, "", False)
+    checkouts = []
+    event.listen(db_engine, "checkout", lambda *args: checkouts.append(args))
+
+    with unit_of_work() as repo:
+        context = repo.run_context()
+        entries = repo.entries_for_run(context.run_id)
+        assert repo.run_status(context.run_id) is False
+        assert repo.next_run_id() == 2
+
+    assert len(checkouts) == 1
+    assert context.tier == 5
+    assert [entry.wave for entry in entries] == [40]
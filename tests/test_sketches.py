@@ -0,0 +1,129 @@
+import sqlite3
+import time
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+
+from tower_tracker import crud, sketches, synthetic
+from tower_tracker.database import get_session
+from tower_tracker.models.models import RunStatistics, TierSketchPending
+from tower_tracker.sketches import TDigest
+
+
+def test_digest_quantiles_merge_and_round_trip() -> None:
+    """Digests approximate quantiles, merge, and survive a round trip."""
+    rng = np.random.default_rng(5)
+    values = rng.lognormal(10, 1, 50_000)
+    quantiles = [0.01, 0.25, 0.5, 0.75, 0.99]
+    expected = np.quantile(values, quantiles)
+
+    digest = TDigest()
+    for chunk in np.array_split(values, 100):
+        digest.update(chunk)
+    assert digest.count == len(values)
+    assert len(digest.means) <= digest.compression
+    np.testing.assert_allclose(digest.quantile(quantiles), expected, rtol=0.01)
+    assert digest.quantile(0) == values.min() and digest.quantile(1) == values.max()
+
+    merged = TDigest().update(values[:20_000]).merge(TDigest().update(values[20_000:]))
+    np.testing.assert_allclose(merged.quantile(quantiles), expected, rtol=0.01)
+
+    restored = TDigest.from_dict(digest.to_dict())
+    np.testing.assert_array_equal(
+        restored.quantile(quantiles), digest.quantile(quantiles)
+    )
+    assert np.isnan(TDigest().update([np.nan, np.inf]).quantile(0.5))
+
+
+def test_sketches_follow_ended_runs(db_engine: Engine) -> None:
+    """The sketches track the ended runs of every tier."""
+    synthetic.populate(runs=200, checkpoints=3, seed=6)
+    # The last run is still active
+    crud.insert_run(200, 4, 900, 8e6, 30, 5000, "", True)
+
+    exact = sketches.ended_run_values()
+    loaded = sketches.load_sketches()
+    assert sorted(loaded) == sorted(exact)
+    for tier, digests in loaded.items():
+        assert digests["wave"].count == len(exact[tier]["wave"])
+        for metric, digest in digests.items():
+            median = np.median(exact[tier][metric])
+            np.testing.assert_allclose(digest.quantile(0.5), median, rtol=0.05)
+    with get_session() as session:
+        assert session.scalar(select(func.count()).select_from(TierSketchPending)) == 0
+
+    assert sketches.tier_medians(exact=True)[0][0] == min(exact)
+    stats = sketches.tier_box_stats()
+    labels = [box["label"] for box in stats["coins_per_hour"]]
+    assert labels == [str(tier) for tier in sorted(exact)]
+    box = stats["coins_per_hour"][0]
+    assert box["whislo"] <= box["q1"] <= box["med"] <= box["q3"] <= box["whishi"]
+
+
+def test_deleting_an_ended_entry_rebuilds_its_tier(db_engine: Engine) -> None:
+    """Editing or deleting an ended entry rebuilds its tier's sketches."""
+    crud.insert_run(1, 5, 40, 1e5, 2, 300, "", False)
+    crud.insert_run(1, 5, 90, 4e5, 9, 900, "", True)
+    crud.insert_run(2, 5, 120, 9e5, 12, 1200, "", True)
+    assert sketches.load_sketches()[5]["wave"].count == 2
+
+    # Editing an ended entry replaces its value
+    last = crud.fetch_all_entries_for_run(2)[-1]
+    with get_session() as session:
+        session.get(RunStatistics, last.id).wave = 150
+        session.commit()
+    assert sketches.load_sketches()[5]["wave"].quantile(1) == 150
+
+    crud.delete_data(last.id)
+    wave = sketches.load_sketches()[5]["wave"]
+    assert wave.count == 1 and wave.quantile(0.5) == 90
+
+    assert sketches.main(["rebuild"]) == 0
+    assert sketches.load_sketches()[5]["wave"].count == 1
+
+
+def test_importing_ended_runs_folds_them_in(db_engine: Engine) -> None:
+    """Imported runs are queued once; only a new latest entry rebuilds a tier."""
+
+    def queued():
+        with get_session() as session:
+            return session.execute(
+                select(TierSketchPending.run_id, TierSketchPending.tier)
+            ).all()
+
+    crud.insert_runs_bulk([
+        {"run_id": run_id, "tier": 5, "wave": wave, "coins": wave * 1e4,
+         "cells": wave, "time_spent": wave * 10, "notes": "", "end_of_round": True}
+        for run_id in (1, 2) for wave in (30, 60, 90)
+    ])
+    assert queued() == [(1, 5), (2, 5)]
+    assert sketches.load_sketches()[5]["wave"].count == 2
+
+    # An entry collected before the run's latest one changes nothing
+    crud.insert_runs_bulk([{
+        "run_id": 1, "tier": 5, "wave": 10, "coins": 1e5, "cells": 1,
+        "time_spent": 50, "notes": "", "end_of_round": True,
+        "datetime_collected": datetime(2020, 1, 1),
+    }])
+    assert queued() == []
+    crud.insert_run(1, 5, 120, 2e6, 40, 1200, "", True)
+    assert queued() == [(None, 5)]
+    wave = sketches.load_sketches()[5]["wave"]
+    assert wave.count == 2 and wave.quantile(1) == 120
+
+
+def test_reading_sketches_does_not_wait_for_writers(db_engine: Engine) -> None:
+    """Reading sketches with nothing queued does not take the write lock."""
+    crud.insert_run(1, 5, 90, 4e5, 9, 900, "", True)
+    assert sketches.refresh_sketches() == 1
+
+    # Another connection holds the write lock; with nothing queued, reading the
+    # sketches must not wait for it
+    with sqlite3.connect(db_engine.url.database, timeout=0) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        started = time.monotonic()
+        assert sketches.load_sketches()[5]["wave"].count == 1
+        assert time.monotonic() - started < 1
+        conn.rollback()
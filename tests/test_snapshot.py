@@ -0,0 +1,120 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from tower_tracker import crud, data_viewer, snapshot
+
+pytest.importorskip("pyarrow")
+
+
+def seed_runs() -> None:
+    """Insert two runs, one of them with two checkpoints."""
+    crud.insert_run(1, 5, 40, 1e5, 2, 300, "", False)
+    crud.insert_run(1, 5, 90, 4e5, 9, 900, "", True)
+    crud.insert_run(2, 7, 20, 2e5, 1, 200, "", False)
+
+
+@pytest.mark.parametrize("partition_by", snapshot.PARTITIONS)
+def test_snapshot_appends_and_matches_database(
+    db_engine: Engine, tmp_path: Path, partition_by: str
+) -> None:
+    """Only new rows are appended, in any partitioning."""
+    directory = tmp_path / "snapshot"
+    seed_runs()
+    assert snapshot.update_snapshot(directory, partition_by=partition_by) == 3
+    assert snapshot.snapshot_is_fresh(directory)
+
+    crud.insert_run(2, 7, 60, 8e5, 5, 700, "", False)
+    assert not snapshot.snapshot_is_fresh(directory)
+    assert snapshot.update_snapshot(directory, partition_by=partition_by) == 1
+    assert snapshot.update_snapshot(directory, partition_by=partition_by) == 0
+
+    df = snapshot.load_snapshot(directory)
+    assert df["wave"].tolist() == [40, 90, 20, 60]
+
+
+@pytest.mark.parametrize("partition_by", snapshot.PARTITIONS)
+def test_deletes_patch_their_partition(
+    db_engine: Engine, tmp_path: Path, partition_by: str
+) -> None:
+    """Deleting a snapshotted row rewrites only its partition."""
+    directory = tmp_path / "snapshot"
+    seed_runs()
+    snapshot.update_snapshot(directory, partition_by=partition_by)
+    crud.delete_data(crud.fetch_all_entries_for_run(1)[0].id)
+
+    assert not snapshot.snapshot_is_fresh(directory)
+    assert snapshot.update_snapshot(directory, partition_by=partition_by) == 0
+    assert snapshot.snapshot_is_fresh(directory)
+    assert snapshot.load_snapshot(directory)["wave"].tolist() == [90, 20]
+    assert len(list(directory.rglob("*.feather"))) == len(
+        snapshot.read_manifest(directory)["parts"]
+    )
+
+
+def test_in_place_updates_patch_the_snapshot(db_engine: Engine, tmp_path: Path) -> None:
+    """Updated rows are read again and the untouched partitions kept."""
+    directory = tmp_path / "snapshot"
+    seed_runs()
+    snapshot.update_snapshot(directory)
+    tier_7 = [
+        part for part in snapshot.read_manifest(directory)["parts"]
+        if part["partition"] == "7"
+    ]
+
+    # Re-importing a checkpoint upserts it in place; ending run 2 flips its
+    # earlier entry
+    crud.insert_runs_bulk([{
+        "run_id": 1, "tier": 5, "wave": 41, "coins": 1e5, "cells": 2,
+        "time_spent": 300, "notes": "", "end_of_round": False,
+    }])
+    assert not snapshot.snapshot_is_fresh(directory)
+    assert snapshot.update_snapshot(directory) == 1
+    assert snapshot.snapshot_is_fresh(directory)
+    assert tier_7 == [
+        part for part in snapshot.read_manifest(directory)["parts"]
+        if part["partition"] == "7"
+    ]
+    crud.insert_run(2, 7, 60, 8e5, 5, 700, "", True)
+    assert not snapshot.snapshot_is_fresh(directory)
+    assert snapshot.update_snapshot(directory) == 2
+
+    df = snapshot.load_snapshot(directory)
+    assert df["wave"].tolist() == [41, 90, 20, 60]
+    assert df["end_of_round"].tolist() == [True, True, True, True]
+
+
+def test_outlier_rescoring_keeps_the_snapshot_fresh(
+    db_engine: Engine, tmp_path: Path
+) -> None:
+    """The outlier fields are not in the snapshot, so rescoring is not logged."""
+    directory = tmp_path / "snapshot"
+    seed_runs()
+    snapshot.update_snapshot(directory)
+    with db_engine.begin() as connection:
+        connection.execute(
+            text("UPDATE run_statistics SET outlier_score = 4.5, outlier = 1")
+        )
+    assert snapshot.snapshot_is_fresh(directory)
+
+
+def test_analytics_read_a_fresh_snapshot(db_engine: Engine) -> None:
+    """A fresh snapshot gives the same frames as the SQL queries."""
+    seed_runs()
+    from_database = data_viewer.analyze_latest_runs(use_snapshot=False)
+    snapshot.update_snapshot()
+    assert data_viewer._fresh_snapshot() is not None
+
+    from_snapshot = data_viewer.analyze_latest_runs()
+    pd.testing.assert_frame_equal(from_snapshot, from_database)
+    pd.testing.assert_frame_equal(
+        data_viewer.analyze_data(), data_viewer.analyze_data(use_snapshot=False)
+    )
+    assert data_viewer.analyze_latest_runs(tier=7)["run_id"].tolist() == [2]
+    pd.testing.assert_frame_equal(
+        data_viewer.analyze_latest_runs(ended=True),
+        data_viewer.analyze_latest_runs(ended=True, use_snapshot=False),
+    )
@@ -0,0 +1,39 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Milliseconds allowed for importing the GUI entry point (python -X importtime)
+STARTUP_BUDGET_MS = float(os.environ.get("TOWER_TRACKER_STARTUP_BUDGET_MS", "500"))
+# Loaded only once a view that needs them is opened
+DEFERRED = {"matplotlib", "numpy", "pandas", "pyarrow", "sqlalchemy"}
+
+
+def import_times(module: str) -> Dict[str, int]:
+    """Cumulative import time in microseconds of every module `module` imports."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+        env={**os.environ, "PYTHONPATH": str(ROOT / "src")},
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        # import time: <self us> | <cumulative us> | <indented module name>
+        fields = line.removeprefix("import time:").split("|")
+        if len(fields) == 3 and fields[1].strip().isdigit():
+            times[fields[2].strip()] = int(fields[1])
+    return times
+
+
+def test_gui_startup_defers_heavy_imports() -> None:
+    """The GUI entry point defers the heavy libraries and imports within budget."""
+    pytest.importorskip("tkinter")
+    times = import_times("tower_tracker.main")
+
+    assert not {name.split(".")[0] for name in times} & DEFERRED
+    assert times["tower_tracker.main"] / 1000 < STARTUP_BUDGET_MS
@@ -0,0 +1,66 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from tower_tracker import crud, data_viewer, tier_stats
+
+
+def test_rollup_follows_inserts_updates_and_deletes(db_engine: Engine) -> None:
+    """The triggers keep the rollup equal to a full recompute."""
+    crud.insert_run(1, 5, 40, 1e5, 2, 300, "", False)
+    crud.insert_run(1, 5, 90, 4e5, 9, 900, "", True)
+    crud.insert_run(2, 7, 0, 0, 0, 0, "", False)  # rates divide by zero
+    crud.insert_runs_bulk([
+        {
+            "run_id": 1, "tier": 5, "wave": 95, "coins": 5e5, "cells": 10,
+            "time_spent": 900, "end_of_round": True,
+        },
+        {
+            "run_id": 3, "tier": 6, "wave": 30, "coins": 2e5, "cells": 3,
+            "time_spent": 400,
+        },
+    ])
+    first = crud.fetch_all_entries_for_run(1)[0]
+    crud.delete_data(first.id)
+
+    assert tier_stats.check_tier_stats() == []
+    averages = {row.tier: row for row in data_viewer.tier_averages()}
+    assert averages[5].avg_wave == 95
+    assert averages[7].avg_coins_per_hour is None
+
+
+def test_check_detects_drift_and_rebuild_repairs_it(db_engine: Engine) -> None:
+    """The check reports a corrupted counter and a rebuild restores it."""
+    crud.insert_run(1, 5, 40, 1e5, 2, 300, "", False)
+    with db_engine.begin() as conn:
+        conn.execute(text("UPDATE tier_stats SET wave_sum = wave_sum + 1"))
+        conn.execute(text("INSERT INTO tier_stats (tier, entries) VALUES (9, 3)"))
+
+    mismatches = tier_stats.check_tier_stats()
+    assert {(m.tier, m.column) for m in mismatches} == {(5, "wave_sum"), (9, "entries")}
+
+    assert tier_stats.main(["rebuild"]) == 0
+    assert tier_stats.main(["check"]) == 0
+
+
+def test_deletes_leave_exact_sums(db_engine: Engine) -> None:
+    """Deletes recompute the tier instead of subtracting from the float sums."""
+    for run_id in range(1, 11):
+        crud.insert_run(run_id, 5, 100, 12345.6, 1, 3600 + run_id, "", True)
+    crud.insert_run(99, 5, 100, 3.3e15, 1, 3600, "", True)
+    crud.delete_data(crud.fetch_all_entries_for_run(99)[0].id)
+
+    def stored_sums():
+        with db_engine.connect() as conn:
+            return conn.execute(
+                text("SELECT coins_per_hour_sum, coins_per_hour_sumsq FROM tier_stats")
+            ).one()
+
+    rates = [row.coins_per_hour for row in crud.fetch_run_rows()]
+    expected = (sum(rates), sum(rate * rate for rate in rates))
+    assert stored_sums() == pytest.approx(expected, rel=1e-12)
+    assert tier_stats.check_tier_stats() == []
+
+    for entry in crud.fetch_all_data():
+        crud.delete_data(entry.id)
+    assert stored_sums() == (0, 0)
@@ -0,0 +1,184 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+tk = pytest.importorskip("tkinter")
+
+from tower_tracker.ui import tasks  # noqa: E402
+from tower_tracker.ui.tasks import BusyIndicator, TaskRunner  # noqa: E402
+
+
+class FakeRoot:
+    """Stand-in for the Tk root: `after` callbacks run when the test polls."""
+
+    def __init__(self) -> None:
+        self.scheduled = []
+        self.errors = []
+
+    def after(self, interval, callback) -> None:
+        """Schedule `callback` for the next poll."""
+        self.scheduled.append(callback)
+
+    def report_callback_exception(self, kind, error, traceback) -> None:
+        """Record an exception raised by a callback."""
+        self.errors.append(error)
+
+    def run_until_idle(self, timeout=5.0) -> None:
+        """Run the scheduled callbacks until nothing is scheduled."""
+        deadline = time.monotonic() + timeout
+        while self.scheduled:
+            assert time.monotonic() < deadline, "tasks did not finish"
+            self.scheduled.pop(0)()
+            time.sleep(0.001)
+
+
+class FakeWindow:
+    """Stand-in for a window that delivers <Destroy> like Tk."""
+
+    def __init__(self) -> None:
+        self.bindings = []
+
+    def bind(self, sequence, callback, add=None) -> None:
+        """Register a <Destroy> handler."""
+        assert sequence == "<Destroy>"
+        self.bindings.append(callback)
+
+    def destroy(self, widget=None) -> None:
+        """Deliver <Destroy> for the window, or for one of its children."""
+        for callback in self.bindings:
+            callback(SimpleNamespace(widget=widget or self))
+
+
+class FakeIndicator:
+    """Stand-in for a BusyIndicator, counting its starts and stops."""
+
+    def __init__(self) -> None:
+        self.started = self.stopped = 0
+
+    def start(self) -> None:
+        """Count a start."""
+        self.started += 1
+
+    def stop(self) -> None:
+        """Count a stop."""
+        self.stopped += 1
+
+
+@pytest.fixture
+def runner():
+    """Return a task runner polled by a FakeRoot."""
+    runner = TaskRunner(FakeRoot(), max_workers=2)
+    yield runner
+    runner.shutdown()
+
+
+def test_work_runs_on_a_worker_and_callbacks_on_the_main_thread(runner) -> None:
+    """Work runs on a worker thread and callbacks on the submitting thread."""
+    indicator = FakeIndicator()
+    results = []
+    runner.submit(
+        threading.get_ident, indicator=indicator,
+        on_done=lambda ident: results.append((ident, threading.get_ident())),
+    )
+    assert indicator.started == 1
+    runner.root.run_until_idle()
+
+    (worker, callback), = results
+    assert worker != threading.get_ident()
+    assert callback == threading.get_ident()
+    assert indicator.stopped == 1
+
+
+def test_errors_go_to_on_error_or_a_message_box(runner, monkeypatch) -> None:
+    """Errors go to on_error, or to a message box without one."""
+    def fail():
+        raise ValueError("no such run")
+
+    errors, shown = [], []
+    monkeypatch.setattr(
+        tasks.messagebox, "showerror", lambda title, message: shown.append(message)
+    )
+    runner.submit(fail, on_error=errors.append)
+    runner.submit(fail)
+    runner.root.run_until_idle()
+
+    assert [str(error) for error in errors] == ["no such run"]
+    assert shown == ["no such run"]
+
+
+def test_callback_exceptions_are_reported_to_tk(runner) -> None:
+    """Exceptions raised by callbacks are reported to Tk."""
+    def broken(result):
+        raise RuntimeError(result)
+
+    runner.submit(lambda: "callback failed", on_done=broken)
+    runner.root.run_until_idle()
+    assert [str(error) for error in runner.root.errors] == ["callback failed"]
+
+
+def test_tasks_are_cancelled_when_their_window_is_destroyed(runner) -> None:
+    """Only the destroyed window's tasks are cancelled."""
+    window, other = FakeWindow(), FakeWindow()
+    release = threading.Event()
+    done = []
+    runner.submit(release.wait, owner=window, on_done=done.append)
+    runner.submit(release.wait, owner=other, on_done=done.append)
+
+    # <Destroy> of a child widget does not cancel the window's tasks
+    window.destroy(widget=object())
+    assert not any(task.cancelled for task in runner._pending)
+
+    window.destroy()
+    release.set()
+    runner.root.run_until_idle()
+    # Only the other window's callback ran
+    assert done == [True]
+
+
+@pytest.fixture
+def root():
+    """Return a hidden Tk root, skipping the test without a display."""
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        pytest.skip("no display")
+    root.withdraw()
+    yield root
+    root.destroy()
+
+
+def test_busy_indicator_is_shown_while_tasks_run(root) -> None:
+    """The indicator is packed while any task runs."""
+    indicator = BusyIndicator(root)
+    indicator.start()
+    indicator.start()
+    assert indicator.winfo_manager() == "pack"
+    indicator.stop()
+    assert indicator.winfo_manager() == "pack"
+    indicator.stop()
+    assert indicator.winfo_manager() == ""
+    # Extra stops are ignored
+    indicator.stop()
+    indicator.start()
+    assert indicator.winfo_manager() == "pack"
+
+
+def test_destroying_a_tk_window_cancels_its_tasks(root) -> None:
+    """Destroying a real Tk window cancels its tasks."""
+    runner = TaskRunner(root, poll_interval=1)
+    window = tk.Toplevel(root)
+    tk.Label(window).pack()
+    release = threading.Event()
+    done = []
+    future = runner.submit(release.wait, owner=window, on_done=done.append)
+
+    window.destroy()
+    release.set()
+    future.result(timeout=5)
+    deadline = time.monotonic() + 5
+    while runner._pending and time.monotonic() < deadline:
+        root.update()
+    runner.shutdown()
+    assert done == []
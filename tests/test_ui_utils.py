@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tower_tracker.ui.utils import (
+    format_coins,
+    format_coins_array,
+    parse_coins,
+    parse_coins_array,
+    parse_column,
+    reorder_moves,
+    sort_order,
+)
+
+
+def apply_moves(items, moves):
+    """Apply `moves` to a copy of `items` like Treeview.move does."""
+    # Same effect as detaching the moved items, then re-inserting each at its index
+    moved = {item for item, _ in moves}
+    result = [item for item in items if item not in moved]
+    for item, index in moves:
+        result.insert(index, item)
+    return result
+
+
+def test_sort_order_numeric_and_strings() -> None:
+    """Numbers sort as numbers, anything else as strings, None last."""
+    waves = [100, 9, 25, None, 1000]
+    assert [waves[i] for i in sort_order(waves)] == [9, 25, 100, 1000, None]
+    descending = [waves[i] for i in sort_order(waves, reverse=True)]
+    assert descending == [1000, 100, 25, 9, None]
+
+    notes = ["b", None, "a", "c"]
+    assert [notes[i] for i in sort_order(notes)] == ["a", "b", "c", None]
+    assert [notes[i] for i in sort_order(notes, reverse=True)] == ["c", "b", "a", None]
+
+    # Ties keep their current order
+    assert list(sort_order([2, 1, 2, 1])) == [1, 3, 0, 2]
+
+
+def test_reorder_moves_is_minimal() -> None:
+    """Only the items off the longest increasing subsequence move."""
+    items = ["a", "b", "c", "d", "e"]
+    assert reorder_moves(items, np.arange(5)) == []
+    # Moving the last item to the front takes a single move
+    assert reorder_moves(items, [4, 0, 1, 2, 3]) == [("e", 0)]
+
+    rng = np.random.default_rng(0)
+    items = [f"I{i:03d}" for i in range(200)]
+    for _ in range(20):
+        order = rng.permutation(len(items))
+        moves = reorder_moves(items, order)
+        assert apply_moves(items, moves) == [items[i] for i in order]
+
+
+def test_coin_arrays_match_scalar_functions() -> None:
+    """The vectorized coin functions give the same results as the scalar ones."""
+    values = np.array([
+        0, 999, 1000, 17_090_000, 1.5e12, 2e15, 3.25e18, 4e21, 5e24, 6e27, 7e30, 8e33,
+        9e36,
+    ])
+    texts = format_coins_array(values)
+    assert list(texts) == [format_coins(value) for value in values]
+    assert list(texts[[2, 3, 4, 5, 6, 7, 8, 11]]) == [
+        "1.00K", "17.09M", "1.50T", "2.00q", "3.25Q", "4.00s", "5.00S", "8.00D"
+    ]
+
+    np.testing.assert_allclose(
+        parse_coins_array(texts), [parse_coins(text) for text in texts]
+    )
+    np.testing.assert_allclose(
+        parse_coins_array(pd.Series(["1.5M", " 2K", "3"])), [1.5e6, 2e3, 3]
+    )
+    assert list(format_coins_array(pd.Series([1e3, None]))) == ["1.00K", ""]
+
+    with pytest.raises(ValueError):
+        parse_coins_array(["1.5X"])
+
+
+def test_coin_arrays_handle_signs_exponents_and_non_finite_values() -> None:
+    """Signs, exponents, NaN and infinities are handled like the scalar functions."""
+    texts = ["-1e5", "-1.5K", "1e3M", "-2.5e-1", "2.5E+3q", "-12.34", "-"]
+    np.testing.assert_allclose(
+        parse_coins_array(texts[:-1]), [parse_coins(text) for text in texts[:-1]]
+    )
+    np.testing.assert_allclose(
+        parse_coins_array(texts[:-1]), [-1e5, -1.5e3, 1e9, -0.25, 2.5e18, -12.34]
+    )
+    with pytest.raises(ValueError):
+        parse_coins_array(texts[-1:])
+
+    values = [float("nan"), float("inf"), -float("inf"), 1e3]
+    assert [format_coins(value) for value in values] == ["", "inf", "-inf", "1.00K"]
+    assert list(format_coins_array(values)) == ["", "inf", "-inf", "1.00K"]
+
+
+def test_parse_column_parses_numeric_columns_in_one_pass() -> None:
+    """Numeric columns are parsed; any other text keeps the column as strings."""
+    assert parse_column(["1.5M", "", "-2K", "3"]) == [1.5e6, None, -2e3, 3.0]
+    assert parse_column(["b", "", "1K"]) == ["b", None, "1K"]
@@ -0,0 +1,91 @@
+import sqlite3
+import threading
+from typing import Iterator
+
+import pytest
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+
+from tower_tracker import crud, database, tier_stats
+from tower_tracker.writer import GroupCommitWriter
+
+
+@pytest.fixture
+def writer(db_engine: Engine) -> Iterator[GroupCommitWriter]:
+    """Return a writer that lingers for more requests, closed after the test."""
+    # A long linger, so requests submitted together share a batch
+    writer = GroupCommitWriter(max_delay_ms=50)
+    yield writer
+    writer.close()
+
+
+def test_concurrent_producers_share_commits(writer: GroupCommitWriter) -> None:
+    """Requests of concurrent producers are committed together."""
+    assert crud.fetch_entry_rows(1) == []
+
+    def produce(run_id: int) -> None:
+        futures = [
+            writer.insert_run(run_id, run_id, wave, 1e3 * i, i, 60 * wave, "", False)
+            for i, wave in enumerate(range(1, 51))
+        ]
+        for future in futures:
+            future.result()
+
+    threads = [
+        threading.Thread(target=produce, args=(run_id,)) for run_id in range(1, 5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    writer.flush()
+    assert writer.requests == 201 and writer.batches < 20
+    # The cached empty result was invalidated by the writer's commits
+    assert len(crud.fetch_entry_rows(1)) == 50
+    assert len(crud.fetch_all_rows()) == 200
+    assert tier_stats.check_tier_stats() == []
+
+
+def test_failures_are_isolated_and_runs_end_in_order(
+    writer: GroupCommitWriter,
+) -> None:
+    """A failing request fails alone; end-of-round entries end runs in order."""
+    futures = [
+        writer.insert_run(1, 5, 10, 1e5, 1, 60, "", False),
+        writer.insert_run(1, 5, 10, 1e5, 1, 60, "", False),  # same run and time
+        writer.insert_run(1, 5, 20, 2e5, 2, 120, "", True),
+        writer.insert_run(1, 5, 30, 3e5, 3, 180, "", False),
+    ]
+    with pytest.raises(IntegrityError):
+        futures[1].result()
+    ids = [futures[i].result() for i in (0, 2, 3)]
+    assert writer.batches == 1
+
+    rows = crud.fetch_entry_rows(1)
+    ended = [True, True, False]
+    assert [(row.id, row.end_of_round) for row in rows] == list(zip(ids, ended))
+
+    deletes = [writer.delete_data(entry_id) for entry_id in (ids[0], ids[0], 999)]
+    assert [future.result() for future in deletes] == [True, False, False]
+    assert [row.id for row in crud.fetch_entry_rows(1)] == ids[1:]
+
+
+def test_retries_while_the_database_is_locked(db_engine: Engine) -> None:
+    """Batches are retried with backoff while another connection holds the lock."""
+    # Fail fast on the lock instead of waiting in SQLite's busy handler
+    pragmas = {"journal_mode": "WAL", "busy_timeout": "0"}
+    database.configure_database(db_engine.url, pragmas=pragmas)
+    writer = GroupCommitWriter(backoff=0.02)
+    blocker = sqlite3.connect(
+        db_engine.url.database, isolation_level=None, check_same_thread=False
+    )
+    blocker.execute("BEGIN IMMEDIATE")
+    try:
+        future = writer.insert_run(1, 5, 10, 1e5, 1, 60, "", False)
+        threading.Timer(0.2, blocker.execute, args=("COMMIT",)).start()
+        assert future.result(timeout=10) == 1
+        assert writer.busy_retries > 0
+    finally:
+        writer.close()
+        blocker.close()